@@ -95,6 +95,7 @@
         'views/copier_billing_group_views.xml',
         'views/copier_company_billing_group_views.xml',
         'views/copier_counter_billing_group_views.xml',
+        'views/copier_invoice_job_views.xml',
         'views/menus_actions.xml',
     ],
 
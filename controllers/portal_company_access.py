@@ -2,7 +2,6 @@
 import logging
 import json
 import calendar
-from collections import defaultdict
 from urllib.parse import urlencode
 
 from odoo import http, _, fields
@@ -42,62 +41,10 @@ class CopierPortalCompanyAccess(BaseCopierPortal):
 
     # -------------------------------------------------------------------------
     # HELPERS DE EMPRESAS VISIBLES
+    # _get_allowed_partner_ids_for_portal() y _get_equipment_domain_for_portal()
+    # se heredan de CopierPortal (alcance cacheado por usuario).
     # -------------------------------------------------------------------------
 
-    def _get_allowed_partner_ids_for_portal(self):
-        """
-        Devuelve las empresas que el contacto portal puede ver.
-
-        Incluye:
-        - partner.commercial_partner_id
-        - partner.portal_empresa_ids
-        """
-        user = request.env.user
-        partner = user.partner_id
-        commercial_partner = partner.commercial_partner_id
-
-        allowed_partner_ids = set()
-
-        if commercial_partner:
-            allowed_partner_ids.add(commercial_partner.id)
-
-        if hasattr(partner, 'portal_empresa_ids'):
-            allowed_partner_ids.update(partner.portal_empresa_ids.ids)
-
-        _logger.info(
-            "[PORTAL EQUIPMENTS ACCESS] user_id=%s partner_id=%s commercial_partner_id=%s "
-            "portal_empresa_ids=%s allowed_partner_ids=%s",
-            user.id,
-            partner.id,
-            commercial_partner.id if commercial_partner else False,
-            partner.portal_empresa_ids.ids if hasattr(partner, 'portal_empresa_ids') else [],
-            list(allowed_partner_ids),
-        )
-
-        return list(allowed_partner_ids)
-
-    def _get_equipment_domain_for_portal(self, only_rented=True):
-        """
-        Dominio de equipos visibles en portal.
-
-        Usuario portal:
-            cliente_id.commercial_partner_id in empresas permitidas
-
-        Usuario interno:
-            sin restricción de cliente
-        """
-        user = request.env.user
-        domain = []
-
-        if user.has_group('base.group_portal'):
-            allowed_partner_ids = self._get_allowed_partner_ids_for_portal()
-            domain.append(('cliente_id.commercial_partner_id', 'in', allowed_partner_ids))
-
-        if only_rented:
-            domain.append(('estado_maquina_id.name', '=', 'Alquilada'))
-
-        return domain
-
     def _get_equipment_for_portal(self, equipment_id):
         """
         Obtiene equipo validando acceso portal con empresa principal + empresas visibles.
@@ -505,245 +452,6 @@ class CopierPortalCompanyAccess(BaseCopierPortal):
             order='name asc',
         )
 
-    def _get_summary_values(self, counters):
-        total_bn = sum(counters.mapped('total_copias_bn')) if counters else 0
-        total_color = sum(counters.mapped('total_copias_color')) if counters else 0
-
-        user_totals = {}
-
-        for counter in counters:
-            for detail in counter.usuario_detalle_ids:
-                name = detail.usuario_id.name or 'Sin usuario'
-                total = (detail.cantidad_bn or 0) + (detail.cantidad_color or 0)
-                user_totals[name] = user_totals.get(name, 0) + total
-
-        top_user = False
-
-        if user_totals:
-            top_name = max(user_totals, key=user_totals.get)
-            top_user = {
-                'name': top_name,
-                'total': user_totals[top_name],
-            }
-
-        return {
-            'counter_count': len(counters),
-            'total_bn': total_bn,
-            'total_color': total_color,
-            'total_general': total_bn + total_color,
-            'top_user': top_user,
-        }
-
-    def _build_chart_data_for_counters(self, equipment, counters):
-        """
-        Mantiene la lógica existente de gráficos:
-        - monthly
-        - yearly
-        - by_user
-        - by_user_monthly
-
-        Agrega:
-        - by_equipment
-        - all_user_data
-        """
-        monthly_data = []
-        yearly_data = []
-        month_dict = {}
-        year_dict = {}
-
-        counters_with_users = counters.filtered(lambda c: c.usuario_detalle_ids)
-        confirmed_counters = counters.filtered(lambda c: c.state in ('confirmed', 'invoiced'))
-
-        # ---------------------------------------------------------------------
-        # Mensual / Anual
-        # ---------------------------------------------------------------------
-        for counter in confirmed_counters:
-            fecha = counter.fecha_facturacion or counter.fecha
-            if not fecha:
-                continue
-
-            year = fecha.year
-            month = fecha.month
-            month_key = f"{year}-{month:02d}"
-            month_name = counter.mes_facturacion or f"{month:02d}/{year}"
-
-            if month_key not in month_dict:
-                month_dict[month_key] = {
-                    'key': month_key,
-                    'name': month_name,
-                    'bn': 0,
-                    'color': 0,
-                    'total': 0,
-                }
-
-            month_dict[month_key]['bn'] += counter.total_copias_bn or 0
-            month_dict[month_key]['color'] += counter.total_copias_color or 0
-            month_dict[month_key]['total'] += (counter.total_copias_bn or 0) + (counter.total_copias_color or 0)
-
-            if year not in year_dict:
-                year_dict[year] = {
-                    'name': str(year),
-                    'bn': 0,
-                    'color': 0,
-                    'total': 0,
-                }
-
-            year_dict[year]['bn'] += counter.total_copias_bn or 0
-            year_dict[year]['color'] += counter.total_copias_color or 0
-            year_dict[year]['total'] += (counter.total_copias_bn or 0) + (counter.total_copias_color or 0)
-
-        for key in sorted(month_dict.keys()):
-            monthly_data.append(month_dict[key])
-
-        for key in sorted(year_dict.keys()):
-            yearly_data.append(year_dict[key])
-
-        # ---------------------------------------------------------------------
-        # Último contador con usuarios
-        # ---------------------------------------------------------------------
-        chart_user_data = []
-
-        if counters_with_users:
-            first = counters_with_users[0]
-            if first.usuario_detalle_ids:
-                for user_detail in first.usuario_detalle_ids:
-                    total = (user_detail.cantidad_bn or 0) + (user_detail.cantidad_color or 0)
-                    chart_user_data.append({
-                        'name': user_detail.usuario_id.name or 'Sin usuario',
-                        'copies': total,
-                        'total': total,
-                        'bn': user_detail.cantidad_bn or 0,
-                        'color': user_detail.cantidad_color or 0,
-                    })
-
-        # ---------------------------------------------------------------------
-        # Mensual por usuario
-        # ---------------------------------------------------------------------
-        monthly_user_data = defaultdict(lambda: defaultdict(int))
-        all_user_data_map = {}
-
-        for counter in counters_with_users:
-            fecha = counter.fecha_facturacion or counter.fecha
-
-            if counter.mes_facturacion:
-                mes_label = counter.mes_facturacion
-            elif fecha:
-                mes_label = fecha.strftime('%m/%Y')
-            else:
-                mes_label = 'Sin fecha'
-
-            mes_key = fecha.strftime('%Y-%m') if fecha else mes_label
-
-            if mes_key not in all_user_data_map:
-                all_user_data_map[mes_key] = {
-                    'key': mes_key,
-                    'month': mes_label,
-                    'date': str(counter.fecha or ''),
-                    'name': counter.name or '',
-                    'users': [],
-                }
-
-            for detalle in counter.usuario_detalle_ids:
-                nombre = detalle.usuario_id.name or 'Sin nombre'
-                total = (detalle.cantidad_bn or 0) + (detalle.cantidad_color or 0)
-
-                monthly_user_data[mes_label][nombre] += total
-
-                all_user_data_map[mes_key]['users'].append({
-                    'name': nombre,
-                    'bn': detalle.cantidad_bn or 0,
-                    'color': detalle.cantidad_color or 0,
-                    'total': total,
-                    'copies': total,
-                })
-
-        labels = sorted(monthly_user_data.keys())
-        usuarios_unicos = sorted({u for datos in monthly_user_data.values() for u in datos})
-
-        datasets = []
-
-        for usuario in usuarios_unicos:
-            datasets.append({
-                'label': usuario,
-                'data': [monthly_user_data[mes].get(usuario, 0) for mes in labels],
-            })
-
-        all_user_data = [
-            all_user_data_map[key]
-            for key in sorted(all_user_data_map.keys())
-        ]
-
-        # ---------------------------------------------------------------------
-        # Ranking por equipos visibles
-        # ---------------------------------------------------------------------
-        equipment_ranking = []
-
-        try:
-            Equip = request.env['copier.company'].sudo()
-            accessible_equipment_domain = self._get_equipment_domain_for_portal(only_rented=True)
-            accessible_equipments = Equip.search(accessible_equipment_domain)
-
-            ranking_domain = [
-                ('maquina_id', 'in', accessible_equipments.ids),
-                ('state', 'in', ['confirmed', 'invoiced']),
-            ]
-
-            ranking_counters = request.env['copier.counter'].sudo().search(ranking_domain)
-
-            machine_totals = {}
-
-            for counter in ranking_counters:
-                machine = counter.maquina_id
-                if not machine:
-                    continue
-
-                name_parts = []
-                if machine.serie_id:
-                    name_parts.append(machine.serie_id)
-                if machine.name and machine.name.name:
-                    name_parts.append(machine.name.name)
-
-                machine_name = ' - '.join(name_parts) or machine.display_name or f'Equipo {machine.id}'
-
-                if machine_name not in machine_totals:
-                    machine_totals[machine_name] = {
-                        'name': machine_name,
-                        'bn': 0,
-                        'color': 0,
-                        'total': 0,
-                    }
-
-                machine_totals[machine_name]['bn'] += counter.total_copias_bn or 0
-                machine_totals[machine_name]['color'] += counter.total_copias_color or 0
-                machine_totals[machine_name]['total'] += (counter.total_copias_bn or 0) + (counter.total_copias_color or 0)
-
-            equipment_ranking = sorted(
-                machine_totals.values(),
-                key=lambda item: item['total'],
-                reverse=True,
-            )[:20]
-
-        except Exception as e:
-            _logger.exception(
-                "[PORTAL EQUIPMENTS ACCESS] Error generando ranking de equipos: %s",
-                str(e),
-            )
-            equipment_ranking = []
-
-        chart_data = {
-            'monthly': monthly_data,
-            'yearly': yearly_data,
-            'by_user': chart_user_data,
-            'by_user_monthly': {
-                'labels': labels,
-                'datasets': datasets,
-            },
-            'all_user_data': all_user_data,
-            'by_equipment': equipment_ranking,
-        }
-
-        return chart_data
-
     # -------------------------------------------------------------------------
     # HISTORIAL DE CONTADORES
     # -------------------------------------------------------------------------
@@ -780,6 +488,14 @@ class CopierPortalCompanyAccess(BaseCopierPortal):
             if 'copier.counter' not in request.env:
                 _logger.error("Modelo copier.counter no encontrado")
                 counters = request.env['ir.ui.view'].sudo().browse([])
+                next_offset = False
+                summary = {
+                    'counter_count': 0,
+                    'total_bn': 0,
+                    'total_color': 0,
+                    'total_general': 0,
+                    'top_user': False,
+                }
                 chart_data = {
                     'monthly': [],
                     'yearly': [],
@@ -797,45 +513,22 @@ class CopierPortalCompanyAccess(BaseCopierPortal):
 
                     counter_domain = self._build_counter_domain_for_portal(equipment_sudo, kw)
 
-                    counters = request.env['copier.counter'].sudo().search(
-                        counter_domain,
-                        order='fecha desc, id desc',
-                    )
+                    counters, next_offset = request.env['copier.counter'].sudo()._portal_counter_page(counter_domain)
+                    summary = self._get_summary_values(counter_domain)
 
                     _logger.info(
-                        "[PORTAL EQUIPMENTS ACCESS] Contadores encontrados=%s ids=%s domain=%s",
-                        len(counters),
-                        counters.ids,
+                        "[PORTAL EQUIPMENTS ACCESS] Contadores encontrados=%s domain=%s",
+                        summary['counter_count'],
                         counter_domain,
                     )
 
-                    counters_with_users = counters.filtered(lambda c: c.usuario_detalle_ids)
-
-                    _logger.info(
-                        "[PORTAL EQUIPMENTS ACCESS] Contadores con usuarios=%s",
-                        len(counters_with_users),
+                    chart_data = self._build_chart_data_for_counters(equipment_sudo, counter_domain)
+                    summary['users_total'] = sum(
+                        user['total']
+                        for month in chart_data['all_user_data']
+                        for user in month['users']
                     )
 
-                    for counter in counters_with_users:
-                        _logger.info(
-                            "[PORTAL EQUIPMENTS ACCESS] Contador con usuarios: ID=%s Nombre=%s Mes=%s Usuarios=%s Estado=%s",
-                            counter.id,
-                            counter.name,
-                            counter.mes_facturacion,
-                            len(counter.usuario_detalle_ids),
-                            counter.state,
-                        )
-
-                        for user_detail in counter.usuario_detalle_ids:
-                            _logger.info(
-                                "[PORTAL EQUIPMENTS ACCESS]   Usuario=%s B/N=%s Color=%s",
-                                user_detail.usuario_id.name,
-                                user_detail.cantidad_bn,
-                                user_detail.cantidad_color,
-                            )
-
-                    chart_data = self._build_chart_data_for_counters(equipment_sudo, counters)
-
                     _logger.info(
                         "[PORTAL EQUIPMENTS ACCESS] Datos gráficos: monthly=%s yearly=%s by_user=%s",
                         len(chart_data.get('monthly', [])),
@@ -849,6 +542,14 @@ class CopierPortalCompanyAccess(BaseCopierPortal):
                         str(e),
                     )
                     counters = request.env['copier.counter'].sudo().browse([])
+                    next_offset = False
+                    summary = {
+                        'counter_count': 0,
+                        'total_bn': 0,
+                        'total_color': 0,
+                        'total_general': 0,
+                        'top_user': False,
+                    }
                     chart_data = {
                         'monthly': [],
                         'yearly': [],
@@ -873,18 +574,30 @@ class CopierPortalCompanyAccess(BaseCopierPortal):
                 kw,
             )
 
+            csv_url = self._get_url_with_filters(
+                f'/my/copier/equipment/{equipment_sudo.id}/counters/csv',
+                kw,
+            )
+
             values.update({
                 'equipment': equipment_sudo,
                 'counters': counters,
+                'next_offset': next_offset,
+                'page_url': self._get_url_with_filters(
+                    f'/my/copier/equipment/{equipment_sudo.id}/counters/page',
+                    kw,
+                ),
                 'page_name': 'equipment_counters',
                 'today': fields.Date.today(),
+                'chart': chart_data,
                 'chart_data': json.dumps(chart_data),
                 'filter_values': filter_values,
                 'user_options': self._get_user_options(equipment_sudo),
                 'can_download': self._check_download_permission(),
                 'pdf_url': pdf_url,
                 'xlsx_url': xlsx_url,
-                'summary': self._get_summary_values(counters),
+                'csv_url': csv_url,
+                'summary': summary,
             })
 
             template = 'copier_company.portal_my_copier_counters'
@@ -4,10 +4,14 @@ from odoo.http import request
 from odoo.exceptions import AccessError
 from collections import defaultdict
 from urllib.parse import urlencode
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
 import calendar
+import csv
 import io
 import json
 import logging
+import tempfile
 import xlsxwriter
 
 _logger = logging.getLogger(__name__)
@@ -30,19 +34,9 @@ class CopierCounterPortal(http.Controller):
         Empresas que el contacto portal puede ver:
         - Su commercial_partner_id.
         - Empresas adicionales configuradas en portal_empresa_ids.
+        Se lee del alcance cacheado por usuario (copier.portal.access.scope).
         """
-        partner = self._get_portal_partner()
-        commercial_partner = partner.commercial_partner_id
-
-        allowed_partner_ids = set()
-
-        if commercial_partner:
-            allowed_partner_ids.add(commercial_partner.id)
-
-        if hasattr(partner, 'portal_empresa_ids'):
-            allowed_partner_ids.update(partner.portal_empresa_ids.ids)
-
-        return list(allowed_partner_ids)
+        return request.env['copier.portal.access.scope'].get_allowed_partner_ids()
 
     def _check_download_permission(self):
         """
@@ -119,10 +113,10 @@ class CopierCounterPortal(http.Controller):
         if not user.has_group('base.group_portal'):
             return []
 
-        allowed_partner_ids = self._get_allowed_partner_ids_for_portal()
+        equipment_ids = request.env['copier.portal.access.scope'].get_equipment_ids()
 
         return [
-            ('cliente_id.commercial_partner_id', 'in', allowed_partner_ids),
+            ('id', 'in', equipment_ids),
         ]
 
     def _check_counter_access(self, counter):
@@ -296,34 +290,25 @@ class CopierCounterPortal(http.Controller):
 
         return domain
 
-    def _get_counters_for_equipment(self, equipment, kwargs=None):
-        Counter = request.env['copier.counter'].sudo()
-        domain = self._build_counter_domain(equipment, kwargs)
-
-        return Counter.search(
-            domain,
-            order='fecha_facturacion desc, fecha desc, id desc'
-        )
-
-    def _get_global_counters_for_ranking(self, kwargs=None):
+    def _get_global_counter_domain_for_ranking(self, kwargs=None):
         """
-        Lecturas visibles para ranking general de equipos.
+        Dominio de lecturas visibles para ranking general de equipos.
         No reemplaza la vista por equipo: solo alimenta el gráfico
         'qué máquina imprimió más' dentro del rango filtrado.
+        Retorna False si el usuario no ve ningún equipo.
         """
-        Counter = request.env['copier.counter'].sudo()
         Equipment = request.env['copier.company'].sudo()
 
         equipment_domain = self._get_accessible_equipment_domain()
         accessible_equipments = Equipment.search(equipment_domain)
 
         if not accessible_equipments:
-            return Counter.browse([])
+            return False
 
         domain = self._build_counter_domain(None, kwargs)
         domain.append(('maquina_id', 'in', accessible_equipments.ids))
 
-        return Counter.search(domain)
+        return domain
 
     def _get_query_string(self, kwargs=None):
         """
@@ -348,9 +333,6 @@ class CopierCounterPortal(http.Controller):
             return f'{base_url}?{query_string}'
         return base_url
 
-    def _get_report_ref(self):
-        return 'copier_company.action_report_counter_readings_portal'
-
     def _get_equipment_filename_value(self, equipment):
         return equipment.serie_id or equipment.id
 
@@ -375,10 +357,7 @@ class CopierCounterPortal(http.Controller):
     # HELPERS DE DATOS PARA GRÁFICOS
     # -------------------------------------------------------------------------
 
-    def _get_counter_total(self, counter):
-        return (counter.total_copias_bn or 0) + (counter.total_copias_color or 0)
-
-    def _build_chart_data(self, equipment, counters, kwargs=None):
+    def _build_chart_data(self, equipment, kwargs=None):
         """
         Construye datos para:
         - consumo mensual del equipo;
@@ -386,41 +365,35 @@ class CopierCounterPortal(http.Controller):
         - ranking de usuarios del equipo;
         - usuario por mes;
         - ranking de máquinas visibles.
+
+        Los totales se agrupan en SQL (ver copier.counter._chart_*); la
+        etiqueta de cada mes sale de la lectura más reciente del mes.
         """
         kwargs = kwargs or {}
+        Counter = request.env['copier.counter'].sudo()
+        domain = self._build_counter_domain(equipment, kwargs)
+        order = 'fecha_facturacion desc, fecha desc, id desc'
 
-        monthly_map = {}
-        yearly_map = {}
-        user_map = {}
-        user_monthly_map = {}
-        all_user_months = {}
-        equipment_map = {}
+        def month_label(heads, year, month):
+            head = heads.get((year, month))
+            return (head and head.mes_facturacion) or f'{self._get_month_name(month)} {year}'
 
         # ---------------------------------------------------------
-        # Datos por lectura del equipo actual
+        # Consumo mensual y anual del equipo actual
         # ---------------------------------------------------------
-        for counter in counters:
-            fecha_ref = counter.fecha_facturacion or counter.fecha or counter.create_date
-            if not fecha_ref:
-                continue
-
-            year = fecha_ref.year
-            month = fecha_ref.month
-            month_key = f'{year}-{month:02d}'
-            month_label = counter.mes_facturacion or f'{self._get_month_name(month)} {year}'
-
-            if month_key not in monthly_map:
-                monthly_map[month_key] = {
-                    'key': month_key,
-                    'name': month_label,
-                    'bn': 0,
-                    'color': 0,
-                    'total': 0,
-                }
+        month_totals = Counter._chart_month_totals(domain)
+        heads = Counter._chart_month_heads(domain, order)
 
-            monthly_map[month_key]['bn'] += counter.total_copias_bn or 0
-            monthly_map[month_key]['color'] += counter.total_copias_color or 0
-            monthly_map[month_key]['total'] += self._get_counter_total(counter)
+        monthly = []
+        yearly_map = {}
+        for (year, month), (bn, color) in sorted(month_totals.items()):
+            monthly.append({
+                'key': f'{year}-{month:02d}',
+                'name': month_label(heads, year, month),
+                'bn': bn,
+                'color': color,
+                'total': bn + color,
+            })
 
             if year not in yearly_map:
                 yearly_map[year] = {
@@ -430,77 +403,62 @@ class CopierCounterPortal(http.Controller):
                     'total': 0,
                 }
 
-            yearly_map[year]['bn'] += counter.total_copias_bn or 0
-            yearly_map[year]['color'] += counter.total_copias_color or 0
-            yearly_map[year]['total'] += self._get_counter_total(counter)
-
-            for detail in counter.usuario_detalle_ids:
-                user_name = detail.usuario_id.display_name or 'Sin usuario'
-                bn = detail.cantidad_bn or 0
-                color = detail.cantidad_color or 0
-                total = bn + color
-
-                if user_name not in user_map:
-                    user_map[user_name] = {
-                        'name': user_name,
-                        'bn': 0,
-                        'color': 0,
-                        'total': 0,
-                    }
-
-                user_map[user_name]['bn'] += bn
-                user_map[user_name]['color'] += color
-                user_map[user_name]['total'] += total
-
-                if month_key not in all_user_months:
-                    all_user_months[month_key] = {
-                        'month': month_label,
-                        'key': month_key,
-                        'users': [],
-                    }
-
-                all_user_months[month_key]['users'].append({
-                    'name': user_name,
-                    'bn': bn,
-                    'color': color,
-                    'total': total,
-                })
-
-                user_monthly_map.setdefault(user_name, {})
-                user_monthly_map[user_name].setdefault(month_key, 0)
-                user_monthly_map[user_name][month_key] += total
+            yearly_map[year]['bn'] += bn
+            yearly_map[year]['color'] += color
+            yearly_map[year]['total'] += bn + color
 
         # ---------------------------------------------------------
-        # Ranking de máquinas visibles en el mismo rango filtrado
+        # Detalle por usuario interno
         # ---------------------------------------------------------
-        ranking_counters = self._get_global_counters_for_ranking(kwargs)
-
-        for counter in ranking_counters:
-            machine = counter.maquina_id
-            if not machine:
-                continue
+        user_map = {}
+        user_monthly_map = {}
+        all_user_months = {}
 
-            label_parts = []
-            if machine.serie_id:
-                label_parts.append(machine.serie_id)
-            if machine.name and machine.name.name:
-                label_parts.append(machine.name.name)
+        user_rows = Counter._chart_user_month_totals(domain)
+        if user_rows:
+            user_heads = Counter._chart_month_heads(domain + [('usuario_detalle_ids', '!=', False)], order)
 
-            machine_name = ' - '.join(label_parts) or machine.display_name or f'Equipo {machine.id}'
+        for year, month, usuario, bn, color in user_rows:
+            user_name = usuario.display_name or 'Sin usuario'
+            month_key = f'{year}-{month:02d}'
+            total = bn + color
 
-            if machine_name not in equipment_map:
-                equipment_map[machine_name] = {
-                    'name': machine_name,
+            if user_name not in user_map:
+                user_map[user_name] = {
+                    'name': user_name,
                     'bn': 0,
                     'color': 0,
                     'total': 0,
                 }
 
-            equipment_map[machine_name]['bn'] += counter.total_copias_bn or 0
-            equipment_map[machine_name]['color'] += counter.total_copias_color or 0
-            equipment_map[machine_name]['total'] += self._get_counter_total(counter)
+            user_map[user_name]['bn'] += bn
+            user_map[user_name]['color'] += color
+            user_map[user_name]['total'] += total
+
+            if month_key not in all_user_months:
+                all_user_months[month_key] = {
+                    'month': month_label(user_heads, year, month),
+                    'key': month_key,
+                    'users': [],
+                }
+
+            all_user_months[month_key]['users'].append({
+                'name': user_name,
+                'bn': bn,
+                'color': color,
+                'total': total,
+            })
+
+            user_monthly_map.setdefault(user_name, {})
+            user_monthly_map[user_name].setdefault(month_key, 0)
+            user_monthly_map[user_name][month_key] += total
+
+        # ---------------------------------------------------------
+        # Ranking de máquinas visibles en el mismo rango filtrado
+        # ---------------------------------------------------------
+        ranking_domain = self._get_global_counter_domain_for_ranking(kwargs)
+        by_equipment = Counter._chart_machine_totals(ranking_domain) if ranking_domain is not False else []
 
-        monthly = sorted(monthly_map.values(), key=lambda item: item['key'])
         yearly = sorted(yearly_map.values(), key=lambda item: item['name'])
 
         by_user = sorted(
@@ -509,12 +467,6 @@ class CopierCounterPortal(http.Controller):
             reverse=True
         )
 
-        by_equipment = sorted(
-            equipment_map.values(),
-            key=lambda item: item['total'],
-            reverse=True
-        )[:20]
-
         all_user_data = [
             all_user_months[key]
             for key in sorted(all_user_months.keys())
@@ -543,10 +495,9 @@ class CopierCounterPortal(http.Controller):
             'by_equipment': by_equipment,
         }
 
-    def _get_summary_values(self, counters, chart_data):
-        total_bn = sum(c.total_copias_bn or 0 for c in counters)
-        total_color = sum(c.total_copias_color or 0 for c in counters)
-        total_general = total_bn + total_color
+    def _get_summary_values(self, domain, chart_data):
+        """Totales de todas las lecturas filtradas (no solo la página visible)"""
+        summary = request.env['copier.counter'].sudo()._portal_summary(domain)
 
         top_user = False
         if chart_data.get('by_user'):
@@ -556,14 +507,16 @@ class CopierCounterPortal(http.Controller):
         if chart_data.get('by_equipment'):
             top_equipment = chart_data['by_equipment'][0]
 
-        return {
-            'counter_count': len(counters),
-            'total_bn': total_bn,
-            'total_color': total_color,
-            'total_general': total_general,
+        summary.update({
             'top_user': top_user,
             'top_equipment': top_equipment,
-        }
+            'users_total': sum(
+                user['total']
+                for month in chart_data.get('all_user_data', [])
+                for user in month['users']
+            ),
+        })
+        return summary
 
     def _get_user_options(self, equipment):
         """
@@ -595,9 +548,11 @@ class CopierCounterPortal(http.Controller):
         if not equipment:
             return request.not_found()
 
-        counters = self._get_counters_for_equipment(equipment, kwargs)
-        chart_data = self._build_chart_data(equipment, counters, kwargs)
-        summary = self._get_summary_values(counters, chart_data)
+        Counter = request.env['copier.counter'].sudo()
+        domain = self._build_counter_domain(equipment, kwargs)
+        counters, next_offset = Counter._portal_counter_page(domain)
+        chart_data = self._build_chart_data(equipment, kwargs)
+        summary = self._get_summary_values(domain, chart_data)
 
         filter_values = self._get_filter_values(kwargs)
         query_string = self._get_query_string(kwargs)
@@ -610,11 +565,21 @@ class CopierCounterPortal(http.Controller):
             f'/my/copier/equipment/{equipment.id}/counters/xlsx',
             kwargs
         )
+        csv_url = self._get_url_with_filters(
+            f'/my/copier/equipment/{equipment.id}/counters/csv',
+            kwargs
+        )
 
         values = {
             'page_name': 'equipment_counters',
             'equipment': equipment,
             'counters': counters,
+            'next_offset': next_offset,
+            'page_url': self._get_url_with_filters(
+                f'/my/copier/equipment/{equipment.id}/counters/page',
+                kwargs
+            ),
+            'chart': chart_data,
             'chart_data': json.dumps(chart_data),
             'filter_values': filter_values,
             'summary': summary,
@@ -622,11 +587,44 @@ class CopierCounterPortal(http.Controller):
             'can_download': self._check_download_permission(),
             'pdf_url': pdf_url,
             'xlsx_url': xlsx_url,
+            'csv_url': csv_url,
             'query_string': query_string,
         }
 
         return request.render('copier_company.portal_my_copier_counters', values)
 
+    @http.route(
+        ['/my/copier/equipment/<int:equipment_id>/counters/page'],
+        type='http',
+        auth='user',
+        methods=['GET'],
+        website=True
+    )
+    def portal_equipment_counters_page(self, equipment_id, offset=0, **kwargs):
+        """
+        Siguiente página del listado de lecturas (scroll infinito).
+        Retorna JSON con las filas ya renderizadas y el offset siguiente.
+        """
+        equipment = self._get_equipment_for_portal(equipment_id)
+        if not equipment:
+            return request.not_found()
+
+        domain = self._build_counter_domain(equipment, kwargs)
+        counters, next_offset = request.env['copier.counter'].sudo()._portal_counter_page(
+            domain, offset=self._parse_int(offset) or 0
+        )
+
+        html = request.env['ir.qweb']._render('copier_company.portal_my_copier_counter_rows', {
+            'equipment': equipment,
+            'counters': counters,
+            'can_download': self._check_download_permission(),
+        })
+
+        return request.make_json_response({
+            'html': str(html),
+            'next_offset': next_offset,
+        })
+
     # -------------------------------------------------------------------------
     # PDF – LECTURAS FILTRADAS DEL EQUIPO
     # -------------------------------------------------------------------------
@@ -644,19 +642,18 @@ class CopierCounterPortal(http.Controller):
         if not equipment:
             return request.not_found()
 
-        counters = self._get_counters_for_equipment(equipment, kwargs)
-        if not counters:
-            return request.not_found()
-
-        report_ref = self._get_report_ref()
-        request.env.ref(report_ref)
+        filename = f"Lecturas_{self._get_equipment_filename_value(equipment)}.pdf"
 
-        pdf_content, _ = request.env['ir.actions.report'].sudo()._render_qweb_pdf(
-            report_ref,
-            res_ids=counters.ids,
+        # PDF cacheado por equipo, filtros y versión de las lecturas incluidas;
+        # las búsquedas de texto libre se generan sin caché
+        pdf_content, _from_cache = request.env['copier.counter'].sudo()._portal_pdf_get_or_render(
+            equipment.id,
+            self._build_counter_domain(equipment, kwargs),
+            filename,
+            use_cache=not kwargs.get('q'),
         )
-
-        filename = f"Lecturas_{self._get_equipment_filename_value(equipment)}.pdf"
+        if not pdf_content:
+            return request.not_found()
 
         headers = [
             ('Content-Type', 'application/pdf'),
@@ -684,16 +681,14 @@ class CopierCounterPortal(http.Controller):
         if not self._check_counter_access(counter):
             return request.not_found()
 
-        report_ref = self._get_report_ref()
-        request.env.ref(report_ref)
+        filename = f"Lectura_{counter.name or counter.id}.pdf"
 
-        pdf_content, _ = request.env['ir.actions.report'].sudo()._render_qweb_pdf(
-            report_ref,
-            res_ids=counter.ids,
+        pdf_content, _from_cache = Counter._portal_pdf_get_or_render(
+            counter.maquina_id.id,
+            [('id', '=', counter.id)],
+            filename,
         )
 
-        filename = f"Lectura_{counter.name or counter.id}.pdf"
-
         headers = [
             ('Content-Type', 'application/pdf'),
             ('Content-Disposition', http.content_disposition(filename)),
@@ -702,70 +697,66 @@ class CopierCounterPortal(http.Controller):
         return request.make_response(pdf_content, headers=headers)
 
     # -------------------------------------------------------------------------
-    # EXCEL – LECTURAS FILTRADAS DEL EQUIPO
+    # EXPORTACIÓN – COLUMNAS Y RESPUESTA DESDE ARCHIVO TEMPORAL
     # -------------------------------------------------------------------------
 
-    @http.route(
-        ['/my/copier/equipment/<int:equipment_id>/counters/xlsx'],
-        type='http',
-        auth='user',
-        website=True
-    )
-    def portal_counters_xlsx(self, equipment_id, **kwargs):
-        self._raise_if_no_download_permission()
-
-        equipment = self._get_equipment_for_portal(equipment_id)
-        if not equipment:
-            return request.not_found()
-
-        counters = self._get_counters_for_equipment(equipment, kwargs)
-        if not counters:
-            return request.not_found()
-
-        filter_values = self._get_filter_values(kwargs)
+    def _get_export_columns(self, equipment):
+        """
+        Columnas de la exportación Excel/CSV: (título, campo, tipo).
+        tipo: 'text' | 'center' | 'number'. Las columnas de color solo se
+        incluyen en equipos a color.
+        """
+        columns = [
+            ('Referencia', 'name', 'text'),
+            ('Fecha Lectura', 'fecha', 'center'),
+            ('Fecha Facturación', 'fecha_facturacion', 'center'),
+            ('Mes Facturación', 'mes_facturacion', 'center'),
+            ('Anterior B/N', 'contador_anterior_bn', 'number'),
+            ('Actual B/N', 'contador_actual_bn', 'number'),
+            ('Total B/N', 'total_copias_bn', 'number'),
+        ]
 
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        sheet = workbook.add_worksheet('Lecturas')
+        if equipment.tipo == 'color':
+            columns += [
+                ('Anterior Color', 'contador_anterior_color', 'number'),
+                ('Actual Color', 'contador_actual_color', 'number'),
+                ('Total Color', 'total_copias_color', 'number'),
+            ]
 
-        title_fmt = workbook.add_format({
-            'bold': True,
-            'font_size': 15,
-        })
-        subtitle_fmt = workbook.add_format({
-            'bold': True,
-            'font_size': 10,
-        })
-        header_fmt = workbook.add_format({
-            'bold': True,
-            'bg_color': '#F3F4F6',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-        })
-        text_center = workbook.add_format({
-            'align': 'center',
-            'valign': 'vcenter',
-        })
-        text_left = workbook.add_format({
-            'align': 'left',
-            'valign': 'vcenter',
-        })
-        num_fmt = workbook.add_format({
-            'num_format': '#,##0',
-            'align': 'right',
-            'valign': 'vcenter',
-        })
+        columns += [
+            ('Total General', False, 'number'),
+            ('Estado', 'state', 'center'),
+        ]
+        return columns
 
-        sheet.write(0, 0, 'Reporte de Lecturas', title_fmt)
-        sheet.write(1, 0, 'Cliente:', subtitle_fmt)
-        sheet.write(1, 1, equipment.cliente_id.display_name or '', text_left)
-        sheet.write(2, 0, 'Serie:', subtitle_fmt)
-        sheet.write(2, 1, equipment.serie_id or '', text_left)
-        sheet.write(3, 0, 'Ubicación:', subtitle_fmt)
-        sheet.write(3, 1, equipment.ubicacion or '', text_left)
+    def _iter_export_rows(self, equipment, kwargs=None):
+        """
+        Filas de la exportación en el orden del listado, leídas por bloques.
+        Retorna (columnas, generador de listas de valores).
+        """
+        columns = self._get_export_columns(equipment)
+        field_names = [field for _title, field, _kind in columns if field] + [
+            'total_copias_bn', 'total_copias_color',
+        ]
+        domain = self._build_counter_domain(equipment, kwargs)
 
-        sheet.write(4, 0, 'Filtros:', subtitle_fmt)
+        def rows():
+            for counter in request.env['copier.counter'].sudo()._portal_iter_counters(domain, field_names):
+                values = []
+                for _title, field, kind in columns:
+                    if not field:
+                        values.append((counter.total_copias_bn or 0) + (counter.total_copias_color or 0))
+                    elif kind == 'number':
+                        values.append(counter[field] or 0)
+                    else:
+                        value = counter[field]
+                        values.append(str(value) if value else '')
+                yield values
+
+        return columns, rows()
+
+    def _get_export_filters_text(self, kwargs=None):
+        filter_values = self._get_filter_values(kwargs)
         filtros_texto = []
         for key, label in [
             ('fecha_desde', 'Lectura desde'),
@@ -780,102 +771,203 @@ class CopierCounterPortal(http.Controller):
         ]:
             if filter_values.get(key):
                 filtros_texto.append(f'{label}: {filter_values.get(key)}')
+        return ' | '.join(filtros_texto) if filtros_texto else 'Sin filtros'
 
-        sheet.write(4, 1, ' | '.join(filtros_texto) if filtros_texto else 'Sin filtros', text_left)
-
-        row_header = 6
+    def _get_xlsx_max_rows(self):
+        """
+        Lecturas máximas para exportar en Excel; por encima se sirve el CSV.
+        Parámetro de sistema copier_company.portal_xlsx_max_rows (0 = sin límite).
+        """
+        value = request.env['ir.config_parameter'].sudo().get_param(
+            'copier_company.portal_xlsx_max_rows', '100000'
+        )
+        return self._parse_int(value) or 0
 
+    def _make_file_response(self, tmp_file, filename, content_type):
+        """
+        Envía un archivo temporal ya generado por bloques, sin cargarlo en memoria.
+        El archivo se cierra (y se elimina) al terminar la respuesta.
+        """
+        size = tmp_file.seek(0, io.SEEK_END)
+        tmp_file.seek(0)
         headers = [
-            'Referencia',
-            'Fecha Lectura',
-            'Fecha Facturación',
-            'Mes Facturación',
-            'Anterior B/N',
-            'Actual B/N',
-            'Total B/N',
-        ]
-
-        is_color = equipment.tipo == 'color'
-
-        if is_color:
-            headers += [
-                'Anterior Color',
-                'Actual Color',
-                'Total Color',
-            ]
-
-        headers += [
-            'Total General',
-            'Estado',
+            ('Content-Type', content_type),
+            ('Content-Length', str(size)),
+            ('Content-Disposition', http.content_disposition(filename)),
         ]
+        return Response(
+            wrap_file(request.httprequest.environ, tmp_file),
+            headers=headers,
+            direct_passthrough=True,
+        )
 
-        for col, title in enumerate(headers):
-            sheet.write(row_header, col, title, header_fmt)
-
-        row = row_header + 1
-
-        for counter in counters:
-            col = 0
-
-            total_general = (counter.total_copias_bn or 0) + (counter.total_copias_color or 0)
+    # -------------------------------------------------------------------------
+    # EXCEL – LECTURAS FILTRADAS DEL EQUIPO
+    # -------------------------------------------------------------------------
 
-            sheet.write(row, col, counter.name or '', text_left)
-            col += 1
+    @http.route(
+        ['/my/copier/equipment/<int:equipment_id>/counters/xlsx'],
+        type='http',
+        auth='user',
+        website=True
+    )
+    def portal_counters_xlsx(self, equipment_id, **kwargs):
+        """
+        Excel de las lecturas filtradas. Se escribe en modo constant_memory
+        sobre un archivo temporal (fila por fila, lecturas por bloques) y se
+        envía desde disco. Rangos muy grandes se redirigen al CSV.
+        """
+        self._raise_if_no_download_permission()
 
-            sheet.write(row, col, str(counter.fecha) if counter.fecha else '', text_center)
-            col += 1
+        equipment = self._get_equipment_for_portal(equipment_id)
+        if not equipment:
+            return request.not_found()
 
-            sheet.write(row, col, str(counter.fecha_facturacion) if counter.fecha_facturacion else '', text_center)
-            col += 1
+        domain = self._build_counter_domain(equipment, kwargs)
+        counter_count = request.env['copier.counter'].sudo().search_count(domain)
+        if not counter_count:
+            return request.not_found()
 
-            sheet.write(row, col, counter.mes_facturacion or '', text_center)
-            col += 1
+        max_rows = self._get_xlsx_max_rows()
+        if max_rows and counter_count > max_rows:
+            _logger.info(
+                "[PORTAL COUNTERS] Exportación de %s lecturas supera %s: se sirve CSV. equipment_id=%s",
+                counter_count, max_rows, equipment.id,
+            )
+            return request.redirect(self._get_url_with_filters(
+                f'/my/copier/equipment/{equipment.id}/counters/csv',
+                kwargs
+            ))
 
-            sheet.write_number(row, col, counter.contador_anterior_bn or 0, num_fmt)
-            col += 1
+        columns, rows = self._iter_export_rows(equipment, kwargs)
 
-            sheet.write_number(row, col, counter.contador_actual_bn or 0, num_fmt)
-            col += 1
+        tmp_file = tempfile.TemporaryFile()
+        try:
+            workbook = xlsxwriter.Workbook(tmp_file, {'constant_memory': True})
+            sheet = workbook.add_worksheet('Lecturas')
 
-            sheet.write_number(row, col, counter.total_copias_bn or 0, num_fmt)
-            col += 1
+            title_fmt = workbook.add_format({
+                'bold': True,
+                'font_size': 15,
+            })
+            subtitle_fmt = workbook.add_format({
+                'bold': True,
+                'font_size': 10,
+            })
+            header_fmt = workbook.add_format({
+                'bold': True,
+                'bg_color': '#F3F4F6',
+                'border': 1,
+                'align': 'center',
+                'valign': 'vcenter',
+            })
+            cell_formats = {
+                'center': workbook.add_format({
+                    'align': 'center',
+                    'valign': 'vcenter',
+                }),
+                'text': workbook.add_format({
+                    'align': 'left',
+                    'valign': 'vcenter',
+                }),
+                'number': workbook.add_format({
+                    'num_format': '#,##0',
+                    'align': 'right',
+                    'valign': 'vcenter',
+                }),
+            }
+
+            sheet.set_column(0, 0, 20)
+            sheet.set_column(1, 3, 18)
+            sheet.set_column(4, 12, 16)
+
+            # constant_memory: las filas se escriben estrictamente en orden
+            sheet.write(0, 0, 'Reporte de Lecturas', title_fmt)
+            sheet.write(1, 0, 'Cliente:', subtitle_fmt)
+            sheet.write(1, 1, equipment.cliente_id.display_name or '', cell_formats['text'])
+            sheet.write(2, 0, 'Serie:', subtitle_fmt)
+            sheet.write(2, 1, equipment.serie_id or '', cell_formats['text'])
+            sheet.write(3, 0, 'Ubicación:', subtitle_fmt)
+            sheet.write(3, 1, equipment.ubicacion or '', cell_formats['text'])
+            sheet.write(4, 0, 'Filtros:', subtitle_fmt)
+            sheet.write(4, 1, self._get_export_filters_text(kwargs), cell_formats['text'])
+
+            row_header = 6
+
+            for col, (title, _field, _kind) in enumerate(columns):
+                sheet.write(row_header, col, title, header_fmt)
+
+            row = row_header + 1
+            for values in rows:
+                for col, value in enumerate(values):
+                    kind = columns[col][2]
+                    if kind == 'number':
+                        sheet.write_number(row, col, value, cell_formats[kind])
+                    else:
+                        sheet.write(row, col, value, cell_formats[kind])
+                row += 1
+
+            sheet.freeze_panes(row_header + 1, 0)
+            sheet.autofilter(row_header, 0, row - 1, len(columns) - 1)
+
+            workbook.close()
+        except Exception:
+            tmp_file.close()
+            raise
 
-            if is_color:
-                sheet.write_number(row, col, counter.contador_anterior_color or 0, num_fmt)
-                col += 1
+        filename = f"Lecturas_{self._get_equipment_filename_value(equipment)}.xlsx"
 
-                sheet.write_number(row, col, counter.contador_actual_color or 0, num_fmt)
-                col += 1
+        return self._make_file_response(
+            tmp_file,
+            filename,
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
 
-                sheet.write_number(row, col, counter.total_copias_color or 0, num_fmt)
-                col += 1
+    # -------------------------------------------------------------------------
+    # CSV – LECTURAS FILTRADAS DEL EQUIPO (RANGOS GRANDES)
+    # -------------------------------------------------------------------------
 
-            sheet.write_number(row, col, total_general, num_fmt)
-            col += 1
+    @http.route(
+        ['/my/copier/equipment/<int:equipment_id>/counters/csv'],
+        type='http',
+        auth='user',
+        website=True
+    )
+    def portal_counters_csv(self, equipment_id, **kwargs):
+        """
+        CSV de las lecturas filtradas: sin formatos ni libro en memoria,
+        pensado para rangos de varios años. Separador ';' y BOM UTF-8 para
+        que Excel lo abra con tildes y columnas correctas.
+        """
+        self._raise_if_no_download_permission()
 
-            sheet.write(row, col, counter.state or '', text_center)
+        equipment = self._get_equipment_for_portal(equipment_id)
+        if not equipment:
+            return request.not_found()
 
-            row += 1
+        columns, rows = self._iter_export_rows(equipment, kwargs)
 
-        sheet.set_column(0, 0, 20)
-        sheet.set_column(1, 3, 18)
-        sheet.set_column(4, 12, 16)
-        sheet.freeze_panes(row_header + 1, 0)
-        sheet.autofilter(row_header, 0, row - 1, len(headers) - 1)
+        tmp_file = tempfile.TemporaryFile()
+        try:
+            text_file = io.TextIOWrapper(tmp_file, encoding='utf-8-sig', newline='')
+            writer = csv.writer(text_file, delimiter=';')
+            writer.writerow([title for title, _field, _kind in columns])
 
-        workbook.close()
+            row_count = 0
+            for values in rows:
+                writer.writerow(values)
+                row_count += 1
 
-        xlsx_data = output.getvalue()
-        output.close()
+            text_file.flush()
+            text_file.detach()
+        except Exception:
+            tmp_file.close()
+            raise
 
-        filename = f"Lecturas_{self._get_equipment_filename_value(equipment)}.xlsx"
+        if not row_count:
+            tmp_file.close()
+            return request.not_found()
 
-        headers_response = [
-            (
-                'Content-Type',
-                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            ),
-            ('Content-Disposition', http.content_disposition(filename)),
-        ]
+        filename = f"Lecturas_{self._get_equipment_filename_value(equipment)}.csv"
 
-        return request.make_response(xlsx_data, headers=headers_response)
\ No newline at end of file
+        return self._make_file_response(tmp_file, filename, 'text/csv; charset=utf-8')
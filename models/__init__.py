@@ -7,6 +7,9 @@ from . import pCloudModel
 from . import pcloud_folder_file
 from . import security_control
 from . import contadores
+from . import copier_counter_charts
+from . import copier_counter_pdf_cache
+from . import portal_access_scope
 from . import manuals
 from . import copier_stock
 from . import counter_web
@@ -18,9 +21,11 @@ from . import stock_move_inherit
 from . import copier_stock_extend
 from . import copier_whatsapp_alerts
 from . import copier_stock_whatsapp_extend
+from . import printtracker_device
 from . import printtracker_config
 from . import copier_soporte
 from . import whatsapp_config
+from . import whatsapp_outbox
 from . import whatsapp_service_notifications
 from . import whatsapp_send_quotation_wizard
 from . import whatsapp_quotation_phone_line
@@ -33,5 +38,6 @@ from . import copier_counter_add_wizard
 from . import account_move_send_wizard
 from . import copier_invoice_helper
 from . import copier_billing_group
+from . import copier_invoice_job
 from . import copier_company_billing_group
 from . import copier_counter_billing_group
\ No newline at end of file
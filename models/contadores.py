@@ -1,9 +1,13 @@
 from odoo import models, fields, api
+from collections import defaultdict
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from odoo.exceptions import UserError
 import calendar
 import logging
+
+from . import copier_billing_calc
+
 _logger = logging.getLogger(__name__)
 
 
@@ -211,6 +215,9 @@ class CopierCounter(models.Model):
                 'maquina_id.costo_copia_color')
     def _compute_precios_sin_igv(self):
         """Convierte los precios a su valor sin IGV manteniendo precisión completa"""
+        self.maquina_id.fetch([
+            'costo_copia_bn', 'costo_copia_color', 'precio_bn_incluye_igv', 'precio_color_incluye_igv',
+        ])
         for record in self:
             if record.maquina_id:
                 # Obtener precios de la máquina
@@ -218,8 +225,12 @@ class CopierCounter(models.Model):
                 precio_color = float(record.maquina_id.costo_copia_color or 0.0)
 
                 # Convertir a precio sin IGV si incluye IGV (manteniendo toda la precisión)
-                record.precio_bn_sin_igv = precio_bn / 1.18 if record.maquina_id.precio_bn_incluye_igv else precio_bn
-                record.precio_color_sin_igv = precio_color / 1.18 if record.maquina_id.precio_color_incluye_igv else precio_color
+                record.precio_bn_sin_igv = copier_billing_calc.precio_sin_igv(
+                    precio_bn, record.maquina_id.precio_bn_incluye_igv, 18.0
+                )
+                record.precio_color_sin_igv = copier_billing_calc.precio_sin_igv(
+                    precio_color, record.maquina_id.precio_color_incluye_igv, 18.0
+                )
             else:
                 record.precio_bn_sin_igv = 0.0
                 record.precio_color_sin_igv = 0.0
@@ -239,11 +250,19 @@ class CopierCounter(models.Model):
         if single_create:
             vals_list = [vals_list]
 
-        for vals in vals_list:
-            maquina = False
+        # Máquinas y últimas lecturas se cargan una sola vez para todo el lote
+        maquina_ids = {vals['maquina_id'] for vals in vals_list if vals.get('maquina_id')}
+        maquinas = {
+            m.id: m for m in self.env['copier.company'].browse(list(maquina_ids)).exists()
+        }
+        ids_sin_anterior = {
+            vals['maquina_id'] for vals in vals_list
+            if vals.get('maquina_id') in maquinas and not vals.get('contador_anterior_bn')
+        }
+        ultimos_contadores = self._get_last_confirmed_counters(ids_sin_anterior)
 
-            if vals.get('maquina_id'):
-                maquina = self.env['copier.company'].browse(vals.get('maquina_id')).exists()
+        for vals in vals_list:
+            maquina = maquinas.get(vals.get('maquina_id'), False)
 
             # ==========================================================
             # SNAPSHOT DEL CLIENTE
@@ -260,13 +279,9 @@ class CopierCounter(models.Model):
             # - incluye confirmed e invoiced
             # - solo busca si hay máquina
             if maquina and not vals.get('contador_anterior_bn'):
-                ultima_lectura = self.search([
-                    ('maquina_id', '=', maquina.id),
-                    ('state', 'in', ['confirmed', 'invoiced']),
-                ], limit=1, order='fecha desc, id desc')
-
-                vals['contador_anterior_bn'] = ultima_lectura.contador_actual_bn if ultima_lectura else 0
-                vals['contador_anterior_color'] = ultima_lectura.contador_actual_color if ultima_lectura else 0
+                anterior_bn, anterior_color = ultimos_contadores.get(maquina.id, (0, 0))
+                vals['contador_anterior_bn'] = anterior_bn
+                vals['contador_anterior_color'] = anterior_color
 
             # ==========================================================
             # SECUENCIA
@@ -277,6 +292,51 @@ class CopierCounter(models.Model):
         records = super(CopierCounter, self).create(vals_list)
 
         return records[0] if single_create else records
+
+    @api.model
+    def _get_last_confirmed_counters(self, maquina_ids):
+        """
+        Últimos contadores confirmados/facturados por máquina en una sola consulta.
+        Retorna {maquina_id: (contador_actual_bn, contador_actual_color)}.
+        """
+        if not maquina_ids:
+            return {}
+        self.flush_model(['maquina_id', 'state', 'fecha', 'contador_actual_bn', 'contador_actual_color'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (maquina_id) maquina_id, contador_actual_bn, contador_actual_color
+              FROM copier_counter
+             WHERE maquina_id IN %s
+               AND state IN ('confirmed', 'invoiced')
+          ORDER BY maquina_id, fecha DESC, id DESC
+        """, [tuple(maquina_ids)])
+        return {
+            maquina_id: (bn or 0, color or 0)
+            for maquina_id, bn, color in self.env.cr.fetchall()
+        }
+
+    @api.model
+    def _get_fecha_facturacion(self, fecha_base, dia_facturacion):
+        """
+        Próxima fecha de facturación a partir de fecha_base para un día de
+        facturación dado: ajusta a fin de mes, pasa al mes siguiente si ya
+        pasó y mueve los domingos al sábado.
+        """
+        ultimo_dia_mes = calendar.monthrange(fecha_base.year, fecha_base.month)[1]
+        dia = min(dia_facturacion, ultimo_dia_mes)
+        fecha_facturacion = fecha_base.replace(day=dia)
+
+        # Si ya pasó, mover al mes siguiente
+        if fecha_base > fecha_facturacion:
+            fecha_facturacion = fecha_facturacion + relativedelta(months=1)
+            ultimo_dia_mes_sig = calendar.monthrange(fecha_facturacion.year, fecha_facturacion.month)[1]
+            dia = min(dia_facturacion, ultimo_dia_mes_sig)
+            fecha_facturacion = fecha_facturacion.replace(day=dia)
+
+        # Si cae domingo, mover a sábado
+        if fecha_facturacion.weekday() == 6:
+            fecha_facturacion -= timedelta(days=1)
+
+        return fecha_facturacion
     @api.depends('fecha_facturacion', 'fecha_emision_factura')
     def _compute_mes_facturacion(self):
         meses = {
@@ -365,34 +425,9 @@ class CopierCounter(models.Model):
         # FECHA DE FACTURACIÓN
         # ==========================================================
         if self.maquina_id.dia_facturacion:
-            fecha_base = fields.Date.today()
-
-            # Último día del mes actual
-            ultimo_dia_mes = calendar.monthrange(fecha_base.year, fecha_base.month)[1]
-
-            # Día válido dentro del mes
-            dia = min(self.maquina_id.dia_facturacion, ultimo_dia_mes)
-
-            # Fecha tentativa en el mes actual
-            fecha_facturacion = fecha_base.replace(day=dia)
-
-            # Si ya pasó, mover al mes siguiente
-            if fecha_base > fecha_facturacion:
-                fecha_facturacion = fecha_facturacion + relativedelta(months=1)
-
-                ultimo_dia_mes_sig = calendar.monthrange(
-                    fecha_facturacion.year,
-                    fecha_facturacion.month
-                )[1]
-
-                dia = min(self.maquina_id.dia_facturacion, ultimo_dia_mes_sig)
-                fecha_facturacion = fecha_facturacion.replace(day=dia)
-
-            # Si cae domingo, mover a sábado
-            if fecha_facturacion.weekday() == 6:
-                fecha_facturacion -= timedelta(days=1)
-
-            self.fecha_facturacion = fecha_facturacion
+            self.fecha_facturacion = self._get_fecha_facturacion(
+                fields.Date.today(), self.maquina_id.dia_facturacion
+            )
 
     @api.depends('contador_actual_bn', 'contador_anterior_bn',
                 'contador_actual_color', 'contador_anterior_color')
@@ -405,23 +440,19 @@ class CopierCounter(models.Model):
                 'maquina_id.volumen_mensual_bn', 'maquina_id.volumen_mensual_color')
     def _compute_excesos(self):
         for record in self:
-            record.exceso_bn = max(0, record.total_copias_bn - (record.maquina_id.volumen_mensual_bn or 0))
-            record.exceso_color = max(0, record.total_copias_color - (record.maquina_id.volumen_mensual_color or 0))
+            record.exceso_bn = copier_billing_calc.copias_exceso(record.total_copias_bn, record.maquina_id.volumen_mensual_bn)
+            record.exceso_color = copier_billing_calc.copias_exceso(record.total_copias_color, record.maquina_id.volumen_mensual_color)
 
     @api.depends('total_copias_bn', 'total_copias_color',
                 'maquina_id.volumen_mensual_bn', 'maquina_id.volumen_mensual_color')
     def _compute_facturables(self):
         for record in self:
-            # Para B/N - siempre se factura al menos el volumen mensual
-            record.copias_facturables_bn = max(
-                record.total_copias_bn,
-                record.maquina_id.volumen_mensual_bn or 0
+            # Siempre se factura al menos el volumen mensual (B/N y Color)
+            record.copias_facturables_bn = copier_billing_calc.copias_facturables(
+                record.total_copias_bn, record.maquina_id.volumen_mensual_bn
             )
-            
-            # Para Color - igual que B/N, facturar al menos el volumen mensual
-            record.copias_facturables_color = max(
-                record.total_copias_color,
-                record.maquina_id.volumen_mensual_color or 0
+            record.copias_facturables_color = copier_billing_calc.copias_facturables(
+                record.total_copias_color, record.maquina_id.volumen_mensual_color
             )
     
     descuento_porcentaje = fields.Float(
@@ -433,10 +464,30 @@ class CopierCounter(models.Model):
     
 # PASO 3: AGREGAR este método compute en copier.counter:
 
+    @api.model
+    def _billing_trace_enabled(self):
+        """
+        Traza detallada de los cálculos de facturación (desactivada por defecto).
+        Se activa con la clave de contexto 'copier_billing_trace' o con el
+        parámetro de sistema 'copier_company.billing_trace'.
+        """
+        if 'copier_billing_trace' in self.env.context:
+            return bool(self.env.context['copier_billing_trace'])
+        param = self.env['ir.config_parameter'].sudo().get_param('copier_company.billing_trace', 'False')
+        return param.strip().lower() in ('1', 'true', 'yes')
+
+    @api.model
+    def _billing_trace_logger(self):
+        """Retorna _logger.info si la traza está activa, o una función vacía"""
+        if self._billing_trace_enabled():
+            return _logger.info
+        return lambda *args, **kwargs: None
+
     @api.depends('maquina_id', 'maquina_id.descuento')
     def _compute_descuento_desde_maquina(self):
-        """Obtiene el descuento de la máquina con logs para debugging"""
-        _logger.info("=== INICIANDO _compute_descuento_desde_maquina ===")
+        """Obtiene el descuento de la máquina (traza con copier_billing_trace)"""
+        trace = self._billing_trace_logger()
+        trace("=== INICIANDO _compute_descuento_desde_maquina ===")
         
         for record in self:
             try:
@@ -444,15 +495,15 @@ class CopierCounter(models.Model):
                     descuento_maquina = record.maquina_id.descuento or 0.0
                     record.descuento_porcentaje = descuento_maquina
                     
-                    _logger.info("Counter ID: %s - Descuento de máquina: %s%%", 
+                    trace("Counter ID: %s - Descuento de máquina: %s%%", 
                                record.id, descuento_maquina)
                     
                     if descuento_maquina == 0.0:
-                        _logger.warning("⚠️ La máquina %s no tiene descuento configurado", 
+                        trace("⚠️ La máquina %s no tiene descuento configurado", 
                                       record.maquina_id.secuencia)
                 else:
                     record.descuento_porcentaje = 0.0
-                    _logger.warning("⚠️ Counter sin máquina asociada")
+                    trace("⚠️ Counter sin máquina asociada")
                     
             except Exception as e:
                 _logger.exception("Error obteniendo descuento: %s", str(e))
@@ -562,174 +613,83 @@ class CopierCounter(models.Model):
     def _compute_totales(self):
         """
         Calcula totales usando la MISMA LÓGICA Y TIPO DE CÁLCULO que copier.company
+        (núcleo común copier_billing_calc).
+
+        La traza por registro solo se emite con copier_billing_trace activo
+        (ver _billing_trace_enabled).
         """
-        _logger.info("=== INICIANDO _compute_totales SINCRONIZADO COMPLETO ===")
-        
-        for record in self:
-            try:
-                _logger.info("Procesando counter ID: %s, Serie: %s", record.id, record.serie)
-                
-                if not record.maquina_id:
-                    _logger.warning("Counter sin máquina asociada")
-                    record._set_zero_values()
-                    continue
-                
-                # OBTENER TIPO DE CÁLCULO DE LA MÁQUINA
-                tipo_calculo = record.maquina_id.tipo_calculo or 'auto'
-                _logger.info("🎯 TIPO DE CÁLCULO DETECTADO: %s", tipo_calculo)
-                
-                # CALCULAR RENTAS SEGÚN EL MISMO TIPO QUE COMPANY
-                if tipo_calculo == 'auto':
-                    _logger.info(">>> APLICANDO CÁLCULO AUTOMÁTICO EN COUNTER")
-                    renta_bn = record.copias_facturables_bn * record.precio_bn_sin_igv
-                    renta_color = record.copias_facturables_color * record.precio_color_sin_igv
-                    _logger.info("- Renta B/N automática: %s × %s = %s", record.copias_facturables_bn, record.precio_bn_sin_igv, renta_bn)
-                    _logger.info("- Renta Color automática: %s × %s = %s", record.copias_facturables_color, record.precio_color_sin_igv, renta_color)
-                
-                elif tipo_calculo in ['manual_sin_igv_bn', 'manual_con_igv_bn']:
-                    _logger.info(">>> APLICANDO CÁLCULO MANUAL B/N EN COUNTER: %s", tipo_calculo)
-                    
-                    # B/N usa monto manual
-                    if tipo_calculo == 'manual_sin_igv_bn':
-                        renta_bn = record.maquina_id.monto_mensual_bn or 0
-                        _logger.info("- Renta B/N manual (sin IGV): %s", renta_bn)
-                    else:  # manual_con_igv_bn
-                        monto_con_igv = record.maquina_id.monto_mensual_bn or 0
-                        igv_rate = (record.maquina_id.igv or 18) / 100
-                        renta_bn = monto_con_igv / (1 + igv_rate)
-                        _logger.info("- Renta B/N manual (con IGV): %s / %s = %s", monto_con_igv, (1 + igv_rate), renta_bn)
-                    
-                    # Color sigue automático
-                    renta_color = record.copias_facturables_color * record.precio_color_sin_igv
-                    _logger.info("- Renta Color automática: %s × %s = %s", record.copias_facturables_color, record.precio_color_sin_igv, renta_color)
-                
-                elif tipo_calculo in ['manual_sin_igv_color', 'manual_con_igv_color']:
-                    _logger.info(">>> APLICANDO CÁLCULO MANUAL COLOR EN COUNTER: %s", tipo_calculo)
-                    
-                    # B/N sigue automático
-                    renta_bn = record.copias_facturables_bn * record.precio_bn_sin_igv
-                    _logger.info("- Renta B/N automática: %s × %s = %s", record.copias_facturables_bn, record.precio_bn_sin_igv, renta_bn)
-                    
-                    # Color usa monto manual
-                    if tipo_calculo == 'manual_sin_igv_color':
-                        renta_color = record.maquina_id.monto_mensual_color or 0
-                        _logger.info("- Renta Color manual (sin IGV): %s", renta_color)
-                    else:  # manual_con_igv_color
-                        monto_con_igv = record.maquina_id.monto_mensual_color or 0
-                        igv_rate = (record.maquina_id.igv or 18) / 100
-                        renta_color = monto_con_igv / (1 + igv_rate)
-                        _logger.info("- Renta Color manual (con IGV): %s / %s = %s", monto_con_igv, (1 + igv_rate), renta_color)
-                
-                elif tipo_calculo in ['manual_sin_igv_total', 'manual_con_igv_total']:
-                    _logger.info(">>> APLICANDO CÁLCULO MANUAL TOTAL EN COUNTER: %s", tipo_calculo)
-                    
-                    # Determinar monto total sin IGV
-                    if tipo_calculo == 'manual_sin_igv_total':
-                        monto_total = record.maquina_id.monto_mensual_total or 0
-                        _logger.info("- Monto total manual (sin IGV): %s", monto_total)
-                    else:  # manual_con_igv_total
-                        monto_con_igv = record.maquina_id.monto_mensual_total or 0
-                        igv_rate = (record.maquina_id.igv or 18) / 100
-                        monto_total = monto_con_igv / (1 + igv_rate)
-                        _logger.info("- Monto total manual (con IGV): %s / %s = %s", monto_con_igv, (1 + igv_rate), monto_total)
-                    
-                    # Distribuir proporcionalmente usando los costos unitarios
-                    volumen_total = record.copias_facturables_bn + record.copias_facturables_color
-                    
-                    if volumen_total > 0:
-                        # Calcular usando costos unitarios actuales
-                        costo_bn_base = record.copias_facturables_bn * record.precio_bn_sin_igv
-                        costo_color_base = record.copias_facturables_color * record.precio_color_sin_igv
-                        costo_total_base = costo_bn_base + costo_color_base
-                        
-                        if costo_total_base > 0:
-                            # Distribuir proporcionalmente
-                            factor = monto_total / costo_total_base
-                            renta_bn = costo_bn_base * factor
-                            renta_color = costo_color_base * factor
-                            _logger.info("- Distribución proporcional: factor=%s, B/N=%s, Color=%s", factor, renta_bn, renta_color)
-                        else:
-                            # Si no hay base, asignar todo a B/N
-                            renta_bn = monto_total
-                            renta_color = 0
-                            _logger.info("- Sin base de costos, asignando todo a B/N: %s", renta_bn)
-                    else:
-                        renta_bn = monto_total
-                        renta_color = 0
-                        _logger.info("- Sin volumen, asignando todo a B/N: %s", renta_bn)
-                
-                else:
-                    _logger.warning("Tipo de cálculo no reconocido: %s, usando automático", tipo_calculo)
-                    renta_bn = record.copias_facturables_bn * record.precio_bn_sin_igv
-                    renta_color = record.copias_facturables_color * record.precio_color_sin_igv
-                
-                # APLICAR LÓGICA DE TOTALES (igual que company)
-                _logger.info("=== CALCULANDO TOTALES FINALES ===")
-                
-                subtotal_antes_descuento = renta_bn + renta_color
-                record.subtotal_antes_descuento = subtotal_antes_descuento
-                
-                # Aplicar descuento
-                descuento_valor = subtotal_antes_descuento * (record.descuento_porcentaje / 100.0)
-                record.monto_descuento = descuento_valor
-                subtotal_con_descuento = subtotal_antes_descuento - descuento_valor
-                
-                _logger.info("- Subtotal antes descuento: %s", subtotal_antes_descuento)
-                _logger.info("- Descuento (%s%%): %s", record.descuento_porcentaje, descuento_valor)
-                _logger.info("- Subtotal con descuento: %s", subtotal_con_descuento)
-                
-                # Distribuir descuento proporcionalmente
-                if subtotal_antes_descuento > 0:
-                    factor_descuento = subtotal_con_descuento / subtotal_antes_descuento
-                    subtotal_bn_final = renta_bn * factor_descuento
-                    subtotal_color_final = renta_color * factor_descuento
-                else:
-                    subtotal_bn_final = 0
-                    subtotal_color_final = 0
-                
-                # Calcular IGV
-                igv_rate = (record.maquina_id.igv or 18) / 100.0
-                igv_bn = subtotal_bn_final * igv_rate
-                igv_color = subtotal_color_final * igv_rate
-                
-                # Totales finales
-                total_bn = subtotal_bn_final + igv_bn
-                total_color = subtotal_color_final + igv_color
-                
-                # Asignar valores
-                record.subtotal_bn = round(subtotal_bn_final, 2)
-                record.subtotal_color = round(subtotal_color_final, 2)
-                record.igv_bn = round(igv_bn, 2)
-                record.igv_color = round(igv_color, 2)
-                record.total_bn = round(total_bn, 2)
-                record.total_color = round(total_color, 2)
-                record.subtotal = round(subtotal_con_descuento, 2)
-                record.igv = round(igv_bn + igv_color, 2)
-                record.total = round(total_bn + total_color, 2)
-                
-                _logger.info("=== TOTALES FINALES SINCRONIZADOS ===")
-                _logger.info("- Subtotal: %s", record.subtotal)
-                _logger.info("- IGV: %s", record.igv)
-                _logger.info("- Total: %s", record.total)
-                
-                # VERIFICACIÓN FINAL
-                company_total = record.maquina_id.total_facturar_mensual
-                diferencia = abs(record.total - company_total)
-                _logger.info("=== VERIFICACIÓN FINAL ===")
-                _logger.info("- Company total: %s", company_total)
-                _logger.info("- Counter total: %s", record.total)
-                _logger.info("- Diferencia: %s", diferencia)
-                
+        trace_enabled = self._billing_trace_enabled()
+        trace = self._billing_trace_logger()
+        trace("=== INICIANDO _compute_totales SINCRONIZADO COMPLETO ===")
+
+        # Una sola lectura de los campos de precio de todas las máquinas
+        self.maquina_id.fetch([
+            'tipo_calculo', 'igv', 'monto_mensual_bn', 'monto_mensual_color', 'monto_mensual_total',
+        ])
+
+        sin_maquina = self.filtered(lambda r: not r.maquina_id)
+        for record in sin_maquina:
+            trace("Counter sin máquina asociada")
+            record._set_zero_values()
+
+        registros = self - sin_maquina
+        filas = [(
+            record.maquina_id.tipo_calculo or 'auto',
+            record.copias_facturables_bn,
+            record.copias_facturables_color,
+            record.precio_bn_sin_igv,
+            record.precio_color_sin_igv,
+            record.maquina_id.monto_mensual_bn,
+            record.maquina_id.monto_mensual_color,
+            record.maquina_id.monto_mensual_total,
+            record.descuento_porcentaje,
+            record.maquina_id.igv or 18,
+        ) for record in registros]
+
+        try:
+            resultados = copier_billing_calc.calcular_lote(filas)
+        except Exception:
+            # Una fila con datos inválidos no debe dejar en cero todo el lote:
+            # se recalcula fila por fila y solo la que falla queda en cero.
+            resultados = []
+            for record, fila in zip(registros, filas):
+                try:
+                    resultados.append(copier_billing_calc.calcular_lote([fila])[0])
+                except Exception as e:
+                    _logger.exception("Error en _compute_totales (counter %s): %s", record.id, str(e))
+                    resultados.append(None)
+
+        for record, importes in zip(registros, resultados):
+            if importes is None:
+                record._set_zero_values()
+                continue
+            record.subtotal_antes_descuento = importes['subtotal_antes_descuento']
+            record.monto_descuento = importes['monto_descuento']
+            record.subtotal_bn = round(importes['subtotal_bn'], 2)
+            record.subtotal_color = round(importes['subtotal_color'], 2)
+            record.igv_bn = round(importes['igv_bn'], 2)
+            record.igv_color = round(importes['igv_color'], 2)
+            record.total_bn = round(importes['total_bn'], 2)
+            record.total_color = round(importes['total_color'], 2)
+            record.subtotal = round(importes['subtotal'], 2)
+            record.igv = round(importes['igv'], 2)
+            record.total = round(importes['total'], 2)
+
+            if trace_enabled:
+                trace(
+                    "Counter %s (%s) tipo=%s: renta B/N=%s, renta Color=%s, descuento=%s, subtotal=%s, IGV=%s, total=%s",
+                    record.id, record.serie, record.maquina_id.tipo_calculo,
+                    importes['renta_bn'], importes['renta_color'], importes['monto_descuento'],
+                    record.subtotal, record.igv, record.total
+                )
+                # VERIFICACIÓN FINAL (solo en modo traza: evita leer totales de la máquina)
+                diferencia = abs(record.total - record.maquina_id.total_facturar_mensual)
                 if diferencia <= 0.01:
-                    _logger.info("✅ TOTALES PERFECTAMENTE SINCRONIZADOS!")
+                    trace("✅ TOTALES PERFECTAMENTE SINCRONIZADOS!")
                 else:
                     _logger.warning("⚠️ Pequeña diferencia: %s", diferencia)
-                
-            except Exception as e:
-                _logger.exception("Error en _compute_totales para counter ID %s: %s", record.id, str(e))
-                record._set_zero_values()
-        
-        _logger.info("=== FINALIZANDO _compute_totales SINCRONIZADO COMPLETO ===")
+
+        trace("=== FINALIZANDO _compute_totales SINCRONIZADO COMPLETO ===")
     
     def _set_zero_values(self):
         """Helper para asignar valores cero en caso de error"""
@@ -800,6 +760,15 @@ class CopierCounter(models.Model):
 
         Ahora guarda cliente_id como snapshot para que las lecturas históricas
         no cambien si la máquina retorna y luego se asigna a otro cliente.
+
+        Las máquinas mapeadas con PrintTracker se crean con el contador actual
+        real: los medidores se descargan una sola vez por corrida.
+
+        Trabaja por conjuntos: las fechas de facturación se calculan en Python,
+        las lecturas existentes y las últimas confirmadas se leen con una
+        consulta cada una y todas las lecturas nuevas se crean en un solo
+        create(). Si el lote falla se reintenta máquina por máquina para que
+        un error no bloquee al resto.
         """
 
         today = fields.Date.today()
@@ -809,87 +778,104 @@ class CopierCounter(models.Model):
             ('dia_facturacion', '!=', False)
         ])
 
-        for machine in machines:
+        # Máquinas cuya fecha de facturación es hoy
+        def factura_hoy(machine):
             try:
-                # Calcular fecha de facturación segura
-                ultimo_dia_mes = calendar.monthrange(today.year, today.month)[1]
-                dia = min(machine.dia_facturacion, ultimo_dia_mes)
-                fecha_facturacion = today.replace(day=dia)
-
-                # Ajustar al mes siguiente si ya pasó
-                if today > fecha_facturacion:
-                    fecha_facturacion = fecha_facturacion + relativedelta(months=1)
-
-                    ultimo_dia_mes_sig = calendar.monthrange(
-                        fecha_facturacion.year,
-                        fecha_facturacion.month
-                    )[1]
-
-                    dia = min(machine.dia_facturacion, ultimo_dia_mes_sig)
-                    fecha_facturacion = fecha_facturacion.replace(day=dia)
-
-                # Si cae domingo, mover al sábado
-                if fecha_facturacion.weekday() == 6:
-                    fecha_facturacion -= timedelta(days=1)
-
-                crear_hoy = today == fecha_facturacion
-
-                # Evitar duplicado por máquina y fecha de facturación
-                existing_reading = self.env['copier.counter'].search([
-                    ('maquina_id', '=', machine.id),
-                    ('fecha_facturacion', '=', fecha_facturacion)
-                ], limit=1)
-
-                if existing_reading:
-                    _logger.info(
-                        "Ya existe lectura para la máquina %s en fecha %s",
-                        machine.serie_id,
-                        fecha_facturacion
-                    )
-                    continue
-
-                if crear_hoy:
-                    ultima_lectura = self.env['copier.counter'].search([
-                        ('maquina_id', '=', machine.id),
-                        ('state', 'in', ['confirmed', 'invoiced'])
-                    ], limit=1, order='fecha desc, id desc')
-
-                    contador_anterior_bn = ultima_lectura.contador_actual_bn if ultima_lectura else 0
-                    contador_anterior_color = ultima_lectura.contador_actual_color if ultima_lectura else 0
-
-                    vals = {
-                        'maquina_id': machine.id,
-                        'cliente_id': machine.cliente_id.id or False,
-                        'fecha': today,
-                        'fecha_facturacion': fecha_facturacion,
-                        'fecha_emision_factura': False,
-                        'contador_anterior_bn': contador_anterior_bn,
-                        'contador_anterior_color': contador_anterior_color,
-                        'contador_actual_bn': contador_anterior_bn,
-                        'contador_actual_color': contador_anterior_color,
-                        'state': 'draft',
-                    }
-
-                    with self.env.cr.savepoint():
-                        self.env['copier.counter'].create(vals)
-
-                    _logger.info(
-                        "Creada nueva lectura para máquina %s, cliente %s, fecha de facturación %s",
-                        machine.serie_id,
-                        machine.cliente_id.display_name if machine.cliente_id else 'Sin cliente',
-                        fecha_facturacion
-                    )
+                return self._get_fecha_facturacion(today, machine.dia_facturacion) == today
+            except Exception as e:
+                _logger.exception("Error al procesar máquina %s: %s", machine.serie_id, str(e))
+                return False
 
+        maquinas_hoy = machines.filtered(factura_hoy)
+
+        if not maquinas_hoy:
+            return True
+
+        # Evitar duplicado por máquina y fecha de facturación (una consulta)
+        existentes = {
+            maquina.id
+            for [maquina] in self._read_group(
+                [('maquina_id', 'in', maquinas_hoy.ids), ('fecha_facturacion', '=', today)],
+                ['maquina_id'],
+            )
+        }
+        if existentes:
+            _logger.info("Ya existe lectura para %s máquinas en fecha %s", len(existentes), today)
+
+        maquinas_nuevas = maquinas_hoy.filtered(lambda m: m.id not in existentes)
+        if not maquinas_nuevas:
+            return True
+
+        ultimos_contadores = self._get_last_confirmed_counters(maquinas_nuevas.ids)
+        meters_index = None
+        maquinas_pt = self.env['copier.company']
+
+        vals_list = []
+        for machine in maquinas_nuevas:
+            try:
+                contador_anterior_bn, contador_anterior_color = ultimos_contadores.get(machine.id, (0, 0))
+                vals = {
+                    'maquina_id': machine.id,
+                    'cliente_id': machine.cliente_id.id or False,
+                    'fecha': today,
+                    'fecha_facturacion': today,
+                    'fecha_emision_factura': False,
+                    'contador_anterior_bn': contador_anterior_bn,
+                    'contador_anterior_color': contador_anterior_color,
+                    'contador_actual_bn': contador_anterior_bn,
+                    'contador_actual_color': contador_anterior_color,
+                    'state': 'draft',
+                }
+
+                if machine.pt_device_id:
+                    if meters_index is None:
+                        meters_index = self._get_printtracker_meters_index()
+                    if self._prefill_vals_from_printtracker(vals, meters_index.get(machine.pt_device_id)):
+                        maquinas_pt |= machine
+
+                vals_list.append(vals)
             except Exception as e:
-                _logger.exception(
-                    "Error al procesar máquina %s: %s",
-                    machine.serie_id,
-                    str(e)
-                )
-                continue
+                _logger.exception("Error al procesar máquina %s: %s", machine.serie_id, str(e))
+
+        creadas = self._create_readings_isolated(vals_list)
 
+        if maquinas_pt:
+            maquinas_pt.write({'pt_last_sync': fields.Datetime.now()})
+            _logger.info("Lecturas pre-llenadas desde PrintTracker: %s", len(maquinas_pt))
+
+        _logger.info(
+            "Lecturas mensuales: %s máquinas con facturación hoy, %s ya existentes, %s creadas",
+            len(maquinas_hoy), len(existentes), len(creadas)
+        )
         return True
 
+    @api.model
+    def _create_readings_isolated(self, vals_list):
+        """
+        Crea todas las lecturas en un solo create(). Si el lote falla, las
+        crea una por una en savepoints para aislar a las máquinas con error.
+        """
+        if not vals_list:
+            return self.browse()
+        # create() completa los dicts recibidos (p. ej. `name` desde la
+        # secuencia no_gap); los reintentos parten de copias sin tocar para
+        # que cada lectura vuelva a pedir su propio número.
+        originales = [dict(vals) for vals in vals_list]
+        try:
+            with self.env.cr.savepoint():
+                return self.create(vals_list)
+        except Exception as e:
+            _logger.warning("Fallo la creación en lote de lecturas (%s), se reintenta una por una", e)
+
+        creadas = self.browse()
+        for vals in originales:
+            try:
+                with self.env.cr.savepoint():
+                    creadas |= self.create(dict(vals))
+            except Exception as e:
+                _logger.exception("Error al crear lectura para máquina %s: %s", vals.get('maquina_id'), str(e))
+        return creadas
+
     def _get_next_reading_date(self):
         """
         Calcula la próxima fecha de lectura/facturación para una máquina
@@ -1175,31 +1161,16 @@ class CopierCounter(models.Model):
                 '\n'.join([f"- {r.name} ({r.state})" for r in registros_invalidos])
             )
         
-        # Agrupar por cliente
-        lecturas_por_cliente = {}
+        # Agrupar por cliente (por ids, sin uniones repetidas de recordsets)
+        ids_por_cliente = defaultdict(list)
         for record in self:
-            cliente_id = record.cliente_id.id
-            if cliente_id not in lecturas_por_cliente:
-                lecturas_por_cliente[cliente_id] = self.env['copier.counter']
-            lecturas_por_cliente[cliente_id] |= record
-        
-        facturas_creadas = []
-        errores = []
-        
-        # Crear una factura por cada cliente
-        for cliente_id, lecturas in lecturas_por_cliente.items():
-            try:
-                factura = self._crear_factura_consolidada(lecturas)
-                if factura:
-                    facturas_creadas.append({
-                        'factura': factura,
-                        'lecturas': lecturas,
-                        'cliente': lecturas[0].cliente_id.name
-                    })
-            except Exception as e:
-                cliente_name = lecturas[0].cliente_id.name
-                errores.append(f"{cliente_name}: {str(e)}")
-                _logger.exception(f"Error creando factura para cliente {cliente_name}")
+            ids_por_cliente[record.cliente_id.id].append(record.id)
+
+        resultado = self._crear_facturas_consolidadas_lote(
+            [self.browse(ids) for ids in ids_por_cliente.values()]
+        )
+        facturas_creadas = resultado['facturas']
+        errores = resultado['errores']
         
         # Preparar mensaje de resultado
         if facturas_creadas:
@@ -1230,7 +1201,7 @@ class CopierCounter(models.Model):
         }
         
         # Si solo hay una factura, abrir directamente
-        if len(facturas_creadas) == 1:
+        if len(facturas_creadas) == 1 and not errores:
             return {
                 'name': 'Factura Creada',
                 'type': 'ir.actions.act_window',
@@ -1241,7 +1212,7 @@ class CopierCounter(models.Model):
             }
         
         # Si hay múltiples, mostrar lista de facturas creadas
-        if facturas_creadas:
+        if facturas_creadas and not errores:
             factura_ids = [item['factura'].id for item in facturas_creadas]
             return {
                 'name': 'Facturas Creadas',
@@ -1254,12 +1225,76 @@ class CopierCounter(models.Model):
         
         return notification
 
+    def action_queue_invoice_job(self):
+        """Encola la facturación consolidada en un trabajo de segundo plano"""
+        if not self:
+            raise UserError('No se han seleccionado registros para facturar.')
+        job = self.env['copier.invoice.job'].create_from_counters(self)
+        return job._action_open()
+
+    def _crear_facturas_consolidadas_lote(self, grupos_lecturas):
+        """
+        Facturación consolidada en lote.
 
-    def _crear_factura_consolidada(self, lecturas):
-        """Crea una factura consolidada para múltiples lecturas del mismo cliente"""
-        
-        if not lecturas:
-            return False
+        Prepara los valores de todas las facturas, las crea con un solo
+        create(vals_list), marca todas las lecturas como facturadas con una
+        sola escritura y registra el chatter en lote. Un cliente con error se
+        reporta en 'errores' sin deshacer los demás.
+
+        Retorna {'facturas': [{'factura', 'lecturas', 'cliente'}], 'errores': [str],
+        'fallidos': [(lecturas, mensaje)]}.
+        """
+        errores = []
+        fallidos = []
+        preparados = []
+        for lecturas in grupos_lecturas:
+            try:
+                invoice_vals, resumen = self._prepare_factura_consolidada_vals(lecturas)
+                preparados.append((lecturas, invoice_vals, resumen))
+            except Exception as e:
+                cliente_name = lecturas[0].cliente_id.name
+                errores.append(f"{cliente_name}: {str(e)}")
+                fallidos.append((lecturas, str(e)))
+                _logger.exception(f"Error preparando factura para cliente {cliente_name}")
+
+        creados = []
+        if preparados:
+            try:
+                with self.env.cr.savepoint():
+                    invoices = self.env['account.move'].create([vals for _l, vals, _r in preparados])
+                creados = [
+                    (lecturas, invoice, resumen)
+                    for (lecturas, _vals, resumen), invoice in zip(preparados, invoices)
+                ]
+            except Exception as e:
+                _logger.warning("Fallo la creación en lote de facturas (%s), se reintenta por cliente", e)
+                for lecturas, vals, resumen in preparados:
+                    try:
+                        with self.env.cr.savepoint():
+                            invoice = self.env['account.move'].create(vals)
+                        creados.append((lecturas, invoice, resumen))
+                    except Exception as e:
+                        cliente_name = lecturas[0].cliente_id.name
+                        errores.append(f"{cliente_name}: {str(e)}")
+                        fallidos.append((lecturas, str(e)))
+                        _logger.exception(f"Error creando factura para cliente {cliente_name}")
+
+        self._finalizar_facturas_consolidadas(creados)
+
+        return {
+            'facturas': [
+                {'factura': invoice, 'lecturas': lecturas, 'cliente': lecturas[0].cliente_id.name}
+                for lecturas, invoice, _resumen in creados
+            ],
+            'errores': errores,
+            'fallidos': fallidos,
+        }
+
+    def _prepare_factura_consolidada_vals(self, lecturas):
+        """
+        Valores de una factura consolidada (con sus líneas) para lecturas del
+        mismo cliente. Retorna (invoice_vals, resumen_para_chatter).
+        """
         
         # Usar la primera lectura como referencia
         primera_lectura = lecturas[0]
@@ -1298,24 +1333,13 @@ class CopierCounter(models.Model):
         # Obtener término de pago (usar el de la primera lectura)
         payment_term = primera_lectura.payment_term_id
         
-        # Crear factura
-        invoice_vals = {
-            'partner_id': cliente.id,
-            'move_type': 'out_invoice',
-            'invoice_date': fecha_para_factura,
-            'invoice_payment_term_id': payment_term.id if payment_term else False,
-            'invoice_origin': ', '.join(lecturas.mapped('name')),
-        }
-        
-        invoice = self.env['account.move'].create(invoice_vals)
-        
-        # Crear líneas de factura para cada lectura
+        # Líneas de factura para cada lectura
         invoice_lines = []
         total_copias_bn = 0
         total_copias_color = 0
         total_equipos = 0
         
-        for lectura in lecturas.sorted(key=lambda l: l.serie):
+        for lectura in lecturas.sorted(key=lambda l: l.serie or ''):
             modelo_maquina = lectura.maquina_id.name.name if lectura.maquina_id.name else 'N/A'
             info_maquina = f"Modelo: {modelo_maquina} - Serie: {lectura.serie}"
             
@@ -1327,8 +1351,7 @@ class CopierCounter(models.Model):
                     f'{lectura.mes_facturacion}\n{info_maquina}'
                 )
                 
-                line_vals_bn = {
-                    'move_id': invoice.id,
+                invoice_lines.append((0, 0, {
                     'product_id': lectura.producto_facturable_bn_id.id,
                     'name': descripcion_bn,
                     'quantity': 1,
@@ -1337,8 +1360,7 @@ class CopierCounter(models.Model):
                         lectura.producto_facturable_bn_id.property_account_income_id.id or 
                         lectura.producto_facturable_bn_id.categ_id.property_account_income_categ_id.id
                     ),
-                }
-                invoice_lines.append((0, 0, line_vals_bn))
+                }))
                 total_copias_bn += lectura.copias_facturables_bn
                 total_equipos += 1
             
@@ -1350,8 +1372,7 @@ class CopierCounter(models.Model):
                     f'{lectura.mes_facturacion}\n{info_maquina}'
                 )
                 
-                line_vals_color = {
-                    'move_id': invoice.id,
+                invoice_lines.append((0, 0, {
                     'product_id': lectura.producto_facturable_color_id.id,
                     'name': descripcion_color,
                     'quantity': 1,
@@ -1360,29 +1381,20 @@ class CopierCounter(models.Model):
                         lectura.producto_facturable_color_id.property_account_income_id.id or 
                         lectura.producto_facturable_color_id.categ_id.property_account_income_categ_id.id
                     ),
-                }
-                invoice_lines.append((0, 0, line_vals_color))
+                }))
                 total_copias_color += lectura.copias_facturables_color
         
         if not invoice_lines:
-            invoice.unlink()
             raise UserError('No se pudieron crear líneas de factura para ninguna lectura.')
         
-        # Asignar líneas a la factura
-        invoice.write({'invoice_line_ids': invoice_lines})
-        
-        # Marcar lecturas como facturadas
-        lecturas.write({'state': 'invoiced'})
-        
-        # Agregar nota en el chatter de cada lectura
-        for lectura in lecturas:
-            lectura.message_post(
-                body=f'Incluido en factura consolidada: {invoice.name}\n'
-                    f'- B/N: {lectura.copias_facturables_bn} copias = S/ {lectura.total_bn:.2f}\n'
-                    f'- Color: {lectura.copias_facturables_color} copias = S/ {lectura.total_color:.2f}\n'
-                    f'- Subtotal equipo: S/ {lectura.total:.2f}',
-                message_type='notification'
-            )
+        invoice_vals = {
+            'partner_id': cliente.id,
+            'move_type': 'out_invoice',
+            'invoice_date': fecha_para_factura,
+            'invoice_payment_term_id': payment_term.id if payment_term else False,
+            'invoice_origin': ', '.join(lecturas.mapped('name')),
+            'invoice_line_ids': invoice_lines,
+        }
         
         # Nota en la factura
         resumen = f'''
@@ -1394,13 +1406,45 @@ class CopierCounter(models.Model):
     {chr(10).join([f'• {l.serie} ({l.mes_facturacion})' for l in lecturas])}
     '''
         
-        invoice.message_post(
-            body=resumen,
-            message_type='notification'
-        )
-        
-        _logger.info(f"Factura consolidada {invoice.name} creada para cliente {cliente.name} con {len(lecturas)} lecturas")
+        return invoice_vals, resumen
+
+    def _finalizar_facturas_consolidadas(self, creados):
+        """
+        Marca como facturadas todas las lecturas de `creados` (lista de
+        (lecturas, factura, resumen)) con una sola escritura y registra las
+        notas de chatter de lecturas y facturas en lote.
+        """
+        if not creados:
+            return
+
+        lecturas_facturadas = self.browse([lid for lecturas, _inv, _r in creados for lid in lecturas.ids])
+        lecturas_facturadas.write({'state': 'invoiced'})
+
+        notas_lecturas = {}
+        notas_facturas = {}
+        for lecturas, invoice, resumen in creados:
+            notas_facturas[invoice.id] = resumen
+            for lectura in lecturas:
+                notas_lecturas[lectura.id] = (
+                    f'Incluido en factura consolidada: {invoice.name}\n'
+                    f'- B/N: {lectura.copias_facturables_bn} copias = S/ {lectura.total_bn:.2f}\n'
+                    f'- Color: {lectura.copias_facturables_color} copias = S/ {lectura.total_color:.2f}\n'
+                    f'- Subtotal equipo: S/ {lectura.total:.2f}'
+                )
+            _logger.info(f"Factura consolidada {invoice.name} creada para cliente {lecturas[0].cliente_id.name} con {len(lecturas)} lecturas")
+
+        lecturas_facturadas._message_log_batch(bodies=notas_lecturas)
+        self.env['account.move'].browse(list(notas_facturas))._message_log_batch(bodies=notas_facturas)
+
+    def _crear_factura_consolidada(self, lecturas):
+        """Crea una factura consolidada para múltiples lecturas del mismo cliente"""
         
+        if not lecturas:
+            return False
+
+        invoice_vals, resumen = self._prepare_factura_consolidada_vals(lecturas)
+        invoice = self.env['account.move'].create(invoice_vals)
+        self._finalizar_facturas_consolidadas([(lecturas, invoice, resumen)])
         return invoice
 
         
@@ -1495,7 +1539,15 @@ class CopierCounterUserDetail(models.Model):
         'copier.counter',
         string='Contador General',
         required=True,
-        ondelete='cascade'
+        ondelete='cascade',
+        index=True
+    )
+    fecha_facturacion = fields.Date(
+        related='contador_id.fecha_facturacion',
+        string='Fecha de Facturación',
+        store=True,
+        index=True,
+        help="Permite agrupar el detalle por mes en los gráficos del portal."
     )
     tipo_maquina = fields.Selection(
         related='contador_id.maquina_id.tipo',
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo de cálculo de facturación (renta, exceso, descuento e IGV).
+
+Funciones puras sin ORM: reciben números y devuelven números, de modo que
+copier.company, copier.counter y copier.billing.group comparten exactamente
+la misma lógica y un recálculo masivo se hace en una sola pasada sobre
+tuplas, sin acceder campo por campo a los registros.
+"""
+
+TIPOS_MANUAL_BN = ('manual_sin_igv_bn', 'manual_con_igv_bn')
+TIPOS_MANUAL_COLOR = ('manual_sin_igv_color', 'manual_con_igv_color')
+TIPOS_MANUAL_TOTAL = ('manual_sin_igv_total', 'manual_con_igv_total')
+TIPOS_CON_IGV = ('manual_con_igv_bn', 'manual_con_igv_color', 'manual_con_igv_total')
+
+
+def precio_sin_igv(precio, incluye_igv, igv_pct):
+    """Quita el IGV de un precio si lo incluye"""
+    precio = precio or 0.0
+    if incluye_igv:
+        return precio / (1 + (igv_pct / 100.0))
+    return precio
+
+
+def copias_exceso(total_copias, volumen):
+    """Copias que exceden el volumen contratado"""
+    return max(0, total_copias - (volumen or 0))
+
+
+def copias_facturables(total_copias, volumen):
+    """Copias a facturar: siempre al menos el volumen contratado"""
+    return max(total_copias, volumen or 0)
+
+
+def calcular_rentas(tipo_calculo, volumen_bn, volumen_color, base_bn, base_color,
+                    monto_bn, monto_color, monto_total, igv_pct):
+    """
+    Renta B/N y Color sin IGV según el tipo de cálculo.
+
+    `base_bn`/`base_color` son los costos automáticos ya sin IGV
+    (volumen × precio unitario sin IGV). Los montos manuales se usan
+    según `tipo_calculo`; los marcados "con IGV" se dividen entre (1 + IGV).
+    Retorna (renta_bn, renta_color).
+    """
+    divisor_igv = 1 + (igv_pct / 100.0)
+
+    if tipo_calculo in TIPOS_MANUAL_BN:
+        renta_bn = monto_bn or 0
+        if tipo_calculo in TIPOS_CON_IGV:
+            renta_bn = renta_bn / divisor_igv
+        return renta_bn, base_color
+
+    if tipo_calculo in TIPOS_MANUAL_COLOR:
+        renta_color = monto_color or 0
+        if tipo_calculo in TIPOS_CON_IGV:
+            renta_color = renta_color / divisor_igv
+        return base_bn, renta_color
+
+    if tipo_calculo in TIPOS_MANUAL_TOTAL:
+        monto = monto_total or 0
+        if tipo_calculo in TIPOS_CON_IGV:
+            monto = monto / divisor_igv
+        # Distribuir proporcionalmente usando los costos unitarios
+        costo_total_base = base_bn + base_color
+        if (volumen_bn + volumen_color) > 0 and costo_total_base > 0:
+            factor = monto / costo_total_base
+            return base_bn * factor, base_color * factor
+        # Sin volumen o sin base de costos: todo a B/N
+        return monto, 0
+
+    # 'auto' y tipos no reconocidos
+    return base_bn, base_color
+
+
+def calcular_totales(renta_bn, renta_color, descuento_pct, igv_pct):
+    """
+    Aplica descuento e IGV a las rentas y los distribuye entre B/N y Color.
+    Retorna un dict con todos los importes sin redondear.
+    """
+    subtotal_antes_descuento = renta_bn + renta_color
+    monto_descuento = subtotal_antes_descuento * ((descuento_pct or 0.0) / 100.0)
+    subtotal = subtotal_antes_descuento - monto_descuento
+
+    # Distribuir descuento proporcionalmente
+    if subtotal_antes_descuento > 0:
+        factor_descuento = subtotal / subtotal_antes_descuento
+        subtotal_bn = renta_bn * factor_descuento
+        subtotal_color = renta_color * factor_descuento
+    else:
+        subtotal_bn = 0.0
+        subtotal_color = 0.0
+
+    igv_rate = igv_pct / 100.0
+    igv_bn = subtotal_bn * igv_rate
+    igv_color = subtotal_color * igv_rate
+    total_bn = subtotal_bn + igv_bn
+    total_color = subtotal_color + igv_color
+
+    return {
+        'renta_bn': renta_bn,
+        'renta_color': renta_color,
+        'subtotal_antes_descuento': subtotal_antes_descuento,
+        'monto_descuento': monto_descuento,
+        'subtotal': subtotal,
+        'subtotal_bn': subtotal_bn,
+        'subtotal_color': subtotal_color,
+        'igv_bn': igv_bn,
+        'igv_color': igv_color,
+        'igv': igv_bn + igv_color,
+        'total_bn': total_bn,
+        'total_color': total_color,
+        'total': total_bn + total_color,
+    }
+
+
+def calcular_lote(filas):
+    """
+    Calcula los importes de muchas filas en una sola pasada.
+
+    Cada fila es una tupla:
+        (tipo_calculo, volumen_bn, volumen_color, precio_bn_sin_igv,
+         precio_color_sin_igv, monto_bn, monto_color, monto_total,
+         descuento_pct, igv_pct)
+
+    donde los volúmenes son las copias a cobrar (volumen contratado en
+    copier.company, copias facturables en copier.counter).
+    Retorna una lista de dicts en el mismo orden (ver calcular_totales).
+    """
+    resultados = []
+    for (tipo_calculo, volumen_bn, volumen_color, precio_bn, precio_color,
+         monto_bn, monto_color, monto_total, descuento_pct, igv_pct) in filas:
+        renta_bn, renta_color = calcular_rentas(
+            tipo_calculo or 'auto', volumen_bn, volumen_color,
+            volumen_bn * precio_bn, volumen_color * precio_color,
+            monto_bn, monto_color, monto_total, igv_pct
+        )
+        resultados.append(calcular_totales(renta_bn, renta_color, descuento_pct, igv_pct))
+    return resultados
+
+
+def calcular_bolsa_compartida(total_bn, total_color, volumen_bn, volumen_color, cobrar_color_real):
+    """
+    Bolsa compartida de un grupo de facturación.
+    Retorna (exceso_bn, color_facturable).
+    """
+    exceso_bn = copias_exceso(total_bn, volumen_bn)
+    if cobrar_color_real:
+        color_facturable = total_color
+    else:
+        color_facturable = copias_facturables(total_color, volumen_color)
+    return exceso_bn, color_facturable
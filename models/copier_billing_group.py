@@ -4,6 +4,8 @@ import logging
 from odoo import models, fields, api
 from odoo.exceptions import UserError, ValidationError
 
+from . import copier_billing_calc
+
 _logger = logging.getLogger(__name__)
 
 
@@ -193,10 +195,7 @@ class CopierBillingGroup(models.Model):
 
     def _precio_sin_igv(self, precio, incluye_igv):
         self.ensure_one()
-        precio = precio or 0.0
-        if incluye_igv:
-            return precio / (1 + ((self.igv or 18.0) / 100.0))
-        return precio
+        return copier_billing_calc.precio_sin_igv(precio, incluye_igv, self.igv or 18.0)
 
     def _get_lecturas_confirmadas(self):
         self.ensure_one()
@@ -242,6 +241,13 @@ class CopierBillingGroup(models.Model):
             'target': 'current',
         }
 
+    def action_queue_group_invoice(self):
+        """Encola la factura de los grupos seleccionados en un trabajo de segundo plano"""
+        if not self:
+            raise UserError('No se han seleccionado grupos para facturar.')
+        job = self.env['copier.invoice.job'].create_from_billing_groups(self)
+        return job._action_open()
+
     def action_create_group_invoice(self):
         self.ensure_one()
 
@@ -254,13 +260,13 @@ class CopierBillingGroup(models.Model):
         total_color = sum(lecturas.mapped('total_copias_color'))
 
         volumen_bn_incluido = self.volumen_mensual_bn or 0
-        exceso_bn = max(0, total_bn - volumen_bn_incluido)
-
-        if self.cobrar_color_real:
-            color_facturable = total_color
-        else:
-            volumen_color_incluido = self.volumen_mensual_color or 0
-            color_facturable = max(total_color, volumen_color_incluido)
+        exceso_bn, color_facturable = copier_billing_calc.calcular_bolsa_compartida(
+            total_bn,
+            total_color,
+            volumen_bn_incluido,
+            self.volumen_mensual_color,
+            self.cobrar_color_real,
+        )
 
         precio_bn_sin_igv = self._precio_sin_igv(
             self.costo_copia_bn,
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Agregaciones en SQL y paginación para las lecturas del portal.
+
+Los controladores del portal piden aquí los totales por mes, usuario y
+máquina (_read_group) en lugar de cargar cada lectura y cada detalle por
+usuario en Python; el resultado se arma igual que antes a partir de pocas
+filas agrupadas. El listado se sirve por páginas de tamaño fijo y las
+exportaciones recorren las lecturas por bloques.
+"""
+
+from odoo import models, api
+from odoo.tools import SQL
+
+# Orden y tamaño de página del listado de lecturas del portal
+PORTAL_COUNTER_ORDER = 'fecha_facturacion desc, fecha desc, id desc'
+PORTAL_PAGE_SIZE = 50
+# Lecturas leídas por bloque en las exportaciones (Excel / CSV)
+PORTAL_EXPORT_CHUNK = 1000
+
+
+class CopierCounter(models.Model):
+    _inherit = 'copier.counter'
+
+    @api.model
+    def _portal_counter_page(self, domain, offset=0, limit=PORTAL_PAGE_SIZE):
+        """
+        Una página del listado de lecturas del portal.
+        Retorna (lecturas, offset siguiente o False si no hay más).
+        """
+        offset = max(int(offset or 0), 0)
+        counters = self.search(domain, order=PORTAL_COUNTER_ORDER, offset=offset, limit=limit + 1)
+        if len(counters) > limit:
+            return counters[:limit], offset + limit
+        return counters, False
+
+    @api.model
+    def _portal_iter_counters(self, domain, field_names, chunk_size=PORTAL_EXPORT_CHUNK):
+        """
+        Recorre las lecturas del dominio en el orden del listado, por bloques.
+        Cada bloque se lee con solo `field_names` y se descarta de la caché
+        antes del siguiente, así la memoria no crece con el rango exportado.
+        """
+        offset = 0
+        while True:
+            counters = self.search_fetch(
+                domain, field_names, order=PORTAL_COUNTER_ORDER, offset=offset, limit=chunk_size,
+            )
+            yield from counters
+            counters.invalidate_recordset()
+            if len(counters) < chunk_size:
+                break
+            offset += chunk_size
+
+    @api.model
+    def _portal_summary(self, domain):
+        """Cantidad de lecturas y copias B/N y color del dominio, en una sola consulta"""
+        [(count, bn, color)] = self._read_group(
+            domain, [], ['__count', 'total_copias_bn:sum', 'total_copias_color:sum'],
+        )
+        return {
+            'counter_count': count,
+            'total_bn': bn or 0,
+            'total_color': color or 0,
+            'total_general': (bn or 0) + (color or 0),
+        }
+
+    @api.model
+    def _chart_month_totals(self, domain):
+        """
+        Copias B/N y color por mes de facturación.
+        Retorna {(año, mes): (bn, color)}.
+        """
+        groups = self._read_group(
+            domain,
+            ['fecha_facturacion:month'],
+            ['total_copias_bn:sum', 'total_copias_color:sum'],
+        )
+        return {
+            (mes.year, mes.month): (bn or 0, color or 0)
+            for mes, bn, color in groups
+            if mes
+        }
+
+    @api.model
+    def _chart_month_heads(self, domain, order):
+        """
+        Primera lectura de cada mes de facturación según `order`
+        (la que antes daba la etiqueta del mes al recorrer las lecturas).
+        Retorna {(año, mes): copier.counter}.
+        """
+        self.flush_model()
+        query = self._search(domain)
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT ON (date_trunc('month', fecha_facturacion)) id
+              FROM copier_counter
+             WHERE id IN %s AND fecha_facturacion IS NOT NULL
+          ORDER BY date_trunc('month', fecha_facturacion), %s
+            """,
+            query.subselect(),
+            SQL(order),
+        ))
+        heads = self.browse([row[0] for row in self.env.cr.fetchall()])
+        return {(head.fecha_facturacion.year, head.fecha_facturacion.month): head for head in heads}
+
+    @api.model
+    def _chart_user_month_totals(self, domain):
+        """
+        Copias por mes de facturación y usuario interno de las lecturas del dominio.
+        Retorna una lista de (año, mes, usuario, bn, color) en el orden en que
+        aparecen los detalles (primer id de detalle de cada grupo).
+        """
+        groups = self.env['copier.counter.user.detail']._read_group(
+            [('contador_id', 'in', self._search(domain))],
+            ['fecha_facturacion:month', 'usuario_id'],
+            ['cantidad_bn:sum', 'cantidad_color:sum', 'id:min'],
+        )
+        groups = sorted((g for g in groups if g[0]), key=lambda g: (g[0], g[4]))
+        return [
+            (mes.year, mes.month, usuario, bn or 0, color or 0)
+            for mes, usuario, bn, color, _first_id in groups
+        ]
+
+    @api.model
+    def _chart_machine_totals(self, domain, limit=20):
+        """
+        Ranking de máquinas por copias (B/N + color) en las lecturas del dominio.
+        Retorna una lista de dicts {'name', 'bn', 'color', 'total'}.
+        """
+        groups = self._read_group(
+            domain,
+            ['maquina_id'],
+            ['total_copias_bn:sum', 'total_copias_color:sum'],
+        )
+        machine_totals = {}
+        for machine, bn, color in groups:
+            if not machine:
+                continue
+            machine_name = self._chart_machine_label(machine)
+            item = machine_totals.setdefault(machine_name, {
+                'name': machine_name,
+                'bn': 0,
+                'color': 0,
+                'total': 0,
+            })
+            item['bn'] += bn or 0
+            item['color'] += color or 0
+            item['total'] += (bn or 0) + (color or 0)
+
+        return sorted(
+            machine_totals.values(),
+            key=lambda item: item['total'],
+            reverse=True,
+        )[:limit]
+
+    @api.model
+    def _chart_machine_label(self, machine):
+        """Etiqueta de la máquina en el ranking: serie - modelo"""
+        label_parts = []
+        if machine.serie_id:
+            label_parts.append(machine.serie_id)
+        if machine.name and machine.name.name:
+            label_parts.append(machine.name.name)
+        return ' - '.join(label_parts) or machine.display_name or f'Equipo {machine.id}'
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de los PDF de lecturas del portal.
+
+Cada PDF generado se guarda como ir.attachment con una clave en `description`:
+equipo, hash del dominio filtrado y versión de las lecturas incluidas
+(cantidad, id máximo y último write_date de lecturas y detalles por usuario).
+Mientras las lecturas no cambien, el portal sirve el adjunto sin volver a
+pasar por wkhtmltopdf; al cambiar, se genera uno nuevo y se borran las
+versiones anteriores del mismo equipo y filtro.
+
+Las búsquedas de texto libre no se cachean (cada texto sería un adjunto
+distinto) y un cron diario elimina los PDF cacheados más antiguos que
+PDF_CACHE_MAX_AGE_DAYS. Opcionalmente otro cron pre-genera el PDF mensual
+(año/mes de facturación) de los equipos con lecturas confirmadas desde su
+última ejecución.
+"""
+
+import calendar
+import hashlib
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+PDF_CACHE_PREFIX = 'portal_counters_pdf:'
+PORTAL_REPORT_REF = 'copier_company.action_report_counter_readings_portal'
+PORTAL_PDF_ORDER = 'fecha_facturacion desc, fecha desc, id desc'
+
+# Parámetros de sistema del pre-generado mensual
+PRERENDER_DATE_PARAM = 'copier_company.portal_pdf_prerender_date'
+PRERENDER_LIMIT = 50
+# Días que se conservan los PDF cacheados sin regenerar
+PDF_CACHE_MAX_AGE_DAYS = 90
+
+
+class CopierCounter(models.Model):
+    _inherit = 'copier.counter'
+
+    @api.model
+    def _portal_pdf_version(self, domain):
+        """Versión de las lecturas del dominio; None si no hay lecturas"""
+        [(count, max_id, max_write)] = self._read_group(domain, [], ['__count', 'id:max', 'write_date:max'])
+        if not count:
+            return None
+        [(detail_write,)] = self.env['copier.counter.user.detail']._read_group(
+            [('contador_id', 'in', self._search(domain))], [], ['write_date:max'],
+        )
+        return f"{count}-{max_id}-{max_write or ''}-{detail_write or ''}"
+
+    @api.model
+    def _portal_pdf_cache_key(self, equipment_id, domain):
+        """Prefijo de la clave (equipo + hash del dominio), sin la versión"""
+        filter_hash = hashlib.sha1(repr(domain).encode()).hexdigest()[:16]
+        return f"{PDF_CACHE_PREFIX}{equipment_id or 0}:{filter_hash}:"
+
+    @api.model
+    def _portal_pdf_get_or_render(self, equipment_id, domain, filename, use_cache=True):
+        """
+        PDF de las lecturas del dominio (orden del listado del portal).
+        Con use_cache=False se genera sin leer ni guardar adjuntos.
+        Retorna (contenido, True si vino de la caché), o (None, False) si el
+        dominio no tiene lecturas.
+        """
+        if not use_cache:
+            counters = self.search(domain, order=PORTAL_PDF_ORDER)
+            if not counters:
+                return None, False
+            pdf_content, _ = self.env['ir.actions.report'].sudo()._render_qweb_pdf(
+                PORTAL_REPORT_REF,
+                res_ids=counters.ids,
+            )
+            return pdf_content, False
+
+        version = self._portal_pdf_version(domain)
+        if version is None:
+            return None, False
+
+        Attachment = self.env['ir.attachment'].sudo()
+        key_prefix = self._portal_pdf_cache_key(equipment_id, domain)
+        key = key_prefix + version
+
+        cached = Attachment.search([('res_model', '=', False), ('description', '=', key)], limit=1)
+        if cached:
+            return cached.raw, True
+
+        counters = self.search(domain, order=PORTAL_PDF_ORDER)
+        pdf_content, _ = self.env['ir.actions.report'].sudo()._render_qweb_pdf(
+            PORTAL_REPORT_REF,
+            res_ids=counters.ids,
+        )
+
+        Attachment.search([
+            ('res_model', '=', False),
+            ('description', '=like', key_prefix + '%'),
+        ]).unlink()
+        Attachment.create({
+            'name': filename,
+            'description': key,
+            'raw': pdf_content,
+            'mimetype': 'application/pdf',
+            'res_model': False,
+            'res_id': False,
+        })
+        _logger.info(
+            "[PORTAL COUNTERS] PDF generado y cacheado. equipment_id=%s lecturas=%s clave=%s",
+            equipment_id, len(counters), key,
+        )
+        return pdf_content, False
+
+    @api.model
+    def _portal_month_domain(self, equipment_id, year, month):
+        """Dominio del portal para un equipo filtrado por año y mes de facturación"""
+        ultimo_dia = calendar.monthrange(year, month)[1]
+        return [
+            ('maquina_id', '=', equipment_id),
+            ('fecha_facturacion', '>=', f'{year}-{month:02d}-01'),
+            ('fecha_facturacion', '<=', f'{year}-{month:02d}-{ultimo_dia:02d}'),
+        ]
+
+    @api.model
+    def _cron_prerender_portal_pdfs(self, limit=PRERENDER_LIMIT, auto_commit=True):
+        """
+        Pre-genera el PDF mensual de cada equipo y mes de facturación con
+        lecturas confirmadas o facturadas desde la última ejecución, para que
+        la descarga del portal con filtro de año/mes sea un acierto de caché.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        desde = params.get_param(PRERENDER_DATE_PARAM)
+        inicio = fields.Datetime.now()
+
+        domain = [('state', 'in', ('confirmed', 'invoiced')), ('maquina_id', '!=', False)]
+        if desde:
+            domain.append(('write_date', '>', desde))
+
+        groups = self._read_group(domain, ['maquina_id', 'fecha_facturacion:month'], [])
+        groups = [(machine, mes) for machine, mes in groups if mes]
+
+        # `limit` cuenta solo los PDF realmente generados: los meses que ya
+        # están en caché se recorren sin consumir el límite, así cada
+        # ejecución avanza sobre los pendientes en lugar de repetir los mismos.
+        generados = 0
+        completo = True
+        for machine, mes in groups:
+            if generados >= limit:
+                completo = False
+                break
+            month_domain = self._portal_month_domain(machine.id, mes.year, mes.month)
+            filename = f"Lecturas_{machine.serie_id or machine.id}.pdf"
+            try:
+                _content, from_cache = self._portal_pdf_get_or_render(machine.id, month_domain, filename)
+                generados += 0 if from_cache else 1
+            except Exception:
+                _logger.exception(
+                    "Error pre-generando PDF de lecturas: equipo %s, %s-%02d",
+                    machine.id, mes.year, mes.month,
+                )
+                if auto_commit:
+                    self.env.cr.rollback()
+                continue
+            if auto_commit:
+                self.env.cr.commit()
+
+        # La fecha solo avanza cuando se recorrieron todos los meses pendientes;
+        # si se cortó por el límite, la siguiente ejecución salta los ya
+        # generados (aciertos de caché) y continúa con el resto.
+        if completo:
+            params.set_param(PRERENDER_DATE_PARAM, fields.Datetime.to_string(inicio))
+
+        _logger.info(
+            "Pre-generado de PDF de lecturas: %s meses pendientes, %s PDF generados",
+            len(groups), generados,
+        )
+        if auto_commit:
+            self.env.cr.commit()
+        return True
+
+    @api.model
+    def _cron_purge_portal_pdf_cache(self, max_age_days=PDF_CACHE_MAX_AGE_DAYS):
+        """Elimina los PDF cacheados del portal creados hace más de max_age_days"""
+        limite_antiguedad = fields.Datetime.subtract(fields.Datetime.now(), days=max_age_days)
+        antiguos = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', False),
+            ('description', '=like', PDF_CACHE_PREFIX + '%'),
+            ('create_date', '<', limite_antiguedad),
+        ])
+        _logger.info("Caché de PDF de lecturas: %s adjuntos antiguos eliminados", len(antiguos))
+        antiguos.unlink()
+        return True
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import defaultdict
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class CopierInvoiceJob(models.Model):
+    _name = 'copier.invoice.job'
+    _description = 'Trabajo de Facturación en Segundo Plano'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char('Referencia', default='New', copy=False, readonly=True)
+    job_type = fields.Selection([
+        ('consolidated', 'Factura consolidada por cliente'),
+        ('billing_group', 'Grupos de facturación'),
+    ], string='Tipo', required=True, default='consolidated', readonly=True)
+
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('queued', 'En Cola'),
+        ('running', 'En Proceso'),
+        ('done', 'Completado'),
+        ('failed', 'Con Errores'),
+    ], string='Estado', default='draft', required=True, readonly=True, index=True)
+
+    user_id = fields.Many2one('res.users', string='Solicitado por', default=lambda self: self.env.user, readonly=True)
+    chunk_size = fields.Integer(
+        'Clientes por Lote',
+        default=20,
+        help='Cantidad de clientes/grupos que se facturan antes de cada commit'
+    )
+    date_start = fields.Datetime('Inicio', readonly=True)
+    date_end = fields.Datetime('Fin', readonly=True)
+
+    line_ids = fields.One2many('copier.invoice.job.line', 'job_id', string='Resultados por Cliente')
+    invoice_ids = fields.Many2many(
+        'account.move',
+        string='Facturas',
+        compute='_compute_progress'
+    )
+
+    total_lines = fields.Integer('Total', compute='_compute_progress')
+    done_lines = fields.Integer('Facturados', compute='_compute_progress')
+    failed_lines = fields.Integer('Con Error', compute='_compute_progress')
+    progress = fields.Float('Progreso (%)', compute='_compute_progress')
+
+    @api.depends('line_ids.state', 'line_ids.invoice_id')
+    def _compute_progress(self):
+        for job in self:
+            total = len(job.line_ids)
+            done = len(job.line_ids.filtered(lambda l: l.state == 'done'))
+            failed = len(job.line_ids.filtered(lambda l: l.state == 'failed'))
+            job.total_lines = total
+            job.done_lines = done
+            job.failed_lines = failed
+            job.progress = ((done + failed) * 100.0 / total) if total else 0.0
+            job.invoice_ids = job.line_ids.invoice_id
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = self.env['ir.sequence'].next_by_code('copier.invoice.job') or 'New'
+        return super().create(vals_list)
+
+    # ==========================================================
+    # CREACIÓN DE TRABAJOS
+    # ==========================================================
+
+    @api.model
+    def create_from_counters(self, counters):
+        """Encola la facturación consolidada de lecturas (una línea por cliente)"""
+        invalidas = counters.filtered(lambda r: r.state != 'confirmed')
+        if invalidas:
+            raise UserError(
+                'Algunos registros no están confirmados:\n' +
+                '\n'.join([f"- {r.name} ({r.state})" for r in invalidas])
+            )
+
+        ids_por_cliente = defaultdict(list)
+        for counter in counters:
+            ids_por_cliente[counter.cliente_id.id].append(counter.id)
+
+        job = self.create({
+            'job_type': 'consolidated',
+            'line_ids': [(0, 0, {
+                'cliente_id': cliente_id or False,
+                'counter_ids': [(6, 0, ids)],
+            }) for cliente_id, ids in ids_por_cliente.items()],
+        })
+        job.action_queue()
+        return job
+
+    @api.model
+    def create_from_billing_groups(self, groups):
+        """Encola la facturación de grupos (una línea por grupo)"""
+        job = self.create({
+            'job_type': 'billing_group',
+            'line_ids': [(0, 0, {
+                'billing_group_id': group.id,
+                'cliente_id': group.cliente_id.id,
+            }) for group in groups],
+        })
+        job.action_queue()
+        return job
+
+    def _action_open(self):
+        self.ensure_one()
+        return {
+            'name': 'Trabajo de Facturación',
+            'type': 'ir.actions.act_window',
+            'res_model': 'copier.invoice.job',
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    # ==========================================================
+    # ACCIONES DE USUARIO
+    # ==========================================================
+
+    def action_queue(self):
+        """Pone el trabajo en cola y despierta al cron"""
+        self.filtered(lambda j: j.state in ('draft', 'failed')).write({'state': 'queued'})
+        cron = self.env.ref('copier_company.ir_cron_process_invoice_jobs', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
+        return True
+
+    def action_retry_failed(self):
+        """Vuelve a encolar solo las líneas con error"""
+        for job in self:
+            job.line_ids.filtered(lambda l: l.state == 'failed').write({'state': 'pending', 'error': False})
+        return self.action_queue()
+
+    def action_view_invoices(self):
+        self.ensure_one()
+        return {
+            'name': 'Facturas del Trabajo',
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', self.invoice_ids.ids)],
+            'target': 'current',
+        }
+
+    # ==========================================================
+    # PROCESAMIENTO (CRON)
+    # ==========================================================
+
+    @api.model
+    def _cron_process_jobs(self, auto_commit=True):
+        """Procesa los trabajos en cola por lotes, con commit después de cada lote"""
+        jobs = self.search([('state', 'in', ('queued', 'running'))], order='id asc')
+        for job in jobs:
+            job._process(auto_commit=auto_commit)
+        return True
+
+    def _process(self, auto_commit=True):
+        self.ensure_one()
+        if self.state == 'queued':
+            self.write({'state': 'running', 'date_start': self.date_start or fields.Datetime.now()})
+            if auto_commit:
+                self.env.cr.commit()
+
+        chunk_size = max(self.chunk_size, 1)
+        while True:
+            pendientes = self.line_ids.filtered(lambda l: l.state == 'pending')[:chunk_size]
+            if not pendientes:
+                break
+            try:
+                if self.job_type == 'billing_group':
+                    pendientes._process_billing_groups()
+                else:
+                    pendientes._process_consolidated()
+            except Exception as e:
+                _logger.exception("Error procesando lote del trabajo %s", self.name)
+                if auto_commit:
+                    self.env.cr.rollback()
+                    self.env.invalidate_all()
+                pendientes.write({'state': 'failed', 'error': str(e)})
+            # Ninguna línea del lote puede quedar pendiente (evita reprocesarla en bucle)
+            pendientes.filtered(lambda l: l.state == 'pending').write({
+                'state': 'failed',
+                'error': 'La línea no obtuvo resultado en el lote.',
+            })
+            if auto_commit:
+                self.env.cr.commit()
+
+        self.write({
+            'state': 'failed' if self.failed_lines else 'done',
+            'date_end': fields.Datetime.now(),
+        })
+        _logger.info(
+            "Trabajo de facturación %s terminado: %s facturados, %s con error",
+            self.name, self.done_lines, self.failed_lines
+        )
+        if auto_commit:
+            self.env.cr.commit()
+
+
+class CopierInvoiceJobLine(models.Model):
+    _name = 'copier.invoice.job.line'
+    _description = 'Resultado por Cliente del Trabajo de Facturación'
+    _order = 'id asc'
+
+    job_id = fields.Many2one('copier.invoice.job', string='Trabajo', required=True, ondelete='cascade', index=True)
+    cliente_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    billing_group_id = fields.Many2one('copier.billing.group', string='Grupo de Facturación', readonly=True)
+    counter_ids = fields.Many2many('copier.counter', string='Lecturas', readonly=True)
+    counter_count = fields.Integer('Lecturas', compute='_compute_counter_count')
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('done', 'Facturado'),
+        ('failed', 'Error'),
+    ], string='Estado', default='pending', required=True, readonly=True, index=True)
+    invoice_id = fields.Many2one('account.move', string='Factura', readonly=True)
+    error = fields.Text('Error', readonly=True)
+    attempts = fields.Integer('Intentos', default=0, readonly=True)
+
+    @api.depends('counter_ids')
+    def _compute_counter_count(self):
+        for line in self:
+            line.counter_count = len(line.counter_ids)
+
+    def _process_consolidated(self):
+        """Factura un lote de clientes con la facturación consolidada en lote"""
+        for line in self:
+            line.attempts += 1
+
+        por_confirmar = self.filtered(lambda l: not l.counter_ids.filtered(lambda c: c.state == 'confirmed'))
+        por_confirmar.write({'state': 'failed', 'error': 'No hay lecturas confirmadas pendientes de facturar.'})
+
+        lineas = self - por_confirmar
+        if not lineas:
+            return
+
+        grupos = [line.counter_ids.filtered(lambda c: c.state == 'confirmed') for line in lineas]
+        resultado = self.env['copier.counter']._crear_facturas_consolidadas_lote(grupos)
+
+        linea_por_counter = {counter_id: line for line, grupo in zip(lineas, grupos) for counter_id in grupo.ids}
+        for item in resultado['facturas']:
+            linea_por_counter[item['lecturas'][:1].id].write({
+                'state': 'done',
+                'invoice_id': item['factura'].id,
+                'error': False,
+            })
+        for lecturas, mensaje in resultado['fallidos']:
+            linea_por_counter[lecturas[:1].id].write({'state': 'failed', 'error': mensaje})
+
+    def _process_billing_groups(self):
+        """Factura un lote de grupos, aislando los errores de cada grupo"""
+        for line in self:
+            line.attempts += 1
+            try:
+                with self.env.cr.savepoint():
+                    result = line.billing_group_id.action_create_group_invoice()
+                line.write({'state': 'done', 'invoice_id': result.get('res_id'), 'error': False})
+            except Exception as e:
+                _logger.exception("Error facturando grupo %s", line.billing_group_id.name)
+                line.write({'state': 'failed', 'error': str(e)})
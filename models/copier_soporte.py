@@ -1614,6 +1614,9 @@ class CopierServiceRequest(models.Model):
             enviados_email = 0
             enviados_whatsapp = 0
             errores = 0
+            # Solo las solicitudes con email enviado siguen al WhatsApp, igual
+            # que cuando cada una se procesaba completa dentro del bucle
+            con_email_ids = []
             
             for solicitud in solicitudes:
                 try:
@@ -1622,21 +1625,21 @@ class CopierServiceRequest(models.Model):
                     # Enviar EMAIL
                     if solicitud._send_email_recordatorio_evaluacion():
                         enviados_email += 1
+                        con_email_ids.append(solicitud.id)
                     else:
                         errores += 1
-                    
-                    # ✅ ENVIAR WHATSAPP
-                    try:
-                        if solicitud._notify_evaluation_reminder():
-                            enviados_whatsapp += 1
-                    except Exception as e:
-                        _logger.error("Error enviando recordatorio WhatsApp: %s", str(e))
                         
                 except Exception as e:
                     _logger.exception("Error procesando solicitud %s: %s", solicitud.name, str(e))
                     errores += 1
                     continue
             
+            # ✅ ENVIAR WHATSAPP (todas las solicitudes en un solo renderizado)
+            try:
+                enviados_whatsapp = self.browse(con_email_ids)._notify_evaluation_reminders()
+            except Exception as e:
+                _logger.error("Error enviando recordatorio WhatsApp: %s", str(e))
+            
             _logger.info("=== CRON FINALIZADO ===")
             _logger.info("Total procesadas: %s", len(solicitudes))
             _logger.info("Emails enviados: %s", enviados_email)
@@ -1,12 +1,29 @@
 # models/copier_whatsapp_alerts.py
 from odoo import api, fields, models, _, exceptions
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import logging
-import requests
-import json
+import os
+import threading
+import time
+
+from . import whatsapp_gateway
 
 _logger = logging.getLogger(__name__)
 
+# Marcador del nombre del distribuidor dentro del cuerpo compartido del catálogo
+CATALOG_PARTNER_TOKEN = '[[DISTRIBUIDOR]]'
+# Cuerpo del catálogo semanal por base de datos: {dbname: (versión del stock, cuerpo)}
+_CATALOG_CACHE = {}
+
+# Parámetros del worker de alertas (ir.config_parameter) y sus valores por defecto
+ALERT_WORKER_PARAMS = {
+    'batch_size': ('copier_company.alert_batch_size', 50),
+    'workers': ('copier_company.alert_workers', 4),
+    'rate': ('copier_company.alert_rate', 5.0),
+    'time_budget': ('copier_company.alert_time_budget', 600),
+}
+
 class CopierWhatsappAlert(models.Model):
     _name = 'copier.whatsapp.alert'
     _description = 'Gestión de Alertas WhatsApp para Stock de Máquinas'
@@ -75,43 +92,49 @@ class CopierWhatsappAlert(models.Model):
             return False
         
         try:
-            # Incrementar contador de intentos
-            self.attempts += 1
-            
-            # Obtener número de teléfono
-            phone = self._get_formatted_phone()
-            if not phone:
-                raise Exception('Número de teléfono no válido')
-            
-            # Preparar mensaje
-            message = self._generate_message()
-            if not message:
-                raise Exception('No se pudo generar el mensaje')
-            
-            # Enviar por WhatsApp API
+            phone, message = self._prepare_delivery()
             success = self._send_whatsapp_message(phone, message)
-            
-            if success:
-                self.write({
-                    'status': 'sent',
-                    'sent_date': fields.Datetime.now(),
-                    'phone_number': phone,
-                    'message': message
-                })
-                _logger.info(f"Alerta {self.id} enviada exitosamente a {phone}")
-                return True
-            else:
-                raise Exception('Error en el envío por API')
-                
+            return self._apply_delivery_result(phone, message, success)
         except Exception as e:
-            error_msg = str(e)
-            _logger.error(f"Error enviando alerta {self.id}: {error_msg}")
-            
+            return self._apply_delivery_result(False, False, False, str(e))
+
+    def _prepare_delivery(self):
+        """Incrementa los intentos y retorna (teléfono, mensaje); lanza excepción si no se puede enviar"""
+        self.ensure_one()
+        # Incrementar contador de intentos
+        self.attempts += 1
+
+        # Obtener número de teléfono
+        phone = self._get_formatted_phone()
+        if not phone:
+            raise Exception('Número de teléfono no válido')
+
+        # Preparar mensaje
+        message = self._generate_message()
+        if not message:
+            raise Exception('No se pudo generar el mensaje')
+        return phone, message
+
+    def _apply_delivery_result(self, phone, message, success, error=None):
+        """Registra el resultado de un envío: enviado, o pendiente/fallido según los intentos"""
+        self.ensure_one()
+        if success:
             self.write({
-                'status': 'failed' if self.attempts >= self.max_attempts else 'pending',
-                'error_message': error_msg
+                'status': 'sent',
+                'sent_date': fields.Datetime.now(),
+                'phone_number': phone,
+                'message': message
             })
-            return False
+            _logger.info(f"Alerta {self.id} enviada exitosamente a {phone}")
+            return True
+
+        error_msg = error or 'Error en el envío por API'
+        _logger.error(f"Error enviando alerta {self.id}: {error_msg}")
+        self.write({
+            'status': 'failed' if self.attempts >= self.max_attempts else 'pending',
+            'error_message': error_msg
+        })
+        return False
 
     def _get_formatted_phone(self):
         """Obtener y formatear número de teléfono"""
@@ -256,10 +279,36 @@ Nuestro equipo se contactará contigo.
 Copier Company SAC"""
 
     def _generate_weekly_catalog(self):
-        """Mensaje de catálogo semanal"""
+        """Mensaje de catálogo semanal (cuerpo compartido, saludo personalizado)"""
+        return self._get_weekly_catalog_body().replace(CATALOG_PARTNER_TOKEN, self.partner_id.name or '')
+
+    @api.model
+    def _get_weekly_catalog_body(self):
+        """
+        Cuerpo del catálogo semanal, calculado una vez y reutilizado por todas
+        las alertas mientras el stock no cambie. La versión del stock es
+        (cantidad de máquinas, última modificación): cualquier alta, baja o
+        cambio de estado/precio genera un cuerpo nuevo.
+        """
         base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
-        catalog_link = f"{base_url}/stock-maquinas"
-        
+        [(total, ultima_modificacion)] = self.env['copier.stock']._read_group(
+            [], aggregates=['__count', 'write_date:max']
+        )
+        version = (base_url, total, ultima_modificacion)
+
+        cache = _CATALOG_CACHE.get(self.env.cr.dbname)
+        if cache and cache[0] == version:
+            return cache[1]
+
+        body = self._build_weekly_catalog_body(f"{base_url}/stock-maquinas")
+        _CATALOG_CACHE[self.env.cr.dbname] = (version, body)
+        return body
+
+    @api.model
+    def _build_weekly_catalog_body(self, catalog_link):
+        """Arma el texto del catálogo; el nombre del distribuidor queda como CATALOG_PARTNER_TOKEN"""
+        partner = CATALOG_PARTNER_TOKEN
+
         # Obtener máquinas disponibles
         available_machines = self.env['copier.stock'].search([
             ('state', '=', 'available')
@@ -268,7 +317,7 @@ Copier Company SAC"""
         if not available_machines:
             return f"""📋 CATÁLOGO SEMANAL
 
-Hola {self.partner_id.name}!
+Hola {partner}!
 
 Actualmente no tenemos máquinas disponibles en stock.
 
@@ -284,7 +333,7 @@ Copier Company SAC"""
         
         message = f"""📋 CATÁLOGO SEMANAL
 
-¡Hola {self.partner_id.name}! Máquinas disponibles:
+¡Hola {partner}! Máquinas disponibles:
 
 """
         
@@ -345,133 +394,138 @@ Copier Company SAC"""
 
     def _send_whatsapp_message(self, phone, message):
         """Enviar mensaje por WhatsApp API"""
-        try:
-            WHATSAPP_API_URL = 'https://whatsappapi.copiercompanysac.com/api/message'
-            
-            data = {
-                'phone': phone,
-                'type': 'text',
-                'message': message
-            }
-            
-            _logger.info("Enviando mensaje WhatsApp - Teléfono: %s", phone)
-            
-            response = requests.post(WHATSAPP_API_URL, data=data, timeout=30)
-            
-            _logger.info("Respuesta API WhatsApp: Status=%s, Contenido=%s", 
-                        response.status_code, response.text)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                return response_data.get('success', False)
-            else:
-                return False
-                
-        except Exception as e:
-            _logger.error(f"Error en API WhatsApp: {str(e)}")
-            return False
+        response = self.env['whatsapp.config']._send_corporate_whatsapp(phone, message, form=True)
+        return response.get('success', False)
+
+    # ==========================================================
+    # PRODUCTORES DE ALERTAS (por lotes, envío en cola)
+    # ==========================================================
 
     @api.model
-    def create_new_stock_alerts(self, machine_id):
-        """Crear alertas para nueva máquina en stock"""
-        machine = self.env['copier.stock'].browse(machine_id)
-        if not machine.exists():
-            return
-            
-        # Buscar distribuidores interesados
-        distributors = self.env['res.partner'].search([
+    def _queue_alerts(self, vals_list):
+        """
+        Crea las alertas en un solo create() y despierta al cron de envío.
+        La entrega la hace process_pending_alerts fuera de la transacción
+        que las originó (por ejemplo copier.stock.create).
+        """
+        if not vals_list:
+            return self.browse()
+        alerts = self.create(vals_list)
+        cron = self.env.ref('copier_company.ir_cron_process_pending_whatsapp_alerts', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return alerts
+
+    @api.model
+    def _get_alert_distributors(self):
+        """Distribuidores suscritos a las alertas de stock (una sola búsqueda)"""
+        return self.env['res.partner'].search([
             ('is_distributor', '=', True),
             ('notify_new_stock', '=', True),
             ('active', '=', True)
         ])
-        
-        alerts = []
-        for distributor in distributors:
-            # Verificar si el distribuidor está interesado en este tipo de máquina
-            if self._distributor_interested_in_machine(distributor, machine):
-                alert_vals = {
-                    'partner_id': distributor.id,
-                    'machine_id': machine.id,
-                    'alert_type': 'new_stock',
-                    'priority': 'high',
-                    'scheduled_date': fields.Datetime.now()
-                }
-                alerts.append(alert_vals)
-        
-        if alerts:
-            created_alerts = self.create(alerts)
-            # Enviar inmediatamente
-            for alert in created_alerts:
-                alert.send_alert()
-                
-        _logger.info(f"Creadas {len(alerts)} alertas para nueva máquina {machine.name}")
+
+    @api.model
+    def _prepare_machine_alerts(self, machines, alert_type, priority, exclude_reserved_by=False):
+        """vals_list para avisar a los distribuidores interesados en cada máquina"""
+        now = fields.Datetime.now()
+        distributors = self._get_alert_distributors()
+        vals_list = []
+        for machine in machines:
+            for distributor in distributors:
+                if exclude_reserved_by and distributor == machine.reserved_by:
+                    continue
+                # Verificar si el distribuidor está interesado en este tipo de máquina
+                if self._distributor_interested_in_machine(distributor, machine):
+                    vals_list.append({
+                        'partner_id': distributor.id,
+                        'machine_id': machine.id,
+                        'alert_type': alert_type,
+                        'priority': priority,
+                        'scheduled_date': now
+                    })
+        return vals_list
+
+    @api.model
+    def create_new_stock_alerts(self, machine_ids):
+        """Crear alertas para nueva(s) máquina(s) en stock"""
+        machine_ids = [machine_ids] if isinstance(machine_ids, int) else list(machine_ids)
+        machines = self.env['copier.stock'].browse(machine_ids).exists()
+        if not machines:
+            return self.browse()
+
+        alerts = self._queue_alerts(self._prepare_machine_alerts(machines, 'new_stock', 'high'))
+        _logger.info("Creadas %s alertas para %s máquina(s) nueva(s)", len(alerts), len(machines))
+        return alerts
+
+    @api.model
+    def create_machine_released_alerts(self, machines):
+        """Crear alertas cuando se liberan máquinas (excluye a quien la tenía reservada)"""
+        alerts = self._queue_alerts(
+            self._prepare_machine_alerts(machines, 'machine_released', 'high', exclude_reserved_by=True)
+        )
+        _logger.info("Creadas %s alertas de máquinas liberadas", len(alerts))
+        return alerts
 
     @api.model
     def create_expiry_alerts(self):
         """Crear alertas para reservas por expirar (ejecutar diario)"""
         # Buscar máquinas que expiran en 2 días
-        expiry_date = fields.Datetime.now() + timedelta(days=2)
+        now = fields.Datetime.now()
         machines_expiring = self.env['copier.stock'].search([
             ('state', '=', 'reserved'),
+            ('reserved_by', '!=', False),
             ('reservation_expiry_date', '!=', False),
-            ('reservation_expiry_date', '<=', expiry_date),
-            ('reservation_expiry_date', '>', fields.Datetime.now())
+            ('reservation_expiry_date', '<=', now + timedelta(days=2)),
+            ('reservation_expiry_date', '>', now)
         ])
-        
-        alerts = []
-        for machine in machines_expiring:
-            if machine.reserved_by:
-                # Verificar que no se haya enviado alerta reciente
-                existing_alert = self.search([
-                    ('partner_id', '=', machine.reserved_by.id),
-                    ('machine_id', '=', machine.id),
+        if not machines_expiring:
+            _logger.info("Creadas 0 alertas de expiración")
+            return self.browse()
+
+        # Alertas ya enviadas en las últimas 24 h, en una sola consulta
+        recientes = {
+            (partner.id, machine.id)
+            for partner, machine in self._read_group(
+                [
+                    ('machine_id', 'in', machines_expiring.ids),
                     ('alert_type', '=', 'reservation_expiry'),
-                    ('create_date', '>=', fields.Datetime.now() - timedelta(hours=24)),
+                    ('create_date', '>=', now - timedelta(hours=24)),
                     ('status', '=', 'sent')
-                ])
-                
-                if not existing_alert:
-                    alert_vals = {
-                        'partner_id': machine.reserved_by.id,
-                        'machine_id': machine.id,
-                        'alert_type': 'reservation_expiry',
-                        'priority': 'urgent',
-                        'scheduled_date': fields.Datetime.now()
-                    }
-                    alerts.append(alert_vals)
-        
-        if alerts:
-            created_alerts = self.create(alerts)
-            for alert in created_alerts:
-                alert.send_alert()
-                
-        _logger.info(f"Creadas {len(alerts)} alertas de expiración")
+                ],
+                groupby=['partner_id', 'machine_id'],
+            )
+        }
+
+        alerts = self._queue_alerts([
+            {
+                'partner_id': machine.reserved_by.id,
+                'machine_id': machine.id,
+                'alert_type': 'reservation_expiry',
+                'priority': 'urgent',
+                'scheduled_date': now
+            }
+            for machine in machines_expiring
+            if (machine.reserved_by.id, machine.id) not in recientes
+        ])
+        _logger.info("Creadas %s alertas de expiración", len(alerts))
+        return alerts
 
     @api.model
     def create_weekly_catalog_alerts(self):
         """Crear alertas de catálogo semanal (ejecutar lunes)"""
-        distributors = self.env['res.partner'].search([
-            ('is_distributor', '=', True),
-            ('notify_new_stock', '=', True),
-            ('active', '=', True)
-        ])
-        
-        alerts = []
-        for distributor in distributors:
-            alert_vals = {
+        now = fields.Datetime.now()
+        alerts = self._queue_alerts([
+            {
                 'partner_id': distributor.id,
                 'alert_type': 'weekly_catalog',
                 'priority': 'low',
-                'scheduled_date': fields.Datetime.now()
+                'scheduled_date': now
             }
-            alerts.append(alert_vals)
-        
-        if alerts:
-            created_alerts = self.create(alerts)
-            for alert in created_alerts:
-                alert.send_alert()
-                
-        _logger.info(f"Creadas {len(alerts)} alertas de catálogo semanal")
+            for distributor in self._get_alert_distributors()
+        ])
+        _logger.info("Creadas %s alertas de catálogo semanal", len(alerts))
+        return alerts
 
     def _distributor_interested_in_machine(self, distributor, machine):
         """Verificar si el distribuidor está interesado en la máquina"""
@@ -489,19 +543,151 @@ Copier Company SAC"""
         return True
 
     @api.model
-    def process_pending_alerts(self):
-        """Procesar alertas pendientes (ejecutar cada 15 minutos)"""
-        pending_alerts = self.search([
-            ('status', '=', 'pending'),
-            '|',
-            ('scheduled_date', '<=', fields.Datetime.now()),
-            ('scheduled_date', '=', False)
-        ], limit=50)  # Procesar máximo 50 por vez
-        
-        for alert in pending_alerts:
-            alert.send_alert()
-            
-        _logger.info(f"Procesadas {len(pending_alerts)} alertas pendientes")
+    def _get_worker_settings(self):
+        """Tamaño de lote, hilos, mensajes/segundo y segundos por ejecución del worker"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        settings = {}
+        for key, (param, default) in ALERT_WORKER_PARAMS.items():
+            try:
+                settings[key] = type(default)(ICP.get_param(param, default))
+            except (TypeError, ValueError):
+                settings[key] = default
+        return settings
+
+    @api.model
+    def _claim_pending_batch(self, batch_size, exclude_ids=()):
+        """
+        Bloquea el siguiente lote de alertas pendientes y vencidas.
+        SKIP LOCKED hace que otros workers salten las filas ya tomadas, así
+        varias ejecuciones en paralelo nunca envían la misma alerta.
+        `exclude_ids` evita reintentar en la misma ejecución las que volvieron a pendiente.
+        """
+        self.flush_model(['status', 'scheduled_date', 'priority'])
+        self.env.cr.execute("""
+            SELECT id FROM copier_whatsapp_alert
+             WHERE status = 'pending'
+               AND (scheduled_date IS NULL OR scheduled_date <= (now() at time zone 'UTC'))
+               AND id != ALL(%s)
+          ORDER BY CASE priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1
+                                 WHEN 'normal' THEN 2 ELSE 3 END, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [list(exclude_ids), batch_size])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _send_batch(self, workers, limiter):
+        """
+        Envía un lote ya bloqueado. Teléfonos y mensajes se preparan en el hilo
+        principal; los hilos solo hacen la llamada HTTP, respetando el limitador
+        global. Retorna (enviados, fallidos, latencias en ms).
+        """
+        base_url = self.env['ir.config_parameter'].sudo().get_param('copier_company.whatsapp_corporate_url') or None
+        envios = []
+        fallidos = 0
+        for alert in self:
+            if alert.attempts >= alert.max_attempts:
+                alert.write({'status': 'failed', 'error_message': 'Máximo número de intentos alcanzado'})
+                fallidos += 1
+                continue
+            try:
+                phone, message = alert._prepare_delivery()
+            except Exception as e:
+                alert._apply_delivery_result(False, False, False, str(e))
+                fallidos += 1
+                continue
+            envios.append((alert, phone, message))
+
+        def enviar(phone, message):
+            limiter.acquire()
+            inicio = time.monotonic()
+            response = whatsapp_gateway.send_corporate_message(phone, message, base_url=base_url, form=True)
+            return response, (time.monotonic() - inicio) * 1000.0
+
+        enviados = 0
+        latencias = []
+        if envios:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(envios)))) as pool:
+                futuros = {
+                    pool.submit(enviar, phone, message): (alert, phone, message)
+                    for alert, phone, message in envios
+                }
+                for futuro in as_completed(futuros):
+                    alert, phone, message = futuros[futuro]
+                    try:
+                        response, latencia = futuro.result()
+                        latencias.append(latencia)
+                        ok = alert._apply_delivery_result(phone, message, response.get('success', False),
+                                                          response.get('error'))
+                    except Exception as e:
+                        _logger.exception("Excepción enviando alerta %s", alert.id)
+                        ok = alert._apply_delivery_result(phone, message, False, str(e))
+                    if ok:
+                        enviados += 1
+                    else:
+                        fallidos += 1
+        return enviados, fallidos, latencias
+
+    @api.model
+    def process_pending_alerts(self, auto_commit=True):
+        """
+        Worker de alertas pendientes (cron cada 15 minutos, también despertado
+        por _queue_alerts). Toma lotes con FOR UPDATE SKIP LOCKED hasta vaciar la
+        cola o agotar copier_company.alert_time_budget segundos; cada lote se
+        envía en paralelo, se registra en copier.whatsapp.alert.batch y se confirma.
+        Se pueden ejecutar varios workers a la vez (otros registros de cron).
+        """
+        settings = self._get_worker_settings()
+        limiter = whatsapp_gateway.get_rate_limiter('corporate_alerts', settings['rate'])
+        worker = f"{os.getpid()}/{threading.current_thread().name}"
+        limite = time.monotonic() + settings['time_budget']
+        procesadas = set()
+
+        while time.monotonic() < limite:
+            lote = self._claim_pending_batch(max(1, settings['batch_size']), procesadas)
+            if not lote:
+                break
+            inicio_lote = fields.Datetime.now()
+            inicio = time.monotonic()
+            enviados, fallidos, latencias = lote._send_batch(settings['workers'], limiter)
+            duracion = time.monotonic() - inicio
+            self.env['copier.whatsapp.alert.batch'].sudo().create({
+                'date': inicio_lote,
+                'worker': worker,
+                'claimed_count': len(lote),
+                'sent_count': enviados,
+                'failed_count': fallidos,
+                'duration': duracion,
+                'throughput': (len(lote) * 60.0 / duracion) if duracion else 0.0,
+                'avg_latency_ms': (sum(latencias) / len(latencias)) if latencias else 0.0,
+                'max_latency_ms': max(latencias) if latencias else 0.0,
+            })
+            procesadas.update(lote.ids)
+            _logger.info(
+                "Lote de alertas WhatsApp (%s): %s tomadas, %s enviadas, %s fallidas en %.1f s",
+                worker, len(lote), enviados, fallidos, duracion
+            )
+            if auto_commit:
+                self.env.cr.commit()
+
+        _logger.info(f"Procesadas {len(procesadas)} alertas pendientes")
+        return len(procesadas)
+
+
+class CopierWhatsappAlertBatch(models.Model):
+    _name = 'copier.whatsapp.alert.batch'
+    _description = 'Estadísticas por Lote del Worker de Alertas WhatsApp'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    date = fields.Datetime('Inicio', required=True, index=True, readonly=True)
+    worker = fields.Char('Worker', readonly=True, help='PID/hilo del proceso que tomó el lote')
+    claimed_count = fields.Integer('Tomadas', readonly=True)
+    sent_count = fields.Integer('Enviadas', readonly=True)
+    failed_count = fields.Integer('Fallidas', readonly=True)
+    duration = fields.Float('Duración (s)', digits=(16, 2), readonly=True)
+    throughput = fields.Float('Alertas/min', digits=(16, 1), readonly=True)
+    avg_latency_ms = fields.Float('Latencia Prom. (ms)', digits=(16, 0), readonly=True)
+    max_latency_ms = fields.Float('Latencia Máx. (ms)', digits=(16, 0), readonly=True)
 
 
 # Extender modelo copier.stock para triggers automáticos
@@ -513,68 +699,43 @@ class CopierStock(models.Model):
         """Override create para notificar nueva máquina"""
         result = super().create(vals)
         
-        # Si se crea directamente como disponible, notificar
-        if result.state == 'available':
-            self.env['copier.whatsapp.alert'].create_new_stock_alerts(result.id)
+        # Si se crea directamente como disponible, notificar (en cola)
+        disponibles = result.filtered(lambda r: r.state == 'available')
+        if disponibles:
+            self.env['copier.whatsapp.alert'].create_new_stock_alerts(disponibles.ids)
             
         return result
 
     def write(self, vals):
         """Override write para detectar cambios de estado"""
         result = super().write(vals)
+        alert_model = self.env['copier.whatsapp.alert']
         
         # Detectar cambios a disponible
         if 'state' in vals and vals['state'] == 'available':
-            for record in self:
-                # Si era una máquina reservada que se liberó
-                if record.reserved_by:
-                    # Crear alerta de máquina liberada para otros distribuidores
-                    self._create_machine_released_alerts(record)
-                else:
-                    # Nueva máquina disponible
-                    self.env['copier.whatsapp.alert'].create_new_stock_alerts(record.id)
+            # Si era una máquina reservada que se liberó: alerta para otros distribuidores
+            liberadas = self.filtered('reserved_by')
+            if liberadas:
+                alert_model.create_machine_released_alerts(liberadas)
+            # Nueva máquina disponible
+            nuevas = self - liberadas
+            if nuevas:
+                alert_model.create_new_stock_alerts(nuevas.ids)
         
         # Detectar ventas confirmadas
         if 'state' in vals and vals['state'] == 'sold':
-            for record in self:
-                if record.reserved_by:
-                    # Crear alerta de compra confirmada
-                    self.env['copier.whatsapp.alert'].create([{
-                        'partner_id': record.reserved_by.id,
-                        'machine_id': record.id,
-                        'alert_type': 'purchase_confirmed',
-                        'priority': 'normal',
-                        'scheduled_date': fields.Datetime.now()
-                    }]).send_alert()
-        
-        return result
-
-    def _create_machine_released_alerts(self, machine):
-        """Crear alertas cuando se libera una máquina"""
-        distributors = self.env['res.partner'].search([
-            ('is_distributor', '=', True),
-            ('notify_new_stock', '=', True),
-            ('active', '=', True),
-            ('id', '!=', machine.reserved_by.id)  # Excluir quien la tenía reservada
-        ])
-        
-        alerts = []
-        alert_model = self.env['copier.whatsapp.alert']
-        for distributor in distributors:
-            if alert_model._distributor_interested_in_machine(distributor, machine):
-                alert_vals = {
-                    'partner_id': distributor.id,
-                    'machine_id': machine.id,
-                    'alert_type': 'machine_released',
-                    'priority': 'high',
+            alert_model._queue_alerts([
+                {
+                    'partner_id': record.reserved_by.id,
+                    'machine_id': record.id,
+                    'alert_type': 'purchase_confirmed',
+                    'priority': 'normal',
                     'scheduled_date': fields.Datetime.now()
                 }
-                alerts.append(alert_vals)
+                for record in self.filtered('reserved_by')
+            ])
         
-        if alerts:
-            created_alerts = alert_model.create(alerts)
-            for alert in created_alerts:
-                alert.send_alert()
+        return result
 
 
 # Extender res.partner para agregar relación con alertas (campos ya existen)
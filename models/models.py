@@ -13,6 +13,8 @@ import os
 import re
 import requests
 
+from . import copier_billing_calc
+
 import logging
 _logger = logging.getLogger(__name__)
 
@@ -504,104 +506,26 @@ class CopierCompany(models.Model):
              'monto_mensual_bn', 'monto_mensual_color', 'monto_mensual_total',
              'precio_bn_incluye_igv', 'precio_color_incluye_igv')  # AGREGAR DEPENDENCIAS
     def _compute_renta_mensual(self):
-        for record in self:
-            # Caso 1: Cálculo automático por costo unitario
-            if record.tipo_calculo == 'auto':
-                # Calcular rentas según si el precio incluye o no IGV
-                if record.precio_bn_incluye_igv:
-                    # El precio YA incluye IGV, calcular subtotal sin IGV
-                    renta_bn_con_igv = record.volumen_mensual_bn * record.costo_copia_bn
-                    renta_bn = renta_bn_con_igv / (1 + (record.igv / 100))
-                else:
-                    # El precio NO incluye IGV
-                    renta_bn = record.volumen_mensual_bn * record.costo_copia_bn
-                
-                if record.precio_color_incluye_igv:
-                    # El precio YA incluye IGV, calcular subtotal sin IGV
-                    renta_color_con_igv = record.volumen_mensual_color * record.costo_copia_color
-                    renta_color = renta_color_con_igv / (1 + (record.igv / 100))
-                else:
-                    # El precio NO incluye IGV
-                    renta_color = record.volumen_mensual_color * record.costo_copia_color
-                
-            # Caso 2: Cálculo con montos fijos para B/N
-            elif record.tipo_calculo in ['manual_sin_igv_bn', 'manual_con_igv_bn']:
-                if record.tipo_calculo == 'manual_sin_igv_bn':
-                    renta_bn = record.monto_mensual_bn
-                else:  # manual_con_igv_bn
-                    renta_bn = record.monto_mensual_bn / (1 + (record.igv / 100))
-                
-                # Color sigue la lógica del checkbox
-                if record.precio_color_incluye_igv:
-                    renta_color_con_igv = record.volumen_mensual_color * record.costo_copia_color
-                    renta_color = renta_color_con_igv / (1 + (record.igv / 100))
-                else:
-                    renta_color = record.volumen_mensual_color * record.costo_copia_color
-            
-            # Caso 3: Cálculo con montos fijos para Color
-            elif record.tipo_calculo in ['manual_sin_igv_color', 'manual_con_igv_color']:
-                if record.tipo_calculo == 'manual_sin_igv_color':
-                    renta_color = record.monto_mensual_color
-                else:  # manual_con_igv_color
-                    renta_color = record.monto_mensual_color / (1 + (record.igv / 100))
-                
-                # B/N sigue la lógica del checkbox
-                if record.precio_bn_incluye_igv:
-                    renta_bn_con_igv = record.volumen_mensual_bn * record.costo_copia_bn
-                    renta_bn = renta_bn_con_igv / (1 + (record.igv / 100))
-                else:
-                    renta_bn = record.volumen_mensual_bn * record.costo_copia_bn
-            
-            # Caso 4: Cálculo con montos fijos para el total
-            elif record.tipo_calculo in ['manual_sin_igv_total', 'manual_con_igv_total']:
-                if record.tipo_calculo == 'manual_sin_igv_total':
-                    monto_total = record.monto_mensual_total
-                else:  # manual_con_igv_total
-                    monto_total = record.monto_mensual_total / (1 + (record.igv / 100))
-                
-                volumen_total = record.volumen_mensual_bn + record.volumen_mensual_color
-                
-                if volumen_total > 0:
-                    # Calcular costos base según checkbox
-                    if record.precio_bn_incluye_igv:
-                        costo_bn_base = (record.volumen_mensual_bn * record.costo_copia_bn) / (1 + (record.igv / 100))
-                    else:
-                        costo_bn_base = record.volumen_mensual_bn * record.costo_copia_bn
-                    
-                    if record.precio_color_incluye_igv:
-                        costo_color_base = (record.volumen_mensual_color * record.costo_copia_color) / (1 + (record.igv / 100))
-                    else:
-                        costo_color_base = record.volumen_mensual_color * record.costo_copia_color
-                    
-                    costo_total_base = costo_bn_base + costo_color_base
-                    
-                    if costo_total_base > 0:
-                        factor = monto_total / costo_total_base
-                        renta_bn = costo_bn_base * factor
-                        renta_color = costo_color_base * factor
-                    else:
-                        renta_bn = monto_total
-                        renta_color = 0
-                else:
-                    renta_bn = monto_total
-                    renta_color = 0
-            
-            # Común para todos: cálculo de totales
-            subtotal = renta_color + renta_bn
-            
-            # Aplicar descuento
-            descuento_valor = subtotal * (record.descuento / 100.0)
-            subtotal_con_descuento = subtotal - descuento_valor
-            
-            # Calcular IGV
-            igv_valor = subtotal_con_descuento * (record.igv / 100.0)
-            
-            # Asignar valores
-            record.renta_mensual_color = renta_color
-            record.renta_mensual_bn = renta_bn
-            record.subtotal_sin_igv = subtotal_con_descuento
-            record.monto_igv = igv_valor
-            record.total_facturar_mensual = subtotal_con_descuento + igv_valor
+        """Rentas y totales mensuales con el núcleo común copier_billing_calc"""
+        filas = [(
+            record.tipo_calculo,
+            record.volumen_mensual_bn,
+            record.volumen_mensual_color,
+            copier_billing_calc.precio_sin_igv(record.costo_copia_bn, record.precio_bn_incluye_igv, record.igv),
+            copier_billing_calc.precio_sin_igv(record.costo_copia_color, record.precio_color_incluye_igv, record.igv),
+            record.monto_mensual_bn,
+            record.monto_mensual_color,
+            record.monto_mensual_total,
+            record.descuento,
+            record.igv,
+        ) for record in self]
+
+        for record, importes in zip(self, copier_billing_calc.calcular_lote(filas)):
+            record.renta_mensual_color = importes['renta_color']
+            record.renta_mensual_bn = importes['renta_bn']
+            record.subtotal_sin_igv = importes['subtotal']
+            record.monto_igv = importes['igv']
+            record.total_facturar_mensual = importes['total']
 
     
     @api.depends('fecha_inicio_alquiler', 'duracion_alquiler_id')
@@ -683,10 +607,24 @@ class CopierCompany(models.Model):
     )
 
     def _compute_user_count(self):
+        # Un solo conteo agrupado para todo el recordset (no un search_count por máquina)
+        conteos = self._count_related_by_maquina('copier.machine.user')
         for rec in self:
-            rec.user_count = self.env['copier.machine.user'].search_count([
-                ('maquina_id', '=', rec.id)
-            ])
+            rec.user_count = conteos.get(rec.id, 0)
+
+    def _count_related_by_maquina(self, model_name):
+        """Retorna {maquina_id: cantidad} de registros de `model_name` para este recordset"""
+        ids = [rec_id for rec_id in self.ids if rec_id]
+        if not ids:
+            return {}
+        return {
+            maquina.id: count
+            for maquina, count in self.env[model_name]._read_group(
+                [('maquina_id', 'in', ids)],
+                groupby=['maquina_id'],
+                aggregates=['__count'],
+            )
+        }
 
 
 
@@ -754,10 +692,9 @@ class CopierCompany(models.Model):
     )
     
     def _compute_counter_count(self):
+        conteos = self._count_related_by_maquina('copier.counter')
         for record in self:
-            record.counter_count = self.env['copier.counter'].search_count([
-                ('maquina_id', '=', record.id)
-            ])
+            record.counter_count = conteos.get(record.id, 0)
     
     # Acción para el botón
     def action_view_counters(self):
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Alcance de acceso del portal (empresas y equipos visibles) en caché por usuario.
+
+Los controladores del portal (equipos, contadores, servicios técnicos) piden
+aquí las empresas permitidas y los equipos accesibles en lugar de recorrer en
+cada petición el commercial_partner_id, portal_empresa_ids y los equipos de
+esas empresas.
+
+La caché es por proceso y se indexa por (base de datos, usuario); cada entrada
+guarda la versión con la que se calculó. La versión es el último write_date de
+los registros que definen el alcance: el contacto del usuario, las empresas
+permitidas y sus contactos, los clientes de los equipos cacheados y los
+equipos (cacheados o de esas empresas). Se obtiene con una sola consulta en la
+transacción de la petición, así un cambio solo se ve cuando está confirmado,
+y no escribe nada ni invalida cachés de otros usuarios o workers.
+"""
+
+import logging
+
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+# Máximo de usuarios en caché por proceso antes de vaciarla
+SCOPE_CACHE_SIZE = 5000
+
+# {(dbname, uid): (versión, partner_id, (empresas permitidas), (equipos accesibles), (clientes de esos equipos))}
+_SCOPE_CACHE = {}
+
+
+class CopierPortalAccessScope(models.AbstractModel):
+    _name = 'copier.portal.access.scope'
+    _description = 'Alcance de Acceso del Portal'
+
+    @api.model
+    def _get_version(self, partner_id, allowed_partner_ids, equipment_ids, cliente_ids):
+        """Último write_date de contactos y equipos que definen el alcance"""
+        self.env.cr.execute(
+            """
+            SELECT (SELECT max(write_date)
+                      FROM res_partner
+                     WHERE id = ANY(%(partners)s)
+                        OR commercial_partner_id = ANY(%(allowed)s)),
+                   (SELECT max(write_date)
+                      FROM copier_company
+                     WHERE id = ANY(%(equipments)s)
+                        OR cliente_id IN (SELECT id FROM res_partner
+                                           WHERE commercial_partner_id = ANY(%(allowed)s)))
+            """,
+            {
+                'partners': [partner_id, *allowed_partner_ids, *cliente_ids],
+                'allowed': list(allowed_partner_ids),
+                'equipments': list(equipment_ids),
+            },
+        )
+        return tuple(self.env.cr.fetchone())
+
+    @api.model
+    def _compute_scope(self, partner):
+        """Empresas permitidas, equipos accesibles y sus clientes (tuplas de ids)"""
+        allowed_partner_ids = set()
+        if partner.commercial_partner_id:
+            allowed_partner_ids.add(partner.commercial_partner_id.id)
+        allowed_partner_ids.update(partner.sudo().portal_empresa_ids.ids)
+
+        equipments = self.env['copier.company'].sudo().with_context(active_test=False).search([
+            ('cliente_id.commercial_partner_id', 'in', list(allowed_partner_ids)),
+        ]) if allowed_partner_ids else self.env['copier.company']
+
+        return (
+            tuple(sorted(allowed_partner_ids)),
+            tuple(equipments.ids),
+            tuple(equipments.cliente_id.ids),
+        )
+
+    @api.model
+    def _get_scope(self):
+        """
+        Alcance del usuario actual.
+        Retorna (empresas permitidas, equipos accesibles) como tuplas de ids.
+        """
+        user = self.env.user
+        partner = user.partner_id
+        key = (self.env.cr.dbname, user.id)
+
+        self.env['res.partner'].flush_model(['write_date', 'commercial_partner_id'])
+        self.env['copier.company'].flush_model(['write_date', 'cliente_id'])
+
+        cached = _SCOPE_CACHE.get(key)
+        if cached and cached[1] == partner.id:
+            version = self._get_version(partner.id, *cached[2:])
+            if version == cached[0]:
+                return cached[2], cached[3]
+
+        scope = self._compute_scope(partner)
+        version = self._get_version(partner.id, *scope)
+        if len(_SCOPE_CACHE) >= SCOPE_CACHE_SIZE:
+            _SCOPE_CACHE.clear()
+        _SCOPE_CACHE[key] = (version, partner.id) + scope
+
+        _logger.debug(
+            "[PORTAL ACCESS SCOPE] Recalculado user_id=%s partner_id=%s version=%s "
+            "allowed_partner_ids=%s equipos=%s",
+            user.id, partner.id, version, list(scope[0]), len(scope[1]),
+        )
+        return scope[0], scope[1]
+
+    @api.model
+    def get_allowed_partner_ids(self):
+        """Empresas que el contacto portal puede ver: commercial_partner_id + portal_empresa_ids"""
+        return list(self._get_scope()[0])
+
+    @api.model
+    def get_equipment_ids(self):
+        """Equipos (copier.company) de las empresas permitidas, incluidos los archivados"""
+        return list(self._get_scope()[1])
+
@@ -4,12 +4,56 @@
 # ====================================================================================
 
 from odoo import models, fields, api
+from odoo.exceptions import UserError
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import threading
 import time
 
+from .printtracker_device import normalize_serial
+
 _logger = logging.getLogger(__name__)
 
+# Sesiones HTTP compartidas por URL base: reutilizan conexiones (keep-alive)
+# entre peticiones y entre hilos del pool de paginación.
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _get_pooled_session(api_url, pool_size):
+    """Retorna la sesión requests compartida para una URL base"""
+    key = (api_url, pool_size)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _SESSIONS[key] = session
+        return session
+
+
+def _call_with_backoff(func, max_retries, retry_delay):
+    """
+    Ejecuta func() reintentando errores de red con backoff exponencial
+    (retry_delay, 2*retry_delay, 4*retry_delay...).
+
+    No usa el ORM, así que puede correr dentro de los hilos del pool.
+    """
+    attempts = max(max_retries, 1)
+    for attempt in range(attempts):
+        try:
+            return func()
+        except requests.exceptions.RequestException:
+            if attempt == attempts - 1:
+                raise
+            delay = retry_delay * (2 ** attempt)
+            _logger.warning("Intento %s falló, reintentando en %ss...", attempt + 1, delay)
+            time.sleep(delay)
+
 class PrintTrackerConfig(models.Model):
     _name = 'copier.printtracker.config'
     _description = 'Configuración API PrintTracker Pro - Copier Company'
@@ -34,7 +78,10 @@ class PrintTrackerConfig(models.Model):
     last_error = fields.Text('Último Error', readonly=True)
     timeout_seconds = fields.Integer('Timeout (segundos)', default=30)
     max_retries = fields.Integer('Reintentos Máximos', default=3)
-    retry_delay = fields.Integer('Delay entre Reintentos (seg)', default=5)
+    retry_delay = fields.Integer('Delay entre Reintentos (seg)', default=5,
+                                 help='Delay base; se duplica en cada reintento (backoff exponencial)')
+    max_workers = fields.Integer('Peticiones Concurrentes', default=4,
+                                 help='Máximo de páginas descargadas en paralelo')
 
     def get_api_headers(self):
         """Retorna headers para requests a la API"""
@@ -44,15 +91,72 @@ class PrintTrackerConfig(models.Model):
         }
 
     def _retry_api_call(self, func, *args, **kwargs):
-        """Wrapper para reintentar llamadas API fallidas"""
-        for attempt in range(self.max_retries):
-            try:
-                return func(*args, **kwargs)
-            except requests.exceptions.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    raise e
-                _logger.warning(f"Intento {attempt + 1} falló, reintentando en {self.retry_delay}s...")
-                time.sleep(self.retry_delay)
+        """Wrapper para reintentar llamadas API fallidas con backoff exponencial"""
+        return _call_with_backoff(lambda: func(*args, **kwargs), self.max_retries, self.retry_delay)
+
+    def _get_session(self):
+        """Sesión HTTP con pool de conexiones compartida para esta configuración"""
+        self.ensure_one()
+        return _get_pooled_session(self.api_url.rstrip('/'), max(self.max_workers, 1))
+
+    def _fetch_paginated(self, path, params, page_size=100, max_pages=50):
+        """
+        Descarga todas las páginas de un endpoint de listado.
+
+        La primera página se pide sola; si viene llena, las siguientes se piden
+        en paralelo (hasta `max_workers` a la vez) en ventanas hasta encontrar
+        una página incompleta o vacía. Si la API informa X-Total-Count se piden
+        directamente las páginas que faltan.
+        """
+        self.ensure_one()
+        url = f'{self.api_url.rstrip("/")}{path}'
+        headers = self.get_api_headers()
+        timeout = self.timeout_seconds
+        max_retries = self.max_retries
+        retry_delay = self.retry_delay
+        workers = max(self.max_workers, 1)
+        session = self._get_session()
+
+        def _get_page(page):
+            page_params = dict(params, limit=page_size, page=page)
+            return _call_with_backoff(
+                lambda: session.get(url, headers=headers, params=page_params, timeout=timeout),
+                max_retries, retry_delay
+            )
+
+        response = _get_page(1)
+        if response.status_code != 200:
+            raise UserError(f'Error HTTP {response.status_code} en página 1: {response.text}')
+        items = response.json()
+        if len(items) < page_size:
+            return items
+
+        total_count = response.headers.get('X-Total-Count', '')
+        if total_count.isdigit():
+            last_page = min(-(-int(total_count) // page_size), max_pages)
+        else:
+            last_page = max_pages
+
+        next_page = 2
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while next_page <= last_page:
+                window = range(next_page, min(next_page + workers, last_page + 1))
+                for page, page_response in zip(window, executor.map(_get_page, window)):
+                    if page_response.status_code != 200:
+                        _logger.warning(
+                            "PrintTracker: HTTP %s en página %s de %s, se usan los datos ya obtenidos",
+                            page_response.status_code, page, path
+                        )
+                        return items
+                    page_items = page_response.json()
+                    items.extend(page_items)
+                    if len(page_items) < page_size:
+                        return items
+                next_page = window.stop
+
+        if last_page == max_pages:
+            _logger.warning("PrintTracker: límite de seguridad de %s páginas alcanzado en %s", max_pages, path)
+        return items
 
     def test_connection(self):
         """Prueba la conexión con PrintTracker API"""
@@ -60,7 +164,7 @@ class PrintTrackerConfig(models.Model):
             _logger.info(f"Probando conexión a {self.api_url} con entidad {self.entity_bbbb_id}")
             
             def _test_call():
-                return requests.get(
+                return self._get_session().get(
                     f'{self.api_url.rstrip("/")}/entity/{self.entity_bbbb_id}',
                     headers=self.get_api_headers(),
                     timeout=self.timeout_seconds
@@ -123,6 +227,68 @@ class PrintTrackerConfig(models.Model):
             raise ValueError("No hay configuración de PrintTracker configurada")
         return config
 
+    def fetch_all_devices(self, page_size=100, max_pages=50):
+        """Descarga todos los dispositivos de /entity/{id}/device"""
+        self.ensure_one()
+        return self._fetch_paginated(
+            f'/entity/{self.entity_bbbb_id}/device',
+            {'includeChildren': True, 'excludeDisabled': False},
+            page_size=page_size, max_pages=max_pages
+        )
+
+    def refresh_device_cache(self):
+        """Descarga los dispositivos y actualiza la caché local copier.printtracker.device"""
+        self.ensure_one()
+        devices = self.fetch_all_devices()
+        return self.env['copier.printtracker.device']._upsert_devices(devices)
+
+    def action_refresh_device_cache(self):
+        """Botón: refresca la caché de dispositivos"""
+        self.ensure_one()
+        try:
+            resultado = self.refresh_device_cache()
+        except Exception as e:
+            _logger.exception("Error refrescando caché de dispositivos PrintTracker")
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'message': f'Error: {str(e)}',
+                    'type': 'danger'
+                }
+            }
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Caché de Dispositivos PrintTracker',
+                'message': (
+                    f"Dispositivos recibidos: {resultado['total']}\n"
+                    f"Nuevos: {resultado['nuevos']}\n"
+                    f"Actualizados: {resultado['actualizados']}"
+                ),
+                'type': 'success'
+            }
+        }
+
+    def fetch_current_meters_index(self, page_size=100, max_pages=50):
+        """
+        Descarga todos los medidores actuales (/currentMeter) una sola vez
+        y los indexa por deviceKey.
+
+        Pensado para sincronizaciones masivas: una corrida mensual hace
+        como máximo `max_pages` peticiones en lugar de paginar por cada contador.
+        """
+        self.ensure_one()
+        meters = self._fetch_paginated(
+            f'/entity/{self.entity_bbbb_id}/currentMeter',
+            {'includeChildren': True},
+            page_size=page_size, max_pages=max_pages
+        )
+        meters_index = {m['deviceKey']: m for m in meters if m.get('deviceKey')}
+        _logger.info("PrintTracker: %s medidores indexados", len(meters_index))
+        return meters_index
+
 # ====================================================================================
 # ARCHIVO 2: models/copier_company.py (AGREGAR ESTOS CAMPOS Y MÉTODOS)
 # Extensión del modelo existente
@@ -154,17 +320,24 @@ class CopierCompany(models.Model):
             record.pt_mapped = bool(record.pt_device_id)
 
     def action_map_printtracker(self):
-        """Acción para mapear con PrintTracker por serie usando paginación del ejemplo"""
+        """Acción para mapear con PrintTracker por serie usando la caché local de dispositivos"""
         self.ensure_one()
         
         if not self.serie_id:
             raise UserError('La máquina debe tener una serie para mapear con PrintTracker.')
         
         try:
-            config = self.env['copier.printtracker.config'].get_active_config()
-            
-            # Buscar dispositivo con paginación siguiendo el patrón del ejemplo
-            device_found = self._search_device_with_pagination(config)
+            DeviceCache = self.env['copier.printtracker.device']
+            cached = DeviceCache.find_by_serial(self.serie_id)
+            if cached:
+                device_found = {
+                    'id': cached.device_key,
+                    'customLocation': cached.location,
+                }
+            else:
+                # Serie aún no está en caché: búsqueda remota (refresca la caché)
+                config = self.env['copier.printtracker.config'].get_active_config()
+                device_found = self._search_device_with_pagination(config)
             
             if device_found:
                 self.write({
@@ -176,7 +349,7 @@ class CopierCompany(models.Model):
                     'type': 'ir.actions.client',
                     'tag': 'display_notification',
                     'params': {
-                        'message': f'Máquina mapeada exitosamente con PrintTracker\nSerie: {self.serie_id}\nDispositivo ID: {device_found.get("id")}\nUbicación: {device_found.get("customLocation", "N/A")}',
+                        'message': f'Máquina mapeada exitosamente con PrintTracker\nSerie: {self.serie_id}\nDispositivo ID: {device_found.get("id")}\nUbicación: {device_found.get("customLocation") or "N/A"}',
                         'type': 'success'
                     }
                 }
@@ -201,102 +374,70 @@ class CopierCompany(models.Model):
                 }
             }
 
+    @api.model
+    def action_map_all_unmapped_printtracker(self):
+        """
+        Mapea todas las máquinas sin pt_device_id resolviendo sus series
+        contra la caché local en una sola consulta.
+        """
+        maquinas = self.search([('pt_device_id', '=', False), ('serie_id', '!=', False)])
+        maquinas_por_serie = {}
+        for maquina in maquinas:
+            maquinas_por_serie.setdefault(normalize_serial(maquina.serie_id), []).append(maquina)
+
+        dispositivos = self.env['copier.printtracker.device'].search([
+            ('serial_normalized', 'in', list(maquinas_por_serie))
+        ])
+
+        now = fields.Datetime.now()
+        mapeadas = 0
+        for dispositivo in dispositivos:
+            for maquina in maquinas_por_serie.get(dispositivo.serial_normalized, []):
+                maquina.write({'pt_device_id': dispositivo.device_key, 'pt_last_sync': now})
+                mapeadas += 1
+
+        _logger.info("PrintTracker: %s de %s máquinas sin mapear resueltas desde caché", mapeadas, len(maquinas))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Mapeo Masivo PrintTracker',
+                'message': (
+                    f'Máquinas sin mapear: {len(maquinas)}\n'
+                    f'Mapeadas: {mapeadas}\n'
+                    f'Sin coincidencia en caché: {len(maquinas) - mapeadas}'
+                ),
+                'type': 'success' if mapeadas == len(maquinas) else 'warning',
+                'sticky': True
+            }
+        }
+
     def _search_device_with_pagination(self, config):
         """
-        Búsqueda con paginación siguiendo exactamente el patrón del código de ejemplo
-        Basado en sync_all_devices del archivo printtracker_config.py
+        Busca el dispositivo por serie descargando todas las páginas de
+        /entity/{id}/device (en paralelo) y aprovecha la descarga para
+        refrescar la caché local de dispositivos.
         """
-        serie_buscar = self.serie_id.strip()
+        serie_buscar = normalize_serial(self.serie_id)
         _logger.info(f"Iniciando búsqueda paginada para serie: {serie_buscar}")
-        
-        all_devices = []
-        page = 1
-        total_pages_processed = 0
-        
-        # PAGINACIÓN COMPLETA siguiendo el patrón del ejemplo
-        while True:
-            _logger.info(f"=== PROCESANDO PÁGINA {page} ===")
-            
-            params = {
-                'includeChildren': True,
-                'excludeDisabled': False,  # Incluir dispositivos deshabilitados por si acaso
-                'limit': 100,             # Mismo límite que el ejemplo
-                'page': page              # Parámetro clave que faltaba
-            }
-            
-            def _devices_call():
-                return requests.get(
-                    f'{config.api_url.rstrip("/")}/entity/{config.entity_bbbb_id}/device',
-                    headers=config.get_api_headers(),
-                    params=params,
-                    timeout=config.timeout_seconds
-                )
-            
-            response = config._retry_api_call(_devices_call)
-            
-            _logger.info(f"Respuesta API página {page}: Status {response.status_code}")
-            
-            if response.status_code == 200:
-                devices_page = response.json()
-                
-                _logger.info(f"Página {page}: {len(devices_page)} dispositivos recibidos")
-                
-                if not devices_page:
-                    _logger.info(f"Página {page} vacía - Fin de datos")
-                    break
-                
-                # BUSCAR EN ESTA PÁGINA INMEDIATAMENTE
-                for device in devices_page:
-                    device_serial = device.get('serialNumber', '').strip()
-                    
-                    if device_serial == serie_buscar:
-                        _logger.info(f"DISPOSITIVO ENCONTRADO: {device_serial} -> ID: {device.get('id')}")
-                        _logger.info(f"Ubicación: {device.get('customLocation', 'N/A')}")
-                        _logger.info(f"Entidad: {device.get('entityKey', 'N/A')}")
-                        return device
-                
-                all_devices.extend(devices_page)
-                total_pages_processed += 1
-                
-                # Si la página está incompleta, es la última (patrón del ejemplo)
-                if len(devices_page) < 100:
-                    _logger.info(f"Página {page} incompleta - Última página")
-                    break
-                
-                page += 1
-                
-                # Límite de seguridad (del ejemplo)
-                if page > 50:
-                    _logger.warning(f"Límite de seguridad alcanzado: {page-1} páginas")
-                    break
-                    
-            else:
-                error_msg = f'Error HTTP {response.status_code} en página {page}: {response.text}'
-                _logger.error(f"Error de API: {error_msg}")
-                
-                if page == 1:
-                    raise Exception(error_msg)
-                else:
-                    _logger.warning(f"Error en página {page}, continuando con datos obtenidos")
-                    break
-        
-        # Log final de debug
-        _logger.info(f"=== RESUMEN BÚSQUEDA ===")
-        _logger.info(f"Páginas procesadas: {total_pages_processed}")
-        _logger.info(f"Total dispositivos revisados: {len(all_devices)}")
-        _logger.info(f"Serie buscada: '{serie_buscar}'")
-        
-        # Log de algunas series encontradas para debug
-        series_encontradas = [d.get('serialNumber', 'N/A') for d in all_devices[:10]]
-        _logger.info(f"Primeras 10 series encontradas: {series_encontradas}")
-        
+
+        all_devices = config.fetch_all_devices()
+        self.env['copier.printtracker.device']._upsert_devices(all_devices)
+
+        for device in all_devices:
+            if normalize_serial(device.get('serialNumber')) == serie_buscar:
+                _logger.info(f"DISPOSITIVO ENCONTRADO: {device.get('serialNumber')} -> ID: {device.get('id')}")
+                return device
+
+        _logger.info(f"Serie '{serie_buscar}' no encontrada entre {len(all_devices)} dispositivos")
         return None
+
     def debug_list_printtracker_devices(self):
         """Método de debug para listar los primeros dispositivos"""
         try:
             config = self.env['copier.printtracker.config'].get_active_config()
             
-            response = requests.get(
+            response = config._get_session().get(
                 f'{config.api_url.rstrip("/")}/entity/{config.entity_bbbb_id}/device',
                 headers=config.get_api_headers(),
                 params={
@@ -466,9 +607,12 @@ class CopierCounter(models.Model):
                 }
             }
 
-    def _obtener_ultima_lectura_printtracker_v2(self, config):
+    def _obtener_ultima_lectura_printtracker_v2(self, config, meters_index=None):
         """
-        Obtiene lecturas del endpoint /currentMeter buscando por deviceKey
+        Obtiene lecturas del endpoint /currentMeter buscando por deviceKey.
+
+        Si se pasa `meters_index` (ver fetch_current_meters_index) no se hace
+        ninguna petición HTTP.
         """
         _logger.info("--- Iniciando obtención de medidores ---")
         target_device_id = self.maquina_id.pt_device_id
@@ -479,74 +623,22 @@ class CopierCounter(models.Model):
             return None
         
         try:
-            # Usar endpoint currentMeter (no device/{id}/meter)
-            url = f'{config.api_url.rstrip("/")}/entity/{config.entity_bbbb_id}/currentMeter'
-            headers = config.get_api_headers()
-            
-            _logger.info(f"URL petición: {url}")
-            
-            page = 1
-            max_pages = 10
-            
-            while page <= max_pages:
-                params = {
-                    'includeChildren': True,
-                    'page': page,
-                    'limit': 100
-                }
-                
-                _logger.info(f"📄 Buscando en página {page}")
-                
-                response = requests.get(url, headers=headers, params=params, timeout=config.timeout_seconds)
-                
-                if response.status_code != 200:
-                    _logger.error(f"❌ HTTP {response.status_code}")
-                    break
-                
-                meters = response.json()
-                _logger.info(f"✅ Página {page}: {len(meters)} medidores")
-                
-                if not meters:
-                    _logger.info("Página vacía - fin de búsqueda")
-                    break
-                
-                # BUSCAR POR deviceKey (NO por deviceId._id)
-                for i, meter_data in enumerate(meters):
-                    device_key = meter_data.get('deviceKey')
-                    
-                    # Log del primer registro para debug
-                    if page == 1 and i == 0:
-                        _logger.info(f"Ejemplo estructura: deviceKey={device_key}")
-                    
-                    if device_key == target_device_id:
-                        _logger.info(f"🎯 ENCONTRADO en página {page}, posición {i+1}")
-                        _logger.info(f"deviceKey: {device_key}")
-                        _logger.info(f"Timestamp: {meter_data.get('timestamp')}")
-                        
-                        # Extraer contadores
-                        page_counts = meter_data.get('pageCounts', {})
-                        default_counts = page_counts.get('default') or page_counts.get('life')
-                        
-                        if not default_counts:
-                            _logger.error("❌ Sin estructura de contadores")
-                            return None
-                        
-                        total_black = self._safe_int(default_counts.get('totalBlack', {}).get('value', 0))
-                        total_color = self._safe_int(default_counts.get('totalColor', {}).get('value', 0))
-                        
-                        _logger.info(f"📊 B/N: {total_black:,} | Color: {total_color:,}")
-                        
-                        return meter_data
-                
-                # Si la página tiene menos de 100, es la última
-                if len(meters) < 100:
-                    _logger.info("Última página alcanzada")
-                    break
-                
-                page += 1
-            
-            _logger.error(f"❌ Device {target_device_id} NO encontrado en {page} páginas")
-            return None
+            if meters_index is None:
+                meters_index = config.fetch_current_meters_index()
+
+            meter_data = meters_index.get(target_device_id)
+            if not meter_data:
+                _logger.error(f"❌ Device {target_device_id} NO encontrado entre {len(meters_index)} medidores")
+                return None
+
+            page_counts = meter_data.get('pageCounts', {})
+            default_counts = page_counts.get('default') or page_counts.get('life')
+            if not default_counts:
+                _logger.error("❌ Sin estructura de contadores")
+                return None
+
+            _logger.info(f"🎯 ENCONTRADO deviceKey: {target_device_id} | Timestamp: {meter_data.get('timestamp')}")
+            return meter_data
             
         except Exception as e:
             _logger.error(f"💥 Error: {e}")
@@ -573,7 +665,7 @@ class CopierCounter(models.Model):
             for i, params in enumerate(test_cases):
                 try:
                     _logger.info(f"Probando caso {i+1}: {params}")
-                    response = requests.get(url, headers=headers, params=params, timeout=30)
+                    response = config._get_session().get(url, headers=headers, params=params, timeout=30)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -988,36 +1080,147 @@ Total a facturar: S/ {self.total:.2f}""",
         }
 
     def action_update_multiple_from_printtracker(self):
-        """Actualiza múltiples contadores desde PrintTracker"""
+        """
+        Actualiza múltiples contadores desde PrintTracker.
+
+        Descarga los medidores actuales una sola vez por corrida, los indexa
+        por deviceKey y aplica las lecturas a todos los borradores en una pasada.
+        """
         contadores_draft = self.filtered(lambda c: c.state == 'draft')
-        
+
         if not contadores_draft:
             raise UserError('Solo se pueden actualizar contadores en estado borrador.')
-        
-        actualizados = 0
-        errores = []
-        
-        for contador in contadores_draft:
-            try:
-                resultado = contador.action_update_from_printtracker()
-                if resultado['params']['type'] == 'success':
-                    actualizados += 1
-                else:
-                    errores.append(f"{contador.serie}: {resultado['params']['message']}")
-            except Exception as e:
-                errores.append(f"{contador.serie}: {str(e)}")
-        
-        mensaje = f"Proceso completado: {actualizados} contadores actualizados"
-        if errores:
-            mensaje += f", {len(errores)} errores"
-        
+
+        config = self.env['copier.printtracker.config'].get_active_config()
+        meters_index = config.fetch_current_meters_index()
+        reporte = contadores_draft._sync_from_printtracker_index(meters_index)
+
+        actualizados = len(reporte['actualizados'])
+        fallidos = reporte['no_mapeados'] + reporte['sin_lectura'] + reporte['validacion_fallida'] + reporte['errores']
+
+        mensaje_lineas = [
+            f"Proceso completado: {actualizados} contadores actualizados",
+            f"• Medidores descargados: {len(meters_index)}",
+            f"• Encontrados: {actualizados + len(reporte['validacion_fallida'])}",
+            f"• Sin lectura en PrintTracker: {len(reporte['sin_lectura'])}",
+            f"• Máquinas no mapeadas: {len(reporte['no_mapeados'])}",
+            f"• Validación fallida: {len(reporte['validacion_fallida'])}",
+            f"• Errores: {len(reporte['errores'])}",
+        ]
+        if fallidos:
+            mensaje_lineas.append("")
+            mensaje_lineas.extend(fallidos[:20])
+            if len(fallidos) > 20:
+                mensaje_lineas.append(f"... y {len(fallidos) - 20} más")
+
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': 'Actualización Masiva desde PrintTracker',
-                'message': mensaje,
-                'type': 'success' if not errores else 'warning',
+                'message': '\n'.join(mensaje_lineas),
+                'type': 'success' if not fallidos else 'warning',
                 'sticky': True
             }
-        }
\ No newline at end of file
+        }
+
+    def _sync_from_printtracker_index(self, meters_index):
+        """
+        Aplica a cada contador borrador la lectura indexada por deviceKey.
+
+        Retorna un reporte con las listas 'actualizados', 'no_mapeados',
+        'sin_lectura', 'validacion_fallida' y 'errores'.
+        """
+        reporte = {
+            'actualizados': [],
+            'no_mapeados': [],
+            'sin_lectura': [],
+            'validacion_fallida': [],
+            'errores': [],
+        }
+        maquinas_sincronizadas = self.env['copier.company']
+
+        for contador in self:
+            device_key = contador.maquina_id.pt_device_id
+            if not device_key:
+                reporte['no_mapeados'].append(f"{contador.serie}: máquina no mapeada")
+                continue
+
+            lectura_pt = meters_index.get(device_key)
+            if not lectura_pt:
+                reporte['sin_lectura'].append(f"{contador.serie}: sin lectura en PrintTracker")
+                continue
+
+            try:
+                with self.env.cr.savepoint():
+                    validacion = contador._validar_nuevos_contadores_pt(lectura_pt)
+                    if not validacion['valido']:
+                        reporte['validacion_fallida'].append(f"{contador.serie}: {validacion['mensaje']}")
+                        continue
+                    contador._actualizar_contadores_desde_printtracker(lectura_pt)
+                reporte['actualizados'].append(contador.serie)
+                maquinas_sincronizadas |= contador.maquina_id
+            except Exception as e:
+                _logger.exception("Error aplicando lectura PrintTracker a %s", contador.serie)
+                reporte['errores'].append(f"{contador.serie}: {str(e)}")
+
+        if maquinas_sincronizadas:
+            maquinas_sincronizadas.write({'pt_last_sync': fields.Datetime.now()})
+
+        _logger.info(
+            "Sincronización PrintTracker: %s actualizados, %s sin lectura, %s no mapeados, "
+            "%s con validación fallida, %s errores",
+            len(reporte['actualizados']), len(reporte['sin_lectura']), len(reporte['no_mapeados']),
+            len(reporte['validacion_fallida']), len(reporte['errores'])
+        )
+        return reporte
+
+    @api.model
+    def _get_printtracker_meters_index(self):
+        """
+        Medidores actuales indexados por deviceKey para procesos automáticos.
+        Si PrintTracker no está configurado o falla, retorna un dict vacío.
+        """
+        config = self.env['copier.printtracker.config'].search([], limit=1)
+        if not config:
+            return {}
+        try:
+            return config.fetch_current_meters_index()
+        except Exception as e:
+            _logger.exception("No se pudieron descargar los medidores de PrintTracker: %s", e)
+            return {}
+
+    @api.model
+    def _prefill_vals_from_printtracker(self, vals, lectura_pt):
+        """
+        Completa contador_actual_bn/color de unos vals de creación con la
+        lectura de PrintTracker. Solo aplica la lectura si no retrocede
+        respecto a los contadores anteriores. Retorna True si se aplicó.
+        """
+        if not lectura_pt:
+            return False
+
+        page_counts = lectura_pt.get('pageCounts', {})
+        default_counts = page_counts.get('default') or page_counts.get('life')
+        if not default_counts:
+            return False
+
+        contador_bn = self._safe_int(default_counts.get('totalBlack', {}).get('value', 0))
+        contador_color = self._safe_int(default_counts.get('totalColor', {}).get('value', 0))
+
+        if contador_bn < vals.get('contador_anterior_bn', 0) or contador_color < vals.get('contador_anterior_color', 0):
+            _logger.warning(
+                "Lectura PrintTracker descartada para máquina %s: B/N %s (anterior %s), Color %s (anterior %s)",
+                vals.get('maquina_id'), contador_bn, vals.get('contador_anterior_bn', 0),
+                contador_color, vals.get('contador_anterior_color', 0)
+            )
+            return False
+
+        timestamp = lectura_pt.get('timestamp')
+        vals.update({
+            'contador_actual_bn': contador_bn,
+            'contador_actual_color': contador_color,
+            'pt_updated': True,
+            'pt_last_reading_date': self._parse_printtracker_datetime(timestamp) if timestamp else fields.Datetime.now(),
+        })
+        return True
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# ====================================================================================
+# Caché local de dispositivos PrintTracker
+# Evita paginar /entity/{id}/device cada vez que se mapea una serie
+# ====================================================================================
+
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def normalize_serial(serial):
+    """Normaliza una serie para comparaciones: sin espacios y en mayúsculas"""
+    return ''.join((serial or '').split()).upper()
+
+
+class PrintTrackerDevice(models.Model):
+    _name = 'copier.printtracker.device'
+    _description = 'Caché de Dispositivos PrintTracker'
+    _rec_name = 'serial'
+    _order = 'serial asc'
+
+    serial = fields.Char('Serie', required=True)
+    serial_normalized = fields.Char(
+        'Serie Normalizada',
+        required=True,
+        index=True,
+        help='Serie sin espacios y en mayúsculas, usada para las búsquedas'
+    )
+    device_key = fields.Char('ID Dispositivo (deviceKey)', required=True, index=True)
+    location = fields.Char('Ubicación')
+    entity_key = fields.Char('Entidad')
+    last_seen = fields.Datetime('Visto por Última Vez', readonly=True)
+
+    _sql_constraints = [
+        ('serial_normalized_unique', 'UNIQUE(serial_normalized)',
+         'Ya existe un dispositivo en caché con esa serie.'),
+    ]
+
+    @api.model
+    def _prepare_cache_vals(self, device):
+        """Convierte un dispositivo de la API en valores de caché"""
+        serial = (device.get('serialNumber') or '').strip()
+        return {
+            'serial': serial,
+            'serial_normalized': normalize_serial(serial),
+            'device_key': device.get('id'),
+            'location': device.get('customLocation') or False,
+            'entity_key': device.get('entityKey') or False,
+        }
+
+    @api.model
+    def _upsert_devices(self, devices):
+        """
+        Actualización incremental de la caché: crea las series nuevas en un
+        solo create() y solo escribe las filas cuyos datos cambiaron.
+        """
+        now = fields.Datetime.now()
+        vals_por_serie = {}
+        for device in devices:
+            vals = self._prepare_cache_vals(device)
+            if vals['serial_normalized'] and vals['device_key']:
+                vals_por_serie[vals['serial_normalized']] = vals
+
+        existentes = {
+            rec.serial_normalized: rec
+            for rec in self.search([('serial_normalized', 'in', list(vals_por_serie))])
+        }
+
+        nuevos = []
+        actualizados = 0
+        for serie, vals in vals_por_serie.items():
+            registro = existentes.get(serie)
+            if not registro:
+                nuevos.append(dict(vals, last_seen=now))
+                continue
+            cambios = {k: v for k, v in vals.items() if registro[k] != v}
+            if cambios:
+                registro.write(cambios)
+                actualizados += 1
+
+        if nuevos:
+            self.create(nuevos)
+        if existentes:
+            self.browse([rec.id for rec in existentes.values()]).write({'last_seen': now})
+
+        _logger.info(
+            "Caché PrintTracker: %s dispositivos recibidos, %s nuevos, %s actualizados",
+            len(vals_por_serie), len(nuevos), actualizados
+        )
+        return {'total': len(vals_por_serie), 'nuevos': len(nuevos), 'actualizados': actualizados}
+
+    @api.model
+    def find_by_serial(self, serial):
+        """Busca un dispositivo en la caché local por serie"""
+        serie = normalize_serial(serial)
+        if not serie:
+            return self.browse()
+        return self.search([('serial_normalized', '=', serie)], limit=1)
+
+    @api.model
+    def _cron_refresh_cache(self):
+        """Cron: refresca la caché con todos los dispositivos de PrintTracker"""
+        config = self.env['copier.printtracker.config'].search([], limit=1)
+        if not config:
+            _logger.info("Caché PrintTracker: no hay configuración, se omite el refresco")
+            return False
+        try:
+            return config.refresh_device_cache()
+        except Exception as e:
+            _logger.exception("Error refrescando caché de dispositivos PrintTracker: %s", e)
+            return False
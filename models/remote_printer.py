@@ -2,8 +2,6 @@
 import logging
 from datetime import timedelta, datetime
 import pytz
-import requests
-import json
 import re
 
 from odoo import models, fields, api, _
@@ -374,19 +372,7 @@ class RemoteAssistanceRequest(models.Model):
     # ========= WhatsApp =========
     def send_whatsapp_message(self, phone, message):
         """Envía mensaje de WhatsApp usando la API corporativa (no bloqueante)."""
-        try:
-            url = 'https://whatsappapi.copiercompanysac.com/api/message'
-            data = {'phone': phone, 'message': message}
-            headers = {'Content-Type': 'application/json'}
-            response = requests.post(url, headers=headers, json=data)
-            try:
-                return response.json()
-            except json.JSONDecodeError as e:
-                _logger.error("Respuesta WhatsApp no es JSON válido: %s", e)
-                return {"error": "Respuesta no-JSON de la API"}
-        except Exception as e:
-            _logger.exception("Error enviando WhatsApp: %s", e)
-            return {"error": str(e)}
+        return self.env['whatsapp.config']._send_corporate_whatsapp(phone, message)
 
     def send_whatsapp_confirmation(self):
         self.ensure_one()
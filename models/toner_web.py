@@ -3,8 +3,6 @@
 import logging
 from datetime import timedelta
 from odoo import models, fields, api
-import requests
-import json
 from datetime import datetime
 import pytz
 from odoo.exceptions import ValidationError
@@ -474,30 +472,7 @@ class TonerRequest(models.Model):
 
     def send_whatsapp_message(self, phone, message):
         """Envía mensaje de WhatsApp usando la API corporativa"""
-        try:
-            url = 'https://whatsappapi.copiercompanysac.com/api/message'
-            data = {
-                'phone': phone,
-                'message': message
-            }
-            headers = {'Content-Type': 'application/json'}
-            response = requests.post(url, headers=headers, json=data)
-            
-            _logger.info("WhatsApp API - Código de estado: %s", response.status_code)
-            _logger.info("WhatsApp API - Respuesta: %s", response.text)
-            
-            try:
-                response_json = response.json()
-                _logger.info("WhatsApp API - Respuesta JSON: %s", response_json)
-                return response_json
-            except json.JSONDecodeError as e:
-                error_msg = f"La respuesta no contiene un JSON válido: {str(e)}"
-                _logger.error(error_msg)
-                return {"error": error_msg}
-                
-        except Exception as e:
-            _logger.exception("Error enviando mensaje WhatsApp: %s", str(e))
-            return {"error": str(e)}
+        return self.env['whatsapp.config']._send_corporate_whatsapp(phone, message)
 
     def send_whatsapp_confirmation(self):
         """Envía confirmación por WhatsApp al cliente que solicitó el toner"""
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+from . import whatsapp_gateway
+
 _logger = logging.getLogger(__name__)
 
 
@@ -94,23 +98,39 @@ class WhatsAppConfig(models.Model):
     # ============================================
     # ESTADÍSTICAS GLOBALES
     # ============================================
+    # Calculadas desde el registro de envíos (whatsapp.send.log): cada envío
+    # inserta una fila en lugar de actualizar esta configuración, así los envíos
+    # concurrentes no compiten por el bloqueo de una sola fila
     total_messages_sent = fields.Integer(
         'Mensajes Enviados', 
-        readonly=True, 
-        default=0,
+        compute='_compute_message_stats',
         help='Total de mensajes enviados exitosamente'
     )
     total_messages_failed = fields.Integer(
         'Mensajes Fallidos', 
-        readonly=True, 
-        default=0,
+        compute='_compute_message_stats',
         help='Total de mensajes que fallaron'
     )
     last_message_date = fields.Datetime(
         'Último Mensaje Enviado', 
-        readonly=True
+        compute='_compute_message_stats'
     )
     
+    def _compute_message_stats(self):
+        stats = {
+            (config.id, success): (count, last_date)
+            for config, success, count, last_date in self.env['whatsapp.send.log'].sudo()._read_group(
+                [('config_id', 'in', self.ids)],
+                groupby=['config_id', 'success'],
+                aggregates=['__count', 'date:max'],
+            )
+        }
+        for record in self:
+            sent_count, last_date = stats.get((record.id, True), (0, False))
+            record.total_messages_sent = sent_count
+            record.total_messages_failed = stats.get((record.id, False), (0, False))[0]
+            record.last_message_date = last_date
+    
     # ============================================
     # OPCIONES GENERALES
     # ============================================
@@ -125,6 +145,36 @@ class WhatsAppConfig(models.Model):
         help='Verificar que los números existen en WhatsApp antes de enviar'
     )
     
+    verify_cache_hours = fields.Integer(
+        'Vigencia de Verificación (horas)',
+        default=72,
+        help='Horas durante las que se reutiliza el resultado de verificar un número'
+    )
+    
+    # ============================================
+    # BANDEJA DE SALIDA
+    # ============================================
+    outbox_rate = fields.Float(
+        'Mensajes por Segundo',
+        default=1.0,
+        help='Ritmo máximo de envío del despachador de la bandeja de salida'
+    )
+    outbox_batch_size = fields.Integer(
+        'Mensajes por Lote',
+        default=30,
+        help='Cantidad de mensajes que el despachador envía en cada ejecución'
+    )
+    outbox_workers = fields.Integer(
+        'Envíos en Paralelo',
+        default=4,
+        help='Cantidad máxima de envíos simultáneos al gateway (siempre dentro del límite por segundo)'
+    )
+    outbox_max_attempts = fields.Integer(
+        'Intentos Máximos',
+        default=5,
+        help='Intentos antes de marcar un mensaje como fallido (con espera exponencial entre intentos)'
+    )
+    
     # ============================================
     # CONSTRAINTS
     # ============================================
@@ -174,11 +224,7 @@ class WhatsAppConfig(models.Model):
         self.ensure_one()
         
         try:
-            response = requests.get(
-                f"{self.api_url}/api/status",
-                headers={'x-api-key': self.api_key},
-                timeout=5
-            )
+            response = whatsapp_gateway.get_status(self.api_url, self.api_key)
             
             current_time = fields.Datetime.now()
             
@@ -301,40 +347,63 @@ Error: {str(e)}"""
             phone (str): Número de teléfono limpio (ej: 51987654321)
             
         Returns:
-            bool: True si existe, False si no
+            bool|None: True si existe, False si no, None si no se pudo verificar
+        """
+        self.ensure_one()
+        return self.verify_numbers([phone]).get(phone)
+    
+    def verify_numbers(self, phones):
+        """
+        Verificar varios números en una sola pasada.
+        Usa la caché whatsapp.number.check (vigencia verify_cache_hours) y
+        consulta al gateway en paralelo solo los números sin resultado vigente.
+        
+        Args:
+            phones (list): Números limpios
+            
+        Returns:
+            dict: {phone: True/False}, o None si el gateway falló al consultar
+                  ese número (no se guarda en caché)
         """
         self.ensure_one()
+        phones = list(dict.fromkeys(phone for phone in phones if phone))
         
         if not self.auto_verify_numbers:
-            return True
+            return {phone: True for phone in phones}
         
-        try:
-            import json
-            
-            response = requests.post(
-                f"{self.api_url}/api/check-number",
-                headers={
-                    'x-api-key': self.api_key,
-                    'Content-Type': 'application/json'
-                },
-                data=json.dumps({'number': phone}),
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                exists = data.get('data', {}).get('exists', False)
-                
+        cache = self.env['whatsapp.number.check'].sudo()
+        resultados = cache._get_fresh(phones, self.verify_cache_hours)
+        faltantes = [phone for phone in phones if phone not in resultados]
+        if not faltantes:
+            return resultados
+        
+        # Los hilos solo hacen HTTP: la URL y la API key se leen aquí, no en cada hilo
+        api_url = self.api_url
+        api_key = self.api_key
+        
+        def consultar(phone):
+            try:
+                return phone, whatsapp_gateway.check_number(api_url, api_key, phone)
+            except Exception as e:
+                _logger.error("Error verificando número WhatsApp %s: %s", phone, str(e))
+                return phone, None
+        
+        consultados = {}
+        workers = max(1, min(len(faltantes), self.outbox_workers or 1))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for phone, exists in pool.map(consultar, faltantes):
+                # Los errores del gateway no se guardan en caché ni cuentan como "no existe"
+                if exists is not None:
+                    consultados[phone] = exists
+                resultados[phone] = exists
                 if self.log_messages:
-                    _logger.info("📱 Verificación número %s: %s", phone, "Existe" if exists else "No existe")
-                
-                return exists
-            
-            return False
-            
-        except Exception as e:
-            _logger.error("Error verificando número WhatsApp %s: %s", phone, str(e))
-            return False
+                    _logger.info(
+                        "📱 Verificación número %s: %s", phone,
+                        "Sin verificar" if exists is None else ("Existe" if exists else "No existe")
+                    )
+        
+        cache._store(consultados)
+        return resultados
     
     def send_message(self, phone, message):
         """
@@ -349,88 +418,19 @@ Error: {str(e)}"""
         """
         self.ensure_one()
         
-        try:
-            import json
-            
-            payload = {
-                'number': phone,
-                'text': message
-            }
-            
+        if self.log_messages:
+            _logger.info("📤 Enviando mensaje WhatsApp a: %s", phone)
+        
+        result = whatsapp_gateway.send_text(self.api_url, self.api_key, phone, message)
+        self._log_send(phone, result['success'], result['error'], channel='text')
+        
+        if result['success']:
             if self.log_messages:
-                _logger.info("📤 Enviando mensaje WhatsApp a: %s", phone)
-            
-            response = requests.post(
-                f"{self.api_url}/api/send/text",
-                headers={
-                    'x-api-key': self.api_key,
-                    'Content-Type': 'application/json'
-                },
-                data=json.dumps(payload),
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                if result.get('success'):
-                    # Actualizar estadísticas
-                    self.write({
-                        'total_messages_sent': self.total_messages_sent + 1,
-                        'last_message_date': fields.Datetime.now()
-                    })
-                    
-                    if self.log_messages:
-                        _logger.info("✅ Mensaje enviado exitosamente a %s", phone)
-                    
-                    return {
-                        'success': True,
-                        'message_id': result.get('data', {}).get('messageId'),
-                        'error': None
-                    }
-                else:
-                    error_msg = result.get('message', 'Error desconocido')
-                    
-                    self.write({
-                        'total_messages_failed': self.total_messages_failed + 1
-                    })
-                    
-                    _logger.error("❌ Error enviando mensaje: %s", error_msg)
-                    
-                    return {
-                        'success': False,
-                        'message_id': None,
-                        'error': error_msg
-                    }
-            else:
-                error_msg = f"HTTP {response.status_code}: {response.text}"
-                
-                self.write({
-                    'total_messages_failed': self.total_messages_failed + 1
-                })
-                
-                _logger.error("❌ Error HTTP enviando mensaje: %s", error_msg)
-                
-                return {
-                    'success': False,
-                    'message_id': None,
-                    'error': error_msg
-                }
-                
-        except Exception as e:
-            error_msg = str(e)
-            
-            self.write({
-                'total_messages_failed': self.total_messages_failed + 1
-            })
-            
-            _logger.exception("❌ Excepción enviando mensaje WhatsApp: %s", error_msg)
-            
-            return {
-                'success': False,
-                'message_id': None,
-                'error': error_msg
-            }
+                _logger.info("✅ Mensaje enviado exitosamente a %s", phone)
+        else:
+            _logger.error("❌ Error enviando mensaje: %s", result['error'])
+        
+        return result
     
     def send_media(self, phone, file_data, media_type='document', caption='', filename=None):
         """
@@ -448,126 +448,20 @@ Error: {str(e)}"""
         """
         self.ensure_one()
 
-        try:
-            import tempfile
-            import os
-            import base64
-            import mimetypes
-            import requests
-
-            # -------------------------------------------------
-            # Decodificar base64 si es necesario
-            # -------------------------------------------------
-            if isinstance(file_data, str):
-                file_data = base64.b64decode(file_data)
-
-            # -------------------------------------------------
-            # Determinar extensión y MIME
-            # -------------------------------------------------
-            suffix_map = {
-                'image': '.jpg',
-                'document': '.pdf',
-                'video': '.mp4',
-                'audio': '.mp3'
-            }
-            suffix = suffix_map.get(media_type, '.bin')
-
-            if filename:
-                mime_type, _ = mimetypes.guess_type(filename)
-            else:
-                mime_type = None
-
-            mime_type = mime_type or {
-                'image': 'image/jpeg',
-                'document': 'application/pdf',
-                'video': 'video/mp4',
-                'audio': 'audio/mpeg'
-            }.get(media_type, 'application/octet-stream')
-
-            real_filename = filename or f'file{suffix}'
-
-            # -------------------------------------------------
-            # Crear archivo temporal
-            # -------------------------------------------------
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                tmp.write(file_data)
-                tmp_path = tmp.name
-
-            try:
-                # -------------------------------------------------
-                # Endpoint según tipo
-                # -------------------------------------------------
-                endpoint_map = {
-                    'image': '/api/send/image',
-                    'document': '/api/send/document',
-                    'video': '/api/send/video',
-                    'audio': '/api/send/audio'
-                }
-                endpoint = endpoint_map.get(media_type, '/api/send/document')
-
-                _logger.info("📤 Enviando %s a %s (%s)", media_type, phone, real_filename)
+        _logger.info("📤 Enviando %s a %s (%s)", media_type, phone, filename or media_type)
 
-                with open(tmp_path, 'rb') as f:
-                    files = {
-                        'file': (real_filename, f, mime_type)
-                    }
-                    data = {
-                        'number': phone,
-                        'caption': caption or ''
-                    }
+        result = whatsapp_gateway.send_media(
+            self.api_url, self.api_key, phone, file_data,
+            media_type=media_type, caption=caption, filename=filename
+        )
+        self._log_send(phone, result['success'], result['error'], channel='media')
 
-                    response = requests.post(
-                        f"{self.api_url}{endpoint}",
-                        headers={'x-api-key': self.api_key},
-                        files=files,
-                        data=data,
-                        timeout=30
-                    )
-
-                _logger.info("📡 WhatsApp API Status: %s", response.status_code)
-
-                if response.status_code == 200:
-                    result = response.json()
-
-                    if result.get('success'):
-                        self.write({
-                            'total_messages_sent': self.total_messages_sent + 1,
-                            'last_message_date': fields.Datetime.now()
-                        })
-
-                        _logger.info("✅ Archivo enviado correctamente a %s", phone)
-
-                        return {
-                            'success': True,
-                            'message_id': result.get('data', {}).get('messageId'),
-                            'error': None
-                        }
-
-                    error_msg = result.get('message', 'Error desconocido')
-                else:
-                    error_msg = f"HTTP {response.status_code}: {response.text}"
-
-                self.write({'total_messages_failed': self.total_messages_failed + 1})
-                _logger.error("❌ Error enviando archivo: %s", error_msg)
-
-                return {
-                    'success': False,
-                    'message_id': None,
-                    'error': error_msg
-                }
-
-            finally:
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+        if result['success']:
+            _logger.info("✅ Archivo enviado correctamente a %s", phone)
+        else:
+            _logger.error("❌ Error enviando archivo: %s", result['error'])
 
-        except Exception as e:
-            self.write({'total_messages_failed': self.total_messages_failed + 1})
-            _logger.exception("❌ Excepción enviando media")
-            return {
-                'success': False,
-                'message_id': None,
-                'error': str(e)
-            }
+        return result
 
     # ============================================
     # MÉTODOS AUXILIARES
@@ -621,6 +515,42 @@ Error: {str(e)}"""
         
         return clean
     
+    def _log_send(self, phone, success, error=None, channel='text'):
+        """Registra un envío en el log append-only (no bloquea la fila de configuración)"""
+        self.ensure_one()
+        try:
+            self.env['whatsapp.send.log'].sudo().create({
+                'config_id': self.id,
+                'phone': phone,
+                'success': success,
+                'channel': channel,
+                'error': (error or '')[:500] or False,
+            })
+        except Exception as e:
+            _logger.warning("No se pudo registrar el envío WhatsApp en el log: %s", e)
+    
+    @api.model
+    def _send_corporate_whatsapp(self, phone, message, form=False):
+        """
+        Enviar texto por la API corporativa (alertas de stock, toner,
+        contadores y asistencia remota) usando el cliente compartido.
+        form=True: envío form-encoded, como lo hacen las alertas de stock.
+        """
+        base_url = self.env['ir.config_parameter'].sudo().get_param('copier_company.whatsapp_corporate_url')
+        return whatsapp_gateway.send_corporate_message(phone, message, base_url=base_url or None, form=form)
+    
+    def action_show_gateway_metrics(self):
+        """Mostrar latencia de las llamadas al gateway en este proceso"""
+        metrics = whatsapp_gateway.get_metrics()
+        if not metrics:
+            return self._show_notification('Aún no hay llamadas al gateway en este proceso.', 'info')
+        lines = [
+            f"{endpoint}: {m['calls']} llamadas, {m['errors']} errores, "
+            f"prom. {m['avg_ms']:.0f} ms, máx. {m['max_ms']:.0f} ms"
+            for endpoint, m in sorted(metrics.items())
+        ]
+        return self._show_notification('\n'.join(lines), 'info')
+    
     def _show_notification(self, message, notification_type='info'):
         """Helper para mostrar notificaciones en UI"""
         return {
@@ -660,6 +590,80 @@ Error: {str(e)}"""
             ) % self.env.company.name)  # ✅ AGREGAR nombre de compañía
         return config
 
+# ============================================
+# LOG DE ENVÍOS (ESTADÍSTICAS)
+# ============================================
+class WhatsAppSendLog(models.Model):
+    _name = 'whatsapp.send.log'
+    _description = 'Log de Envíos WhatsApp'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    config_id = fields.Many2one(
+        'whatsapp.config',
+        string='Configuración',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    date = fields.Datetime('Fecha', default=fields.Datetime.now, required=True, index=True)
+    phone = fields.Char('Número')
+    success = fields.Boolean('Exitoso', index=True)
+    channel = fields.Selection([
+        ('text', 'Texto'),
+        ('media', 'Archivo'),
+    ], string='Tipo', default='text')
+    error = fields.Char('Error')
+
+
+# ============================================
+# CACHÉ DE VERIFICACIÓN DE NÚMEROS
+# ============================================
+class WhatsAppNumberCheck(models.Model):
+    _name = 'whatsapp.number.check'
+    _description = 'Caché de Verificación de Números WhatsApp'
+    _rec_name = 'phone'
+    _log_access = False
+
+    phone = fields.Char('Número', required=True, index=True)
+    is_whatsapp = fields.Boolean('Existe en WhatsApp')
+    checked_at = fields.Datetime('Verificado', required=True, index=True)
+
+    _sql_constraints = [
+        ('phone_unique', 'UNIQUE(phone)', 'El número ya está en la caché de verificación.'),
+    ]
+
+    @api.model
+    def _get_fresh(self, phones, ttl_hours):
+        """Resultados vigentes de la caché: {phone: bool}"""
+        if not phones or not ttl_hours or ttl_hours <= 0:
+            return {}
+        limite = fields.Datetime.now() - timedelta(hours=ttl_hours)
+        return {
+            rec.phone: rec.is_whatsapp
+            for rec in self.search([('phone', 'in', phones), ('checked_at', '>=', limite)])
+        }
+
+    @api.model
+    def _store(self, results):
+        """Guarda {phone: bool} con un solo upsert"""
+        if not results:
+            return
+        self.flush_model()
+        now = fields.Datetime.now()
+        values = [(phone, exists, now) for phone, exists in results.items()]
+        placeholders = ', '.join(['(%s, %s, %s)'] * len(values))
+        params = [value for row in values for value in row]
+        self.env.cr.execute(f"""
+            INSERT INTO whatsapp_number_check (phone, is_whatsapp, checked_at)
+            VALUES {placeholders}
+            ON CONFLICT (phone) DO UPDATE
+               SET is_whatsapp = EXCLUDED.is_whatsapp,
+                   checked_at = EXCLUDED.checked_at
+        """, params)
+        self.invalidate_model(['is_whatsapp', 'checked_at'])
+
+
 # ============================================
 # WIZARD: ENVIAR MENSAJE DE PRUEBA
 # ============================================
@@ -700,7 +704,8 @@ class WhatsAppTestMessageWizard(models.TransientModel):
         # Verificar que el número existe (opcional)
         if self.config_id.auto_verify_numbers:
             exists = self.config_id.verify_number(clean_phone)
-            if not exists:
+            # None: no se pudo verificar; se intenta el envío igualmente
+            if exists is False:
                 raise ValidationError(_(
                     'El número %s no existe en WhatsApp o no está registrado.'
                 ) % self.phone)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP único para los gateways de WhatsApp.
+
+Todos los envíos (Baileys de whatsapp.config, API corporativa usada por
+alertas de stock, toner, contadores y asistencia remota) pasan por aquí:
+sesión requests compartida con pool de conexiones (keep-alive), timeouts
+uniformes, reintentos solo ante errores de conexión (un POST ya recibido
+no se repite para no duplicar mensajes) y métricas de latencia por endpoint.
+
+Módulo sin ORM: puede usarse desde hilos del despachador de la bandeja de salida.
+"""
+
+import base64
+import logging
+import mimetypes
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_logger = logging.getLogger(__name__)
+
+# API corporativa (whatsappapi.copiercompanysac.com); se puede sobreescribir
+# con el parámetro de sistema copier_company.whatsapp_corporate_url
+CORPORATE_API_URL = 'https://whatsappapi.copiercompanysac.com'
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+POOL_SIZE = 10
+MAX_RETRIES = 2
+
+MEDIA_ENDPOINTS = {
+    'image': '/api/send/image',
+    'document': '/api/send/document',
+    'video': '/api/send/video',
+    'audio': '/api/send/audio',
+}
+MEDIA_MIME_TYPES = {
+    'image': 'image/jpeg',
+    'document': 'application/pdf',
+    'video': 'video/mp4',
+    'audio': 'audio/mpeg',
+}
+MEDIA_SUFFIXES = {
+    'image': '.jpg',
+    'document': '.pdf',
+    'video': '.mp4',
+    'audio': '.mp3',
+}
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+_METRICS = {}
+_METRICS_LOCK = threading.Lock()
+_LIMITERS = {}
+
+
+def _record_metric(endpoint, elapsed_ms, ok):
+    with _METRICS_LOCK:
+        metric = _METRICS.setdefault(endpoint, {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        metric['calls'] += 1
+        metric['errors'] += 0 if ok else 1
+        metric['total_ms'] += elapsed_ms
+        metric['max_ms'] = max(metric['max_ms'], elapsed_ms)
+
+
+def get_metrics():
+    """Métricas de latencia por endpoint desde el inicio del proceso"""
+    with _METRICS_LOCK:
+        return {
+            endpoint: dict(metric, avg_ms=metric['total_ms'] / metric['calls'] if metric['calls'] else 0.0)
+            for endpoint, metric in _METRICS.items()
+        }
+
+
+class RateLimiter:
+    """
+    Limitador de mensajes por segundo compartido por todos los hilos del
+    proceso: cada acquire() reserva el siguiente turno libre y espera hasta él.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(self._next_slot, ahora)
+            self._next_slot = turno + 1.0 / self.rate
+        espera = turno - ahora
+        if espera > 0:
+            time.sleep(espera)
+
+
+def get_rate_limiter(name, rate):
+    """Limitador global por nombre; actualiza la tasa si cambió la configuración"""
+    with _CLIENTS_LOCK:
+        limiter = _LIMITERS.get(name)
+        if limiter is None:
+            limiter = _LIMITERS[name] = RateLimiter(rate)
+        limiter.rate = rate
+        return limiter
+
+
+class GatewayClient:
+    """Cliente HTTP con sesión compartida para una URL base y API key"""
+
+    def __init__(self, base_url, api_key=None, pool_size=POOL_SIZE, max_retries=MAX_RETRIES):
+        self.base_url = (base_url or '').rstrip('/')
+        self.api_key = api_key
+        self.session = requests.Session()
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=0,
+            backoff_factor=0.5,
+            allowed_methods=None,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['x-api-key'] = api_key
+
+    def request(self, method, path, timeout=None, **kwargs):
+        """Ejecuta una petición registrando la latencia; las excepciones se propagan"""
+        inicio = time.monotonic()
+        ok = False
+        try:
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path}",
+                timeout=(CONNECT_TIMEOUT, timeout or READ_TIMEOUT),
+                **kwargs
+            )
+            ok = response.status_code < 400
+            return response
+        finally:
+            elapsed_ms = (time.monotonic() - inicio) * 1000.0
+            _record_metric(f"{method.upper()} {path}", elapsed_ms, ok)
+            _logger.debug("WhatsApp gateway %s %s: %.0f ms", method.upper(), path, elapsed_ms)
+
+
+def get_client(base_url, api_key=None):
+    """Cliente compartido por (URL, API key): reutiliza conexiones entre llamadas"""
+    key = ((base_url or '').rstrip('/'), api_key or '')
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = GatewayClient(base_url, api_key)
+        return client
+
+
+# ============================================
+# BAILEYS (whatsapp.config)
+# ============================================
+
+def _baileys_result(response):
+    """Convierte la respuesta de Baileys en {'success', 'message_id', 'error'}"""
+    if response.status_code == 200:
+        result = response.json()
+        if result.get('success'):
+            return {
+                'success': True,
+                'message_id': result.get('data', {}).get('messageId'),
+                'error': None
+            }
+        error_msg = result.get('message', 'Error desconocido')
+    else:
+        error_msg = f"HTTP {response.status_code}: {response.text}"
+    return {'success': False, 'message_id': None, 'error': error_msg}
+
+
+def send_text(api_url, api_key, phone, text, timeout=15):
+    """Envía un texto por Baileys"""
+    try:
+        response = get_client(api_url, api_key).request(
+            'POST', '/api/send/text', json={'number': phone, 'text': text}, timeout=timeout
+        )
+        return _baileys_result(response)
+    except Exception as e:
+        _logger.exception("❌ Excepción enviando mensaje WhatsApp: %s", e)
+        return {'success': False, 'message_id': None, 'error': str(e)}
+
+
+def send_media(api_url, api_key, phone, file_data, media_type='document',
+               caption='', filename=None, timeout=30):
+    """
+    Envía un archivo por Baileys.
+    El contenido se envía desde memoria (sin archivo temporal), así un mismo
+    PDF se reutiliza para todos los destinatarios sin volver a escribirlo.
+    """
+    try:
+        if isinstance(file_data, str):
+            file_data = base64.b64decode(file_data)
+
+        mime_type = mimetypes.guess_type(filename)[0] if filename else None
+        mime_type = mime_type or MEDIA_MIME_TYPES.get(media_type, 'application/octet-stream')
+        real_filename = filename or f"file{MEDIA_SUFFIXES.get(media_type, '.bin')}"
+
+        response = get_client(api_url, api_key).request(
+            'POST', MEDIA_ENDPOINTS.get(media_type, '/api/send/document'),
+            files={'file': (real_filename, file_data, mime_type)},
+            data={'number': phone, 'caption': caption or ''},
+            timeout=timeout
+        )
+        _logger.info("📡 WhatsApp API Status: %s", response.status_code)
+        return _baileys_result(response)
+    except Exception as e:
+        _logger.exception("❌ Excepción enviando media")
+        return {'success': False, 'message_id': None, 'error': str(e)}
+
+
+def check_number(api_url, api_key, phone, timeout=10):
+    """
+    Retorna True/False si el número existe en WhatsApp.
+    Lanza excepción si la llamada falla o el gateway no responde 200
+    (401, 429, 5xx...): eso no dice nada sobre el número.
+    """
+    response = get_client(api_url, api_key).request(
+        'POST', '/api/check-number', json={'number': phone}, timeout=timeout
+    )
+    if response.status_code != 200:
+        raise requests.HTTPError(f"HTTP {response.status_code}: {response.text}", response=response)
+    return bool(response.json().get('data', {}).get('exists', False))
+
+
+def get_status(api_url, api_key, timeout=5):
+    """Consulta /api/status; retorna la respuesta HTTP"""
+    return get_client(api_url, api_key).request('GET', '/api/status', timeout=timeout)
+
+
+# ============================================
+# API CORPORATIVA
+# ============================================
+
+def send_corporate_message(phone, message, base_url=None, timeout=30, form=False):
+    """
+    Envía un texto por la API corporativa.
+
+    Cada llamador conserva la codificación que usaba contra la API:
+    form=True envía form-encoded con 'type': 'text' (alertas de stock);
+    por defecto se envía JSON {'phone', 'message'} (toner, contadores y
+    asistencia remota).
+
+    Returns:
+        dict: JSON de la API; {'success': False, 'error': ...} si la llamada
+              falla, la respuesta no es 2xx o el cuerpo no es un objeto JSON
+    """
+    try:
+        client = get_client(base_url or CORPORATE_API_URL)
+        if form:
+            response = client.request(
+                'POST', '/api/message', data={'phone': phone, 'type': 'text', 'message': message}, timeout=timeout
+            )
+        else:
+            response = client.request(
+                'POST', '/api/message', json={'phone': phone, 'message': message}, timeout=timeout
+            )
+        _logger.info("WhatsApp API - Código de estado: %s", response.status_code)
+        if not 200 <= response.status_code < 300:
+            return {'success': False, 'error': f"HTTP {response.status_code}: {response.text[:500]}"}
+        try:
+            result = response.json()
+        except ValueError as e:
+            _logger.error("Respuesta WhatsApp no es JSON válido: %s", e)
+            return {'success': False, 'error': f"La respuesta no contiene un JSON válido: {e}"}
+        if not isinstance(result, dict):
+            return {'success': False, 'error': f"Respuesta inesperada de la API: {result!r}"[:500]}
+        return result
+    except Exception as e:
+        _logger.exception("Error enviando mensaje WhatsApp: %s", e)
+        return {'success': False, 'error': str(e)}
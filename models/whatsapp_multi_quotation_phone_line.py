@@ -140,6 +140,8 @@ class WhatsAppMultiQuotationPhoneLine(models.TransientModel):
         # Verificar con la API
         try:
             exists = self.wizard_id.config_id.verify_number(self.phone_clean)
+            if exists is None:
+                raise UserError(_('El gateway de WhatsApp no respondió; intente nuevamente.'))
             
             self.write({
                 'is_verified': True,
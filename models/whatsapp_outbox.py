@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+# ====================================================================================
+# Bandeja de salida de WhatsApp
+# Los botones, wizards y transiciones de estado solo encolan; un cron despacha
+# los mensajes por lotes respetando el límite de mensajes por segundo del gateway.
+# ====================================================================================
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from functools import partial
+
+from psycopg2.errors import UniqueViolation
+
+from odoo import models, fields, api, _
+
+from . import whatsapp_gateway
+
+_logger = logging.getLogger(__name__)
+
+# Mensajes que quedaron en 'sending' más de este tiempo se consideran huérfanos
+# (worker reiniciado a mitad de envío) y vuelven a la cola
+SENDING_STALE_MINUTES = 15
+
+
+class WhatsAppOutbox(models.Model):
+    _name = 'whatsapp.outbox'
+    _description = 'Bandeja de Salida WhatsApp'
+    _order = 'priority desc, id asc'
+    _rec_name = 'phone'
+
+    config_id = fields.Many2one(
+        'whatsapp.config',
+        string='Configuración WhatsApp',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        related='config_id.company_id',
+        store=True,
+        readonly=True
+    )
+    phone = fields.Char('Número', required=True, help='Número limpio formato: 51987654321')
+    recipient_name = fields.Char('Destinatario')
+    body = fields.Text('Mensaje')
+
+    message_type = fields.Selection([
+        ('text', 'Texto'),
+        ('media', 'Archivo'),
+    ], string='Tipo', default='text', required=True)
+    media_type = fields.Selection([
+        ('document', 'Documento'),
+        ('image', 'Imagen'),
+        ('video', 'Video'),
+        ('audio', 'Audio'),
+    ], string='Tipo de Archivo', default='document')
+    attachment_id = fields.Many2one('ir.attachment', string='Archivo', ondelete='set null')
+
+    state = fields.Selection([
+        ('queued', 'En Cola'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    ], string='Estado', default='queued', required=True, index=True)
+    priority = fields.Integer('Prioridad', default=10, help='Mayor prioridad se envía primero')
+    attempts = fields.Integer('Intentos', default=0, readonly=True)
+    next_attempt = fields.Datetime('Próximo Intento', default=fields.Datetime.now, index=True)
+    sent_date = fields.Datetime('Fecha de Envío', readonly=True)
+    whatsapp_message_id = fields.Char('ID Mensaje WhatsApp', readonly=True)
+    error_message = fields.Text('Error', readonly=True)
+    verify_number = fields.Boolean(
+        'Verificar Número',
+        default=False,
+        help='Verificar que el número existe en WhatsApp antes de enviar'
+    )
+
+    dedup_key = fields.Char(
+        'Clave de Deduplicación',
+        index=True,
+        copy=False,
+        help='Si ya existe un mensaje con la misma clave no se vuelve a encolar'
+    )
+
+    # Origen del mensaje: se usa para el chatter y para el callback de resultado
+    res_model = fields.Char('Modelo Origen', index=True)
+    res_id = fields.Many2oneReference('ID Origen', model_field='res_model')
+    callback = fields.Char(
+        'Callback',
+        help='Método del registro origen que recibe (outbox, resultado) tras el envío'
+    )
+    log_chatter = fields.Boolean(
+        'Registrar en Chatter',
+        default=False,
+        help='Registrar el resultado en el chatter del registro origen (si no hay callback)'
+    )
+
+    _sql_constraints = [
+        ('dedup_key_unique', 'UNIQUE(dedup_key)',
+         'Ya existe un mensaje en la bandeja de salida con esa clave de deduplicación.'),
+    ]
+
+    # ==========================================================
+    # ENCOLADO
+    # ==========================================================
+
+    @api.model
+    def enqueue(self, phone, body='', config=None, attachment=None, media_type='document',
+                record=None, callback=None, log_chatter=False, dedup_key=None,
+                recipient_name=None, verify_number=False, priority=10):
+        """
+        Encola un mensaje de WhatsApp y despierta al despachador.
+
+        Args:
+            phone (str): Número limpio (51987654321)
+            body (str): Texto del mensaje (o caption si hay archivo)
+            config (whatsapp.config): Configuración a usar (por defecto la activa)
+            attachment (ir.attachment): Archivo a enviar
+            record: Registro origen (para chatter / callback)
+            callback (str): Método del registro origen llamado con (outbox, resultado)
+            dedup_key (str): Clave para no encolar dos veces el mismo mensaje
+
+        Returns:
+            whatsapp.outbox: Mensaje encolado, o el existente con la misma clave
+            (vacío si lo encoló otra transacción aún no visible en esta)
+        """
+        if dedup_key:
+            existente = self.sudo().search([('dedup_key', '=', dedup_key)], limit=1)
+            if existente:
+                if existente.state == 'failed':
+                    existente._requeue()
+                return existente
+
+        config = config or self.env['whatsapp.config'].get_active_config()
+        vals = {
+            'config_id': config.id,
+            'phone': phone,
+            'body': body or '',
+            'recipient_name': recipient_name or False,
+            'message_type': 'media' if attachment else 'text',
+            'media_type': media_type,
+            'attachment_id': attachment.id if attachment else False,
+            'res_model': record._name if record else False,
+            'res_id': record.id if record else False,
+            'callback': callback or False,
+            'log_chatter': log_chatter,
+            'dedup_key': dedup_key or False,
+            'verify_number': verify_number,
+            'priority': priority,
+        }
+        if not dedup_key:
+            outbox = self.sudo().create(vals)
+            self._trigger_dispatch()
+            return outbox
+
+        # Dos encolados simultáneos con la misma clave pueden pasar ambos la
+        # búsqueda anterior: el INSERT va en un savepoint para que la violación
+        # de UNIQUE(dedup_key) no aborte la transacción del llamador.
+        try:
+            with self.env.cr.savepoint():
+                outbox = self.sudo().create(vals)
+        except UniqueViolation:
+            _logger.info("Bandeja WhatsApp: clave %s ya encolada por otra transacción", dedup_key)
+            # Puede no ser visible aún en esta transacción: el mensaje ya está en cola
+            return self.sudo().search([('dedup_key', '=', dedup_key)], limit=1)
+        self._trigger_dispatch()
+        return outbox
+
+    @api.model
+    def _create_attachment(self, content, filename, mimetype='application/pdf'):
+        """Guarda un archivo a enviar; varios mensajes pueden compartir el mismo adjunto"""
+        return self.env['ir.attachment'].sudo().create({
+            'name': filename,
+            'raw': content,
+            'mimetype': mimetype,
+            'res_model': self._name,
+        })
+
+    @api.model
+    def _trigger_dispatch(self):
+        cron = self.env.ref('copier_company.ir_cron_dispatch_whatsapp_outbox', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    def _requeue(self):
+        self.write({
+            'state': 'queued',
+            'attempts': 0,
+            'next_attempt': fields.Datetime.now(),
+            'error_message': False,
+        })
+        self._trigger_dispatch()
+
+    def action_retry(self):
+        """Reintentar manualmente los mensajes fallidos"""
+        self.filtered(lambda m: m.state == 'failed')._requeue()
+        return True
+
+    # ==========================================================
+    # DESPACHO (CRON)
+    # ==========================================================
+
+    @api.model
+    def _cron_dispatch(self, auto_commit=True):
+        """
+        Despacha la bandeja de salida: por cada configuración toma un lote
+        (bloqueado con SKIP LOCKED para no chocar con otros workers), lo envía
+        en paralelo respetando los mensajes por segundo configurados y registra
+        un resumen por lote.
+        """
+        self._reclaim_stale()
+        if auto_commit:
+            self.env.cr.commit()
+
+        configs = self.env['whatsapp.config'].sudo().search([('active', '=', True)])
+        for config in configs:
+            lote = self._lock_batch(config, config.outbox_batch_size or 30)
+            if not lote:
+                continue
+            if auto_commit:
+                self.env.cr.commit()
+
+            connection = config.check_connection(silent=True)
+            if not connection.get('connected'):
+                # Sin conexión no se consumen intentos: se posterga todo el lote
+                _logger.warning("WhatsApp %s desconectado, se posterga el despacho de %s mensajes",
+                                config.name, len(lote))
+                lote.write({
+                    'state': 'queued',
+                    'next_attempt': fields.Datetime.now() + timedelta(minutes=5),
+                    'error_message': connection.get('message'),
+                })
+                if auto_commit:
+                    self.env.cr.commit()
+                continue
+
+            resultados = self._send_batch(config, lote)
+            enviados = 0
+            for mensaje in lote:
+                mensaje._apply_result(resultados[mensaje.id])
+                enviados += 1 if resultados[mensaje.id].get('success') else 0
+                if auto_commit:
+                    self.env.cr.commit()
+            _logger.info("Bandeja WhatsApp %s: %s de %s mensajes enviados", config.name, enviados, len(lote))
+
+        # Si quedaron mensajes listos, volver a despertar el cron
+        if self.sudo().search_count([
+            ('state', '=', 'queued'),
+            ('next_attempt', '<=', fields.Datetime.now()),
+        ], limit=1):
+            self._trigger_dispatch()
+        return True
+
+    @api.model
+    def _lock_batch(self, config, limit):
+        """Bloquea y marca como 'sending' un lote de mensajes listos"""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT id FROM whatsapp_outbox
+             WHERE state = 'queued'
+               AND config_id = %s
+               AND (next_attempt IS NULL OR next_attempt <= (now() at time zone 'UTC'))
+             ORDER BY priority DESC, id ASC
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (config.id, limit))
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        lote = self.sudo().browse(ids)
+        if lote:
+            lote.write({'state': 'sending'})
+        return lote
+
+    @api.model
+    def _reclaim_stale(self):
+        limite = fields.Datetime.now() - timedelta(minutes=SENDING_STALE_MINUTES)
+        huerfanos = self.sudo().search([('state', '=', 'sending'), ('write_date', '<', limite)])
+        if huerfanos:
+            _logger.warning("Bandeja WhatsApp: %s mensajes huérfanos vuelven a la cola", len(huerfanos))
+            huerfanos.write({'state': 'queued'})
+
+    @api.model
+    def _send_batch(self, config, lote):
+        """
+        Envía un lote por un pool de hilos acotado (config.outbox_workers).
+
+        Todo el acceso al ORM ocurre en el hilo principal: aquí se leen los
+        datos de cada mensaje y cada adjunto una sola vez; los hilos solo hacen
+        las llamadas HTTP, escalonadas para respetar config.outbox_rate.
+        Retorna {outbox_id: resultado}.
+        """
+        resultados = {}
+        envios = []
+        archivos = {}
+        # Verificación de números en una sola pasada (con caché)
+        existentes = config.verify_numbers(lote.filtered('verify_number').mapped('phone'))
+        for mensaje in lote:
+            mensaje.attempts += 1
+            if mensaje.verify_number:
+                existe = existentes.get(mensaje.phone)
+                if existe is False:
+                    resultados[mensaje.id] = {'success': False, 'message_id': None, 'permanent': True,
+                                              'error': _('Número %s no existe en WhatsApp') % mensaje.phone}
+                    continue
+                if existe is None:
+                    # Falla transitoria del gateway: se reintenta con backoff
+                    resultados[mensaje.id] = {'success': False, 'message_id': None,
+                                              'error': _('No se pudo verificar el número %s en WhatsApp') % mensaje.phone}
+                    continue
+            if mensaje.message_type == 'media':
+                adjunto = mensaje.attachment_id
+                if not adjunto:
+                    resultados[mensaje.id] = {'success': False, 'message_id': None, 'permanent': True,
+                                              'error': _('El archivo adjunto ya no existe')}
+                    continue
+                if adjunto.id not in archivos:
+                    archivos[adjunto.id] = adjunto.raw
+                funcion = partial(
+                    whatsapp_gateway.send_media, config.api_url, config.api_key, mensaje.phone,
+                    archivos[adjunto.id], media_type=mensaje.media_type or 'document',
+                    caption=mensaje.body or '', filename=adjunto.name,
+                )
+            else:
+                funcion = partial(whatsapp_gateway.send_text, config.api_url, config.api_key,
+                                  mensaje.phone, mensaje.body or '')
+            envios.append((mensaje, funcion))
+
+        if envios:
+            intervalo = 1.0 / config.outbox_rate if config.outbox_rate > 0 else 0.0
+            inicio = time.monotonic()
+
+            def ejecutar(indice, funcion):
+                espera = inicio + indice * intervalo - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                return funcion()
+
+            workers = max(1, min(config.outbox_workers or 1, len(envios)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futuros = {
+                    pool.submit(ejecutar, indice, funcion): mensaje
+                    for indice, (mensaje, funcion) in enumerate(envios)
+                }
+                for futuro in as_completed(futuros):
+                    mensaje = futuros[futuro]
+                    try:
+                        resultados[mensaje.id] = futuro.result()
+                    except Exception as e:
+                        _logger.exception("Excepción despachando WhatsApp a %s", mensaje.phone)
+                        resultados[mensaje.id] = {'success': False, 'message_id': None, 'error': str(e)}
+
+            for mensaje, _funcion in envios:
+                resultado = resultados[mensaje.id]
+                config._log_send(
+                    mensaje.phone, resultado.get('success'), resultado.get('error'),
+                    channel='media' if mensaje.message_type == 'media' else 'text'
+                )
+        return resultados
+
+    def _apply_result(self, result):
+        """Registra el resultado y programa el reintento con backoff exponencial si falla"""
+        self.ensure_one()
+        if result.get('success'):
+            self.write({
+                'state': 'sent',
+                'sent_date': fields.Datetime.now(),
+                'whatsapp_message_id': result.get('message_id'),
+                'error_message': False,
+            })
+        elif result.get('permanent') or self.attempts >= (self.config_id.outbox_max_attempts or 5):
+            self.write({'state': 'failed', 'error_message': result.get('error')})
+        else:
+            # Backoff exponencial: 1, 2, 4, 8... minutos
+            self.write({
+                'state': 'queued',
+                'error_message': result.get('error'),
+                'next_attempt': fields.Datetime.now() + timedelta(minutes=2 ** (self.attempts - 1)),
+            })
+            return
+
+        self._notify_origin(result)
+
+    def _notify_origin(self, result):
+        """Informa el resultado final al registro origen (callback o chatter)"""
+        self.ensure_one()
+        if not self.res_model or not self.res_id or self.res_model not in self.env:
+            return
+        origen = self.env[self.res_model].browse(self.res_id).exists()
+        if not origen:
+            return
+        try:
+            with self.env.cr.savepoint():
+                if self.callback:
+                    getattr(origen, self.callback)(self, result)
+                elif self.log_chatter and hasattr(origen, 'message_post'):
+                    origen.message_post(body=self._chatter_body(result), message_type='notification')
+        except Exception:
+            _logger.exception("Error notificando resultado WhatsApp a %s,%s", self.res_model, self.res_id)
+
+    def _chatter_body(self, result):
+        if result.get('success'):
+            return f"""✅ Mensaje enviado por WhatsApp
+
+📱 Número: {self.phone}
+👤 Contacto: {self.recipient_name or 'N/A'}
+📄 Con archivo: {'Sí' if self.message_type == 'media' else 'No'}
+🆔 Message ID: {result.get('message_id') or 'N/A'}"""
+        return f"""❌ Error enviando WhatsApp
+
+📱 Número: {self.phone}
+⚠️ Error: {result.get('error') or 'Error desconocido'}"""
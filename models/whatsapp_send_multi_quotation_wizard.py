@@ -3,6 +3,8 @@ import logging
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 
+from .whatsapp_send_quotation_wizard import render_pdfs_by_record
+
 _logger = logging.getLogger(__name__)
 
 
@@ -248,29 +250,20 @@ Equipo Copier Company
                 '{empresa}, {total}, {ubicacion}'
             ) % str(e))
     
-    def _generate_pdf(self, quotation):
+    def _generate_pdfs(self, quotations):
         """
-        Generar PDF de cotización multi-equipo
+        Generar los PDFs de varias cotizaciones multi-equipo con una sola llamada al reporte
         
-        Args:
-            quotation (copier.quotation): Registro de cotización
-            
         Returns:
-            tuple: (pdf_content, filename)
+            dict: {quotation_id: (pdf_content, filename)} (sin las que fallaron)
         """
-        try:
-            report_action = self.env.ref('copier_company.action_report_copier_quotation')
-            pdf_content, _ = self.env['ir.actions.report']._render_qweb_pdf(
-                report_action.id, quotation.ids
-            )
-            
-            # Generar nombre del archivo
-            filename = f"Cotizacion_Multiple_{quotation.name.replace('/', '_')}.pdf"
-            
-            return pdf_content, filename
-        except Exception as e:
-            _logger.error(f"Error generando PDF para {quotation.name}: {str(e)}")
-            raise UserError(_(f'Error al generar PDF para {quotation.name}: {str(e)}'))
+        contenidos = render_pdfs_by_record(
+            self.env, 'copier_company.action_report_copier_quotation', quotations
+        )
+        return {
+            quotation.id: (contenidos[quotation.id], f"Cotizacion_Multiple_{quotation.name.replace('/', '_')}.pdf")
+            for quotation in quotations if quotation.id in contenidos
+        }
     
     # ============================================
     # ACCIONES
@@ -284,10 +277,21 @@ Equipo Copier Company
         
         verified_count = 0
         invalid_count = 0
+        unknown_count = 0
+        
+        lines = self.phone_line_ids.filtered('phone_clean')
+        existentes = self.config_id.verify_numbers(lines.mapped('phone_clean'))
         
-        for line in self.phone_line_ids:
+        for line in lines:
             if line.phone_clean:
-                exists = self.config_id.verify_number(line.phone_clean)
+                exists = existentes.get(line.phone_clean)
+                if exists is None:
+                    # El gateway no respondió: el número queda sin verificar
+                    line.is_verified = False
+                    line.verification_result = 'Sin verificar (error de conexión)'
+                    unknown_count += 1
+                    continue
+                
                 line.is_verified = True
                 line.verification_result = 'Existe ✓' if exists else 'No existe ✗'
                 
@@ -299,7 +303,9 @@ Equipo Copier Company
         message = f'✅ Verificación completada:\n'
         message += f'• {verified_count} números válidos\n'
         if invalid_count > 0:
-            message += f'• {invalid_count} números no encontrados en WhatsApp'
+            message += f'• {invalid_count} números no encontrados en WhatsApp\n'
+        if unknown_count > 0:
+            message += f'• {unknown_count} números sin verificar (error del gateway)'
         
         return {
             'type': 'ir.actions.client',
@@ -307,13 +313,16 @@ Equipo Copier Company
             'params': {
                 'title': 'Verificación de Números',
                 'message': message,
-                'type': 'success' if invalid_count == 0 else 'warning',
+                'type': 'success' if not invalid_count and not unknown_count else 'warning',
                 'sticky': False,
             }
         }
     
     def action_send_quotations(self):
-        """Enviar cotizaciones multi-equipo por WhatsApp"""
+        """
+        Encolar cotizaciones en la bandeja de salida de WhatsApp.
+        El despachador las envía en segundo plano y registra el resultado en el chatter.
+        """
         self.ensure_one()
         
         # Validaciones
@@ -327,141 +336,64 @@ Equipo Copier Company
         if not valid_phones:
             raise UserError('No hay números de teléfono válidos.')
         
-        # Confirmar conexión
-        connection_status = self.config_id.check_connection(silent=True)
-        if not connection_status.get('connected'):
-            raise UserError(_(
-                'WhatsApp no está conectado.\n\n'
-                'Por favor, verifica la conexión en:\n'
-                'Ajustes → WhatsApp API Config\n\n'
-                'Error: %s'
-            ) % connection_status.get('message', 'Desconocido'))
+        outbox_model = self.env['whatsapp.outbox']
         
         # Contadores
-        total_sent = 0
+        total_queued = 0
         total_failed = 0
-        results = []
+        
+        # Renderizar todos los PDFs de una vez
+        pdfs = self._generate_pdfs(self.quotation_ids) if self.attach_pdf else {}
         
         # Procesar cada cotización
         for quotation in self.quotation_ids:
-            _logger.info(f"📤 Procesando cotización {quotation.name}")
-            
-            # Generar PDF si está marcado
-            pdf_content = None
-            pdf_filename = None
+            _logger.info(f"📤 Encolando cotización {quotation.name}")
             
+            # Generar PDF si está marcado (un solo adjunto para todos los números)
+            attachment = None
             if self.attach_pdf:
-                try:
-                    pdf_content, pdf_filename = self._generate_pdf(quotation)
-                    _logger.info(f"✅ PDF generado para {quotation.name}: {pdf_filename} ({len(pdf_content)} bytes)")
-                except Exception as e:
-                    _logger.error(f"❌ Error generando PDF para {quotation.name}: {str(e)}")
-                    results.append({
-                        'quotation': quotation.name,
-                        'status': 'error',
-                        'message': f'Error generando PDF: {str(e)}'
-                    })
+                if quotation.id not in pdfs:
+                    _logger.error(f"❌ Error generando PDF para {quotation.name}")
                     total_failed += 1
                     continue
+                pdf_content, pdf_filename = pdfs[quotation.id]
+                attachment = outbox_model._create_attachment(pdf_content, pdf_filename)
             
             # Procesar mensaje
             try:
                 processed_message = self._process_message_variables(self.message, quotation)
             except Exception as e:
                 _logger.error(f"❌ Error procesando variables para {quotation.name}: {str(e)}")
-                results.append({
-                    'quotation': quotation.name,
-                    'status': 'error',
-                    'message': f'Error en variables: {str(e)}'
-                })
                 total_failed += 1
                 continue
             
-            # Enviar a cada número válido
+            # Encolar para cada número válido
             for phone_line in valid_phones:
-                try:
-                    _logger.info(f"📱 Enviando a {phone_line.phone_clean}")
-                    
-                    # Enviar según si hay PDF o no
-                    if pdf_content and self.attach_pdf and pdf_filename:
-                        result = self.config_id.send_media(
-                            phone=phone_line.phone_clean,
-                            file_data=pdf_content,
-                            media_type='document',
-                            caption=processed_message,
-                            filename=pdf_filename
-                        )
-                    else:
-                        result = self.config_id.send_message(
-                            phone=phone_line.phone_clean,
-                            message=processed_message
-                        )
-                    
-                    if result.get('success'):
-                        total_sent += 1
-                        _logger.info(f"✅ Enviado a {phone_line.phone}")
-                        
-                        # Registrar en chatter
-                        quotation.message_post(
-                            body=f"""✅ Cotización enviada por WhatsApp
-                            
-📱 Número: {phone_line.phone}
-👤 Contacto: {phone_line.partner_name}
-📄 Con PDF: {'Sí' if self.attach_pdf else 'No'}
-🆔 Message ID: {result.get('message_id', 'N/A')}""",
-                            message_type='notification'
-                        )
-                        
-                        results.append({
-                            'quotation': quotation.name,
-                            'phone': phone_line.phone,
-                            'status': 'success',
-                            'message': 'Enviado exitosamente'
-                        })
-                    else:
-                        total_failed += 1
-                        error_msg = result.get('error', 'Error desconocido')
-                        _logger.error(f"❌ Error enviando a {phone_line.phone}: {error_msg}")
-                        
-                        quotation.message_post(
-                            body=f"""❌ Error enviando WhatsApp
-                            
-📱 Número: {phone_line.phone}
-⚠️ Error: {error_msg}""",
-                            message_type='notification'
-                        )
-                        
-                        results.append({
-                            'quotation': quotation.name,
-                            'phone': phone_line.phone,
-                            'status': 'error',
-                            'message': error_msg
-                        })
-                
-                except Exception as e:
-                    total_failed += 1
-                    _logger.exception(f"❌ Excepción enviando a {phone_line.phone}")
-                    
-                    results.append({
-                        'quotation': quotation.name,
-                        'phone': phone_line.phone,
-                        'status': 'error',
-                        'message': str(e)
-                    })
+                outbox_model.enqueue(
+                    phone_line.phone_clean,
+                    processed_message,
+                    config=self.config_id,
+                    attachment=attachment,
+                    record=quotation,
+                    log_chatter=True,
+                    recipient_name=phone_line.partner_name,
+                    dedup_key=f'{self._name}:{self.id}:{quotation.id}:{phone_line.phone_clean}',
+                )
+                total_queued += 1
         
         # Mensaje final
-        if total_sent > 0 and total_failed == 0:
+        if total_queued > 0 and total_failed == 0:
             notification_type = 'success'
-            title = '✅ Envío Exitoso'
-            message = f'Se enviaron {total_sent} mensaje(s) correctamente.'
-        elif total_sent > 0 and total_failed > 0:
+            title = '📤 Envío en Cola'
+            message = f'Se encolaron {total_queued} mensaje(s). El resultado se registrará en el chatter.'
+        elif total_queued > 0 and total_failed > 0:
             notification_type = 'warning'
             title = '⚠️ Envío Parcial'
-            message = f'Enviados: {total_sent} | Fallidos: {total_failed}'
+            message = f'En cola: {total_queued} | Fallidos: {total_failed}'
         else:
             notification_type = 'danger'
             title = '❌ Error en Envío'
-            message = f'No se pudo enviar ningún mensaje. Fallidos: {total_failed}'
+            message = f'No se pudo encolar ningún mensaje. Fallidos: {total_failed}'
         
         return {
             'type': 'ir.actions.client',
@@ -472,4 +404,4 @@ Equipo Copier Company
                 'type': notification_type,
                 'sticky': True,
             }
-        }
\ No newline at end of file
+        }
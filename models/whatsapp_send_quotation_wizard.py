@@ -6,6 +6,42 @@ from odoo.exceptions import UserError, ValidationError
 _logger = logging.getLogger(__name__)
 
 
+def render_pdfs_by_record(env, report_xmlid, records):
+    """
+    Renderiza el reporte PDF de varios registros en una sola pasada de
+    wkhtmltopdf y lo separa por registro.
+
+    Si Odoo no puede separar el PDF combinado, los registros faltantes se
+    renderizan uno por uno. Los que fallan no aparecen en el resultado.
+
+    Returns:
+        dict: {record_id: pdf_bytes}
+    """
+    report = env.ref(report_xmlid)
+    report_model = env['ir.actions.report']
+    pdfs = {}
+
+    if len(records) > 1:
+        try:
+            streams = report_model._render_qweb_pdf_prepare_streams(report.report_name, {}, res_ids=records.ids)
+            for record in records:
+                stream = (streams.get(record.id) or {}).get('stream')
+                if stream:
+                    pdfs[record.id] = stream.getvalue()
+            for item in streams.values():
+                if item.get('stream'):
+                    item['stream'].close()
+        except Exception as e:
+            _logger.warning("No se pudo renderizar el lote de PDFs %s: %s", report_xmlid, e)
+
+    for record in records.filtered(lambda r: r.id not in pdfs):
+        try:
+            pdfs[record.id] = report_model._render_qweb_pdf(report.id, record.ids)[0]
+        except Exception as e:
+            _logger.error("Error generando PDF de %s,%s: %s", record._name, record.id, e)
+    return pdfs
+
+
 class WhatsAppSendQuotationWizard(models.TransientModel):
     _name = 'whatsapp.send.quotation.wizard'
     _description = 'Wizard para Enviar Cotizaciones por WhatsApp'
@@ -257,29 +293,20 @@ Equipo Copier Company
                 '{ubicacion}, {volumen_bn}, {volumen_color}, {costo_bn}, {costo_color}'
             ) % str(e))
     
-    def _generate_pdf(self, copier):
+    def _generate_pdfs(self, copiers):
         """
-        Generar PDF de cotización
+        Generar los PDFs de varias cotizaciones con una sola llamada al reporte
         
-        Args:
-            copier (copier.company): Registro de cotización
-            
         Returns:
-            tuple: (pdf_content, filename)
+            dict: {copier_id: (pdf_content, filename)} (sin las que fallaron)
         """
-        try:
-            report_action = self.env.ref('copier_company.action_report_report_cotizacion_alquiler')
-            pdf_content, _ = self.env['ir.actions.report']._render_qweb_pdf(
-                report_action.id, copier.ids
-            )
-            
-            # Generar el mismo nombre que en send_whatsapp_report original
-            filename = f"Propuesta_Comercial_{copier.secuencia}.pdf"
-            
-            return pdf_content, filename  # ⭐ RETORNAR TUPLA
-        except Exception as e:
-            _logger.error(f"Error generando PDF para {copier.secuencia}: {str(e)}")
-            raise UserError(_(f'Error al generar PDF para {copier.secuencia}: {str(e)}'))
+        contenidos = render_pdfs_by_record(
+            self.env, 'copier_company.action_report_report_cotizacion_alquiler', copiers
+        )
+        return {
+            copier.id: (contenidos[copier.id], f"Propuesta_Comercial_{copier.secuencia}.pdf")
+            for copier in copiers if copier.id in contenidos
+        }
     # ============================================
     # ACCIONES
     # ============================================
@@ -292,10 +319,21 @@ Equipo Copier Company
         
         verified_count = 0
         invalid_count = 0
+        unknown_count = 0
         
-        for line in self.phone_line_ids:
+        lines = self.phone_line_ids.filtered('phone_clean')
+        existentes = self.config_id.verify_numbers(lines.mapped('phone_clean'))
+        
+        for line in lines:
             if line.phone_clean:
-                exists = self.config_id.verify_number(line.phone_clean)
+                exists = existentes.get(line.phone_clean)
+                if exists is None:
+                    # El gateway no respondió: el número queda sin verificar
+                    line.is_verified = False
+                    line.verification_result = 'Sin verificar (error de conexión)'
+                    unknown_count += 1
+                    continue
+                
                 line.is_verified = True
                 line.verification_result = 'Existe ✓' if exists else 'No existe ✗'
                 
@@ -307,7 +345,9 @@ Equipo Copier Company
         message = f'✅ Verificación completada:\n'
         message += f'• {verified_count} números válidos\n'
         if invalid_count > 0:
-            message += f'• {invalid_count} números no encontrados en WhatsApp'
+            message += f'• {invalid_count} números no encontrados en WhatsApp\n'
+        if unknown_count > 0:
+            message += f'• {unknown_count} números sin verificar (error del gateway)'
         
         return {
             'type': 'ir.actions.client',
@@ -315,13 +355,16 @@ Equipo Copier Company
             'params': {
                 'title': 'Verificación de Números',
                 'message': message,
-                'type': 'success' if invalid_count == 0 else 'warning',
+                'type': 'success' if not invalid_count and not unknown_count else 'warning',
                 'sticky': False,
             }
         }
     
     def action_send_quotations(self):
-        """Enviar cotizaciones por WhatsApp"""
+        """
+        Encolar cotizaciones en la bandeja de salida de WhatsApp.
+        El despachador las envía en segundo plano y registra el resultado en el chatter.
+        """
         self.ensure_one()
         
         # Validaciones
@@ -335,141 +378,64 @@ Equipo Copier Company
         if not valid_phones:
             raise UserError('No hay números de teléfono válidos.')
         
-        # Confirmar conexión
-        connection_status = self.config_id.check_connection(silent=True)
-        if not connection_status.get('connected'):
-            raise UserError(_(
-                'WhatsApp no está conectado.\n\n'
-                'Por favor, verifica la conexión en:\n'
-                'Ajustes → WhatsApp API Config\n\n'
-                'Error: %s'
-            ) % connection_status.get('message', 'Desconocido'))
+        outbox_model = self.env['whatsapp.outbox']
         
         # Contadores
-        total_sent = 0
+        total_queued = 0
         total_failed = 0
-        results = []
+        
+        # Renderizar todos los PDFs de una vez
+        pdfs = self._generate_pdfs(self.copier_company_ids) if self.attach_pdf else {}
         
         # Procesar cada cotización
         for copier in self.copier_company_ids:
-            _logger.info(f"📤 Procesando cotización {copier.secuencia}")
-            
-            # Generar PDF si está marcado
-            pdf_content = None
-            pdf_filename = None  # ⭐ INICIALIZAR SIEMPRE
+            _logger.info(f"📤 Encolando cotización {copier.secuencia}")
             
+            # Generar PDF si está marcado (un solo adjunto para todos los números)
+            attachment = None
             if self.attach_pdf:
-                try:
-                    pdf_content, pdf_filename = self._generate_pdf(copier)
-                    _logger.info(f"✅ PDF generado para {copier.secuencia}: {pdf_filename} ({len(pdf_content)} bytes)")
-                except Exception as e:
-                    _logger.error(f"❌ Error generando PDF para {copier.secuencia}: {str(e)}")
-                    results.append({
-                        'copier': copier.secuencia,
-                        'status': 'error',
-                        'message': f'Error generando PDF: {str(e)}'
-                    })
+                if copier.id not in pdfs:
+                    _logger.error(f"❌ Error generando PDF para {copier.secuencia}")
                     total_failed += 1
                     continue
+                pdf_content, pdf_filename = pdfs[copier.id]
+                attachment = outbox_model._create_attachment(pdf_content, pdf_filename)
             
             # Procesar mensaje
             try:
                 processed_message = self._process_message_variables(self.message, copier)
             except Exception as e:
                 _logger.error(f"❌ Error procesando variables para {copier.secuencia}: {str(e)}")
-                results.append({
-                    'copier': copier.secuencia,
-                    'status': 'error',
-                    'message': f'Error en variables: {str(e)}'
-                })
                 total_failed += 1
                 continue
             
-            # Enviar a cada número válido
+            # Encolar para cada número válido
             for phone_line in valid_phones:
-                try:
-                    _logger.info(f"📱 Enviando a {phone_line.phone_clean}")
-                    
-                    # Enviar según si hay PDF o no
-                    if pdf_content and self.attach_pdf and pdf_filename:  # ⭐ VERIFICAR que pdf_filename existe
-                        result = self.config_id.send_media(
-                            phone=phone_line.phone_clean,
-                            file_data=pdf_content,
-                            media_type='document',
-                            caption=processed_message,
-                            filename=pdf_filename
-                        )
-                    else:
-                        result = self.config_id.send_message(
-                            phone=phone_line.phone_clean,
-                            message=processed_message
-                        )
-                    
-                    if result.get('success'):
-                        total_sent += 1
-                        _logger.info(f"✅ Enviado a {phone_line.phone}")
-                        
-                        # Registrar en chatter
-                        copier.message_post(
-                            body=f"""✅ Cotización enviada por WhatsApp
-                            
-📱 Número: {phone_line.phone}
-👤 Contacto: {phone_line.partner_name}
-📄 Con PDF: {'Sí' if self.attach_pdf else 'No'}
-🆔 Message ID: {result.get('message_id', 'N/A')}""",
-                            message_type='notification'
-                        )
-                        
-                        results.append({
-                            'copier': copier.secuencia,
-                            'phone': phone_line.phone,
-                            'status': 'success',
-                            'message': 'Enviado exitosamente'
-                        })
-                    else:
-                        total_failed += 1
-                        error_msg = result.get('error', 'Error desconocido')
-                        _logger.error(f"❌ Error enviando a {phone_line.phone}: {error_msg}")
-                        
-                        copier.message_post(
-                            body=f"""❌ Error enviando WhatsApp
-                            
-📱 Número: {phone_line.phone}
-⚠️ Error: {error_msg}""",
-                            message_type='notification'
-                        )
-                        
-                        results.append({
-                            'copier': copier.secuencia,
-                            'phone': phone_line.phone,
-                            'status': 'error',
-                            'message': error_msg
-                        })
-                
-                except Exception as e:
-                    total_failed += 1
-                    _logger.exception(f"❌ Excepción enviando a {phone_line.phone}")
-                    
-                    results.append({
-                        'copier': copier.secuencia,
-                        'phone': phone_line.phone,
-                        'status': 'error',
-                        'message': str(e)
-                    })
+                outbox_model.enqueue(
+                    phone_line.phone_clean,
+                    processed_message,
+                    config=self.config_id,
+                    attachment=attachment,
+                    record=copier,
+                    log_chatter=True,
+                    recipient_name=phone_line.partner_name,
+                    dedup_key=f'{self._name}:{self.id}:{copier.id}:{phone_line.phone_clean}',
+                )
+                total_queued += 1
         
         # Mensaje final
-        if total_sent > 0 and total_failed == 0:
+        if total_queued > 0 and total_failed == 0:
             notification_type = 'success'
-            title = '✅ Envío Exitoso'
-            message = f'Se enviaron {total_sent} mensaje(s) correctamente.'
-        elif total_sent > 0 and total_failed > 0:
+            title = '📤 Envío en Cola'
+            message = f'Se encolaron {total_queued} mensaje(s). El resultado se registrará en el chatter.'
+        elif total_queued > 0 and total_failed > 0:
             notification_type = 'warning'
             title = '⚠️ Envío Parcial'
-            message = f'Enviados: {total_sent} | Fallidos: {total_failed}'
+            message = f'En cola: {total_queued} | Fallidos: {total_failed}'
         else:
             notification_type = 'danger'
             title = '❌ Error en Envío'
-            message = f'No se pudo enviar ningún mensaje. Fallidos: {total_failed}'
+            message = f'No se pudo encolar ningún mensaje. Fallidos: {total_failed}'
         
         return {
             'type': 'ir.actions.client',
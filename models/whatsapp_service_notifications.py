@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 import logging
+import string
+
 import pytz
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import plaintext2html
 
 _logger = logging.getLogger(__name__)
 
@@ -28,6 +31,192 @@ def to_peru_time(dt_utc, fmt='%d/%m/%Y %H:%M'):
     return dt_peru.strftime(fmt)
 
 
+# Plantillas por defecto con variables de vehículo, DNI y hora peruana
+DEFAULT_TEMPLATES = {
+    'new_request_support': """🚨 *NUEVA SOLICITUD DE SERVICIO*
+
+📋 Número: {number}
+👤 Cliente: {client}
+🖨️ Equipo: {equipment} (Serie: {serie})
+📍 Ubicación: {location}
+🏢 Sede: {sede}
+🔧 Problema: {problem}
+⚠️ Prioridad: {priority}
+
+📞 Contacto: {contact}
+📱 Teléfono: {phone}
+
+⏰ Hora (Perú): {time}""",
+
+    'new_request_client': """✅ *SOLICITUD RECIBIDA*
+
+Hola {contact}, hemos recibido tu solicitud de servicio técnico.
+
+📋 *Número:* {number}
+🖨️ *Equipo:* {equipment}
+📍 *Ubicación:* {location}
+🔧 *Problema:* {problem}
+
+Nuestro equipo técnico revisará tu solicitud y te contactará pronto.
+
+📧 Recibirás actualizaciones por email y WhatsApp.
+
+_Gracias por confiar en nosotros_ 🙏""",
+
+    'technician_assigned': """👨‍🔧 *TÉCNICO ASIGNADO*
+
+Hola {contact},
+
+Tu solicitud *{number}* ha sido asignada:
+
+👤 *Técnico:* {technician}
+🪪 *DNI:* {technician_dni}
+📱 *Teléfono:* {technician_phone}
+🚗 *Vehículo:* {vehicle}
+📅 *Fecha programada:* {date}
+🖨️ *Equipo:* {equipment}
+📍 *Ubicación:* {location}
+
+El técnico se pondrá en contacto contigo para confirmar la visita.
+
+_¡Gracias por tu paciencia!_ 🙏""",
+
+    'technician_on_route': """🚗 *TÉCNICO EN CAMINO*
+
+Hola {contact},
+
+El técnico *{technician}* está en camino a tu ubicación.
+
+📋 Solicitud: {number}
+🪪 DNI: {technician_dni}
+🚗 Vehículo: {vehicle}
+📍 Destino: {location}
+⏰ Hora de salida: {time}
+
+_Por favor mantente atento_ 📱""",
+
+    'service_started': """✅ *SERVICIO INICIADO*
+
+El técnico *{technician}* ha iniciado el servicio en tu equipo.
+
+📋 Solicitud: {number}
+🖨️ Equipo: {equipment}
+⏰ Inicio: {time}
+
+_Trabajando en resolver el problema..._ 🔧""",
+
+    'service_completed': """🎉 *SERVICIO COMPLETADO*
+
+Hola {contact},
+
+Tu solicitud *{number}* ha sido completada exitosamente.
+
+✅ *Trabajo realizado:*
+{work_done}
+
+📄 *Ver detalles del servicio:*
+{tracking_url}
+
+⭐ *Califica nuestro servicio aquí:*
+{evaluation_url}
+
+⏰ Finalizado: {time}
+👨‍🔧 Técnico: {technician}
+
+📝 *¿Cómo calificas el servicio?*
+Tu opinión es muy importante para nosotros.
+
+_¡Gracias por tu confianza!_ 🙏""",
+
+    'service_paused': """⏸️ *SERVICIO PAUSADO*
+
+Hola {contact},
+
+Tu solicitud *{number}* ha sido pausada temporalmente.
+
+📝 Motivo: {reason}
+
+Te contactaremos pronto para continuar.
+
+_Disculpa las molestias_ 🙏""",
+
+    'service_cancelled': """❌ *SERVICIO CANCELADO*
+
+Hola {contact},
+
+Tu solicitud *{number}* ha sido cancelada.
+
+📝 Motivo: {reason}
+⏰ Fecha: {time}
+
+Si necesitas más información, no dudes en contactarnos.
+
+_Quedamos a tu disposición_ 📞""",
+
+    'evaluation_reminder': """⭐ *RECORDATORIO DE EVALUACIÓN*
+
+Hola {contact},
+
+Hace unos días completamos el servicio de tu equipo (Solicitud *{number}*).
+
+📝 Evalúa aquí (toma menos de 1 minuto):
+{evaluation_url}
+
+Tu evaluación nos ayuda a mejorar nuestro servicio.
+
+_¡Gracias por tu tiempo!_ 🙏""",
+
+    'sla_alert': """⚠️ *ALERTA SLA - SOLICITUD {number}*
+
+🚨 Solicitud próxima a vencer
+
+👤 Cliente: {client}
+🖨️ Equipo: {equipment}
+📍 Ubicación: {location}
+⏰ Tiempo restante: {time_remaining}
+
+_ACCIÓN REQUERIDA_ ⚡"""
+}
+
+_FORMATTER = string.Formatter()
+# Plantillas compiladas: {(dbname, id de plantilla): (write_date, CompiledTemplate)}
+_COMPILED_TEMPLATES = {}
+# Plantillas activas por compañía: {(dbname, company_id): (versión, {tipo: (id, write_date, texto)})}
+_TEMPLATE_INDEX = {}
+
+
+class CompiledTemplate:
+    """
+    Plantilla analizada una sola vez: lista de (texto literal, variable,
+    formato, conversión). render() solo concatena, sin volver a parsear;
+    las variables desconocidas se reemplazan por `missing`.
+    """
+    __slots__ = ('text', 'parts', 'variables')
+
+    def __init__(self, text):
+        self.text = text or ''
+        self.parts = list(_FORMATTER.parse(self.text))
+        self.variables = {part[1] for part in self.parts if part[1]}
+
+    def render(self, values, missing='N/A'):
+        partes = []
+        for literal, field_name, format_spec, conversion in self.parts:
+            partes.append(literal)
+            if field_name is None:
+                continue
+            if field_name in values:
+                value = values[field_name]
+            else:
+                try:
+                    value = _FORMATTER.get_field(field_name, (), values)[0]
+                except (KeyError, AttributeError, IndexError, ValueError):
+                    value = missing
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            partes.append(_FORMATTER.format_field(value, format_spec or ''))
+        return ''.join(partes)
+
+
 class WhatsAppServiceNotification(models.Model):
     """Gestión de Notificaciones WhatsApp para Servicios Técnicos"""
     _name = 'whatsapp.service.notification'
@@ -107,6 +296,13 @@ class WhatsAppServiceNotification(models.Model):
         readonly=True
     )
     
+    chatter_pending = fields.Boolean(
+        string='Pendiente de Resumen',
+        readonly=True,
+        index=True,
+        help='El resultado aún no se publicó en el resumen del chatter de la solicitud'
+    )
+    
     # ============================================
     # CAMPOS RELACIONADOS
     # ============================================
@@ -122,111 +318,161 @@ class WhatsAppServiceNotification(models.Model):
     # MÉTODO PRINCIPAL DE ENVÍO
     # ============================================
     def send_notification(self):
-        """Enviar notificación WhatsApp"""
+        """
+        Encolar notificación WhatsApp en la bandeja de salida.
+        El envío real (y el registro del resultado) lo hace el despachador.
+        """
         self.ensure_one()
         
         try:
             # Obtener configuración activa
             config = self.env['whatsapp.config'].get_active_config()
             
-            if not config.is_connected:
-                _logger.warning("WhatsApp no conectado, verificando conexión...")
-                connection = config.check_connection(silent=True)
-                if not connection.get('connected'):
-                    raise ValidationError(_('WhatsApp no está conectado. Por favor escanea el código QR.'))
-            
             # Limpiar número
             clean_phone = self.env['whatsapp.config'].clean_phone_number(self.phone_number)
             if not clean_phone:
                 raise ValidationError(_('Número de teléfono inválido: %s') % self.phone_number)
             
-            # Verificar número (opcional según configuración)
-            if config.auto_verify_numbers:
-                exists = config.verify_number(clean_phone)
-                if not exists:
-                    _logger.warning("Número %s no existe en WhatsApp", clean_phone)
-                    self.write({
-                        'state': 'failed',
-                        'error_message': f'Número {self.phone_number} no existe en WhatsApp'
-                    })
-                    return False
+            self.write({
+                'state': 'pending',
+                'config_id': config.id,
+                'error_message': False
+            })
+            self.env['whatsapp.outbox'].enqueue(
+                clean_phone,
+                self.message_text,
+                config=config,
+                record=self,
+                callback='_on_whatsapp_outbox_result',
+                dedup_key=f'whatsapp.service.notification:{self.id}',
+                verify_number=config.auto_verify_numbers,
+                priority=20,
+            )
+            return True
+                
+        except Exception as e:
+            error_msg = str(e)
+            
+            self.write({
+                'state': 'failed',
+                'error_message': error_msg
+            })
             
-            # Enviar mensaje
-            result = config.send_message(clean_phone, self.message_text)
+            _logger.exception("❌ Excepción encolando notificación WhatsApp: %s", error_msg)
             
-            if result['success']:
-                self.write({
-                    'state': 'sent',
-                    'sent_date': fields.Datetime.now(),
-                    'whatsapp_message_id': result.get('message_id'),
-                    'config_id': config.id,
-                    'error_message': False
-                })
-                
-                _logger.info("✅ Notificación WhatsApp enviada: %s a %s", 
-                            self.notification_type, self.phone_number)
-                
-                # Registrar en chatter de la solicitud
+            if self._get_chatter_mode() == 'immediate':
                 now_peru = to_peru_time(fields.Datetime.now())
                 self.service_request_id.message_post(
                     body=f"""
-                        📱 Notificación WhatsApp Enviada
+                        ❌ Excepción Enviando Notificación WhatsApp
                         
                         • Tipo: {dict(self._fields['notification_type'].selection).get(self.notification_type)}
-                        • Destinatario: {self.phone_number}
+                        • Error: {error_msg}
                         • Fecha: {now_peru}
-                        • Estado: Enviado ✅
                     """,
                     message_type='notification'
                 )
-                
-                return True
             else:
-                self.write({
-                    'state': 'failed',
-                    'error_message': result.get('error', 'Error desconocido')
-                })
-                
-                _logger.error("❌ Error enviando notificación WhatsApp: %s", result.get('error'))
-                
-                now_peru = to_peru_time(fields.Datetime.now())
-                self.service_request_id.message_post(
-                    body=f"""
-                        ❌ Error Enviando Notificación WhatsApp
-                        
-                        • Tipo: {dict(self._fields['notification_type'].selection).get(self.notification_type)}
-                        • Destinatario: {self.phone_number}
-                        • Error: {result.get('error')}
-                        • Fecha: {now_peru}
-                    """,
-                    message_type='notification'
-                )
-                
-                return False
-                
-        except Exception as e:
-            error_msg = str(e)
+                self.chatter_pending = True
             
+            return False
+    
+    def _on_whatsapp_outbox_result(self, outbox, result):
+        """
+        Callback de la bandeja de salida: registra el resultado final del envío.
+        En modo resumen solo se escribe la notificación (una sola escritura);
+        el chatter lo publica _cron_post_chatter_digest.
+        """
+        self.ensure_one()
+        immediate = self._get_chatter_mode() == 'immediate'
+        
+        if result.get('success'):
             self.write({
-                'state': 'failed',
-                'error_message': error_msg
+                'state': 'sent',
+                'sent_date': outbox.sent_date or fields.Datetime.now(),
+                'whatsapp_message_id': result.get('message_id'),
+                'error_message': False,
+                'chatter_pending': not immediate,
             })
             
-            _logger.exception("❌ Excepción enviando notificación WhatsApp: %s", error_msg)
+            _logger.info("✅ Notificación WhatsApp enviada: %s a %s", 
+                        self.notification_type, self.phone_number)
+        else:
+            self.write({
+                'state': 'failed',
+                'error_message': result.get('error', 'Error desconocido'),
+                'chatter_pending': not immediate,
+            })
             
-            now_peru = to_peru_time(fields.Datetime.now())
-            self.service_request_id.message_post(
-                body=f"""
-                    ❌ Excepción Enviando Notificación WhatsApp
+            _logger.error("❌ Error enviando notificación WhatsApp: %s", result.get('error'))
+        
+        if immediate:
+            self.service_request_id.message_post(body=self._chatter_line(), message_type='notification')
+    
+    def _get_chatter_mode(self):
+        """Modo de registro en chatter según la plantilla del tipo (compañía de la solicitud)"""
+        self.ensure_one()
+        Template = self.env['whatsapp.service.template']
+        if self.company_id:
+            Template = Template.with_company(self.company_id)
+        return Template.get_chatter_mode(self.notification_type)
+    
+    def _chatter_line(self):
+        """Texto del resultado de una notificación para el chatter"""
+        self.ensure_one()
+        tipo = dict(self._fields['notification_type'].selection).get(self.notification_type)
+        if self.state == 'sent':
+            return f"""
+                    📱 Notificación WhatsApp Enviada
                     
-                    • Tipo: {dict(self._fields['notification_type'].selection).get(self.notification_type)}
-                    • Error: {error_msg}
-                    • Fecha: {now_peru}
-                """,
-                message_type='notification'
-            )
-            
-            return False
+                    • Tipo: {tipo}
+                    • Destinatario: {self.phone_number}
+                    • Fecha: {to_peru_time(self.sent_date)}
+                    • Estado: Enviado ✅
+                """
+        return f"""
+                    ❌ Error Enviando Notificación WhatsApp
+                    
+                    • Tipo: {tipo}
+                    • Destinatario: {self.phone_number}
+                    • Error: {self.error_message}
+                    • Fecha: {to_peru_time(self.write_date)}
+                """
+    
+    @api.model
+    def _cron_post_chatter_digest(self, limit=5000):
+        """
+        Publica un único mensaje por solicitud con los resultados de WhatsApp
+        acumulados desde el último resumen (plantillas en modo resumen).
+        """
+        notifications = self.search([
+            ('chatter_pending', '=', True),
+            ('state', 'in', ('sent', 'failed')),
+        ], order='service_request_id, id', limit=limit)
+        if not notifications:
+            return 0
+        
+        tipos = dict(self._fields['notification_type'].selection)
+        por_solicitud = {}
+        for notification in notifications:
+            por_solicitud.setdefault(notification.service_request_id, []).append(notification)
+        
+        for solicitud, items in por_solicitud.items():
+            enviados = len([n for n in items if n.state == 'sent'])
+            lineas = []
+            for n in items:
+                if n.state == 'sent':
+                    lineas.append(f"• ✅ {tipos.get(n.notification_type)} → {n.phone_number} ({to_peru_time(n.sent_date)})")
+                else:
+                    lineas.append(f"• ❌ {tipos.get(n.notification_type)} → {n.phone_number}: {n.error_message or 'Error desconocido'}")
+            cuerpo = "📱 Resumen de Notificaciones WhatsApp\n\n" + "\n".join(lineas)
+            cuerpo += f"\n\nEnviadas: {enviados} | Fallidas: {len(items) - enviados}"
+            solicitud.message_post(body=plaintext2html(cuerpo), message_type='notification')
+        
+        notifications.write({'chatter_pending': False})
+        _logger.info("Resumen WhatsApp publicado en %s solicitudes (%s notificaciones)",
+                     len(por_solicitud), len(notifications))
+        return len(notifications)
     
     # ============================================
     # ACCIÓN MANUAL
@@ -379,177 +625,89 @@ class WhatsAppServiceTemplate(models.Model):
         required=True
     )
     
+    chatter_mode = fields.Selection([
+        ('digest', 'Resumen periódico'),
+        ('immediate', 'Un mensaje por envío'),
+    ], string='Registro en Chatter', default='digest', required=True,
+        help='Resumen periódico: el resultado se guarda solo en la notificación y un cron publica '
+             'un único mensaje por solicitud. Un mensaje por envío: publica cada resultado al instante.')
+    
     _sql_constraints = [
         ('unique_type_company', 
          'UNIQUE(notification_type, company_id)', 
          'Solo puede haber una plantilla activa por tipo de notificación por compañía.')
     ]
     
+    @api.model
+    def _get_template_index(self):
+        """
+        Plantillas activas de la compañía actual por tipo, en caché por proceso.
+        La versión (cantidad y último write_date de la tabla) se consulta con una
+        sola query, así cualquier cambio en otro worker invalida la caché.
+        """
+        self.flush_model()
+        self.env.cr.execute("SELECT count(*), max(write_date) FROM whatsapp_service_template")
+        version = tuple(self.env.cr.fetchone())
+        key = (self.env.cr.dbname, self.env.company.id)
+        cached = _TEMPLATE_INDEX.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        index = {}
+        for template in self.search_read(
+            [('active', '=', True), ('company_id', '=', self.env.company.id)],
+            ['notification_type', 'template_text', 'write_date', 'chatter_mode'],
+        ):
+            index.setdefault(
+                template['notification_type'],
+                (template['id'], template['write_date'], template['template_text'], template['chatter_mode'])
+            )
+        _TEMPLATE_INDEX[key] = (version, index)
+        return index
+
     @api.model
     def get_template(self, notification_type):
         """Obtener plantilla activa para un tipo de notificación"""
-        template = self.search([
-            ('notification_type', '=', notification_type),
-            ('active', '=', True),
-            ('company_id', '=', self.env.company.id)
-        ], limit=1)
-        
-        if template:
-            return template.template_text
-        
+        entry = self._get_template_index().get(notification_type)
+        if entry:
+            return entry[2]
+
         # Templates por defecto si no existe
         return self._get_default_template(notification_type)
-    
-    @api.model
-    def _get_default_template(self, notification_type):
-        """Templates por defecto con variables de vehículo, DNI y hora peruana"""
-        templates = {
-            'new_request_support': """🚨 *NUEVA SOLICITUD DE SERVICIO*
-
-📋 Número: {number}
-👤 Cliente: {client}
-🖨️ Equipo: {equipment} (Serie: {serie})
-📍 Ubicación: {location}
-🏢 Sede: {sede}
-🔧 Problema: {problem}
-⚠️ Prioridad: {priority}
-
-📞 Contacto: {contact}
-📱 Teléfono: {phone}
-
-⏰ Hora (Perú): {time}""",
-
-            'new_request_client': """✅ *SOLICITUD RECIBIDA*
-
-Hola {contact}, hemos recibido tu solicitud de servicio técnico.
-
-📋 *Número:* {number}
-🖨️ *Equipo:* {equipment}
-📍 *Ubicación:* {location}
-🔧 *Problema:* {problem}
 
-Nuestro equipo técnico revisará tu solicitud y te contactará pronto.
-
-📧 Recibirás actualizaciones por email y WhatsApp.
-
-_Gracias por confiar en nosotros_ 🙏""",
-
-            'technician_assigned': """👨‍🔧 *TÉCNICO ASIGNADO*
-
-Hola {contact},
-
-Tu solicitud *{number}* ha sido asignada:
-
-👤 *Técnico:* {technician}
-🪪 *DNI:* {technician_dni}
-📱 *Teléfono:* {technician_phone}
-🚗 *Vehículo:* {vehicle}
-📅 *Fecha programada:* {date}
-🖨️ *Equipo:* {equipment}
-📍 *Ubicación:* {location}
-
-El técnico se pondrá en contacto contigo para confirmar la visita.
-
-_¡Gracias por tu paciencia!_ 🙏""",
-
-            'technician_on_route': """🚗 *TÉCNICO EN CAMINO*
-
-Hola {contact},
-
-El técnico *{technician}* está en camino a tu ubicación.
-
-📋 Solicitud: {number}
-🪪 DNI: {technician_dni}
-🚗 Vehículo: {vehicle}
-📍 Destino: {location}
-⏰ Hora de salida: {time}
-
-_Por favor mantente atento_ 📱""",
-
-            'service_started': """✅ *SERVICIO INICIADO*
-
-El técnico *{technician}* ha iniciado el servicio en tu equipo.
-
-📋 Solicitud: {number}
-🖨️ Equipo: {equipment}
-⏰ Inicio: {time}
-
-_Trabajando en resolver el problema..._ 🔧""",
-
-            'service_completed': """🎉 *SERVICIO COMPLETADO*
-
-Hola {contact},
-
-Tu solicitud *{number}* ha sido completada exitosamente.
-
-✅ *Trabajo realizado:*
-{work_done}
-
-📄 *Ver detalles del servicio:*
-{tracking_url}
-
-⭐ *Califica nuestro servicio aquí:*
-{evaluation_url}
-
-⏰ Finalizado: {time}
-👨‍🔧 Técnico: {technician}
-
-📝 *¿Cómo calificas el servicio?*
-Tu opinión es muy importante para nosotros.
-
-_¡Gracias por tu confianza!_ 🙏""",
-
-            'service_paused': """⏸️ *SERVICIO PAUSADO*
-
-Hola {contact},
-
-Tu solicitud *{number}* ha sido pausada temporalmente.
-
-📝 Motivo: {reason}
-
-Te contactaremos pronto para continuar.
-
-_Disculpa las molestias_ 🙏""",
-
-            'service_cancelled': """❌ *SERVICIO CANCELADO*
-
-Hola {contact},
-
-Tu solicitud *{number}* ha sido cancelada.
-
-📝 Motivo: {reason}
-⏰ Fecha: {time}
-
-Si necesitas más información, no dudes en contactarnos.
-
-_Quedamos a tu disposición_ 📞""",
-
-            'evaluation_reminder': """⭐ *RECORDATORIO DE EVALUACIÓN*
-
-Hola {contact},
-
-Hace unos días completamos el servicio de tu equipo (Solicitud *{number}*).
-
-📝 Evalúa aquí (toma menos de 1 minuto):
-{evaluation_url}
-
-Tu evaluación nos ayuda a mejorar nuestro servicio.
-
-_¡Gracias por tu tiempo!_ 🙏""",
-
-            'sla_alert': """⚠️ *ALERTA SLA - SOLICITUD {number}*
-
-🚨 Solicitud próxima a vencer
+    @api.model
+    def get_chatter_mode(self, notification_type):
+        """Modo de registro en chatter del tipo; sin plantilla se usa el resumen periódico"""
+        entry = self._get_template_index().get(notification_type)
+        return entry[3] if entry else 'digest'
 
-👤 Cliente: {client}
-🖨️ Equipo: {equipment}
-📍 Ubicación: {location}
-⏰ Tiempo restante: {time_remaining}
+    @api.model
+    def get_compiled_template(self, notification_type):
+        """
+        Renderizador compilado para un tipo de notificación, en caché por
+        (id de plantilla, write_date). Retorna None si no hay plantilla;
+        lanza ValueError si el texto tiene llaves mal formadas.
+        """
+        entry = self._get_template_index().get(notification_type)
+        if entry:
+            template_id, write_date, text = entry[:3]
+        else:
+            template_id, write_date, text = f'default:{notification_type}', None, self._get_default_template(notification_type)
+        if not text:
+            return None
+
+        key = (self.env.cr.dbname, template_id)
+        cached = _COMPILED_TEMPLATES.get(key)
+        if cached and cached[0] == write_date:
+            return cached[1]
+        compiled = CompiledTemplate(text)
+        _COMPILED_TEMPLATES[key] = (write_date, compiled)
+        return compiled
 
-_ACCIÓN REQUERIDA_ ⚡"""
-        }
-        
-        return templates.get(notification_type, '')
+    @api.model
+    def _get_default_template(self, notification_type):
+        """Templates por defecto con variables de vehículo, DNI y hora peruana"""
+        return DEFAULT_TEMPLATES.get(notification_type, '')
 
 
 class CopierServiceRequest(models.Model):
@@ -600,126 +758,151 @@ class CopierServiceRequest(models.Model):
             bool: True si se envió correctamente
         """
         self.ensure_one()
+        return bool(self._send_whatsapp_notifications(
+            notification_type, recipient_type, phone=phone, work_done=work_done, reason=reason
+        ))
+    
+    def _send_whatsapp_notifications(self, notification_type, recipient_type, phone=None, work_done=None, reason=None):
+        """
+        Envío por lotes: renderiza la plantilla compilada para todas las
+        solicitudes en una pasada, crea las notificaciones con un solo create()
+        y las encola.
         
-        if not self.enable_whatsapp_notifications:
-            _logger.info("Notificaciones WhatsApp deshabilitadas para %s", self.name)
-            return False
+        Args:
+            phone (str): Número fijo para todas (ej. soporte); si es None se usa
+                el teléfono de contacto de cada solicitud
+        
+        Returns:
+            int: Cantidad de notificaciones encoladas
+        """
+        deshabilitadas = self.filtered(lambda r: not r.enable_whatsapp_notifications)
+        for record in deshabilitadas:
+            _logger.info("Notificaciones WhatsApp deshabilitadas para %s", record.name)
+        solicitudes = self - deshabilitadas
+        if not solicitudes:
+            return 0
         
         try:
-            # Obtener plantilla
-            template_text = self.env['whatsapp.service.template'].get_template(notification_type)
-            if not template_text:
+            messages = solicitudes._render_whatsapp_messages(notification_type, work_done=work_done, reason=reason)
+            if not messages:
                 _logger.warning("No hay plantilla para tipo: %s", notification_type)
-                return False
+                return 0
             
-            # Limpiar número
-            clean_phone = self.env['whatsapp.config'].clean_phone_number(phone)
-            if not clean_phone:
-                _logger.warning("Número inválido para notificación: %s", phone)
-                return False
+            WhatsappConfig = self.env['whatsapp.config']
+            vals_list = []
+            for record in solicitudes:
+                clean_phone = WhatsappConfig.clean_phone_number(phone or record.telefono_contacto)
+                if not clean_phone:
+                    _logger.warning("Número inválido para notificación: %s", phone or record.telefono_contacto)
+                    continue
+                vals_list.append({
+                    'service_request_id': record.id,
+                    'notification_type': notification_type,
+                    'recipient_type': recipient_type,
+                    'phone_number': clean_phone,
+                    'message_text': messages[record.id],
+                    'state': 'pending',
+                })
             
-            # ============================================
-            # PREPARAR VARIABLES CON HORA PERUANA
-            # ============================================
+            # Encolar (el despachador las envía en segundo plano)
+            notifications = self.env['whatsapp.service.notification'].create(vals_list)
+            return len([notification for notification in notifications if notification.send_notification()])
             
-            # URLs públicas
-            base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
-            tracking_url = f"{base_url}/service/track/{self.tracking_token}" if self.tracking_token else 'N/A'
-            evaluation_url = f"{base_url}/service/evaluate/{self.evaluation_token}" if self.evaluation_token else 'N/A'
+        except Exception as e:
+            _logger.exception("Error en _send_whatsapp_notification: %s", str(e))
+            return 0
+    
+    def _render_whatsapp_messages(self, notification_type, work_done=None, reason=None):
+        """
+        Renderiza la plantilla de un tipo para muchas solicitudes en una pasada.
+        La plantilla se compila una sola vez y los datos relacionados se leen
+        en lote gracias al prefetch del recordset.
+        
+        Returns:
+            dict: {id de solicitud: mensaje}; vacío si no hay plantilla
+        """
+        compiled = self.env['whatsapp.service.template'].get_compiled_template(notification_type)
+        if not compiled:
+            return {}
+        
+        # Datos comunes a todo el lote
+        base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
+        now_utc = fields.Datetime.now()
+        return {
+            record.id: compiled.render(record._prepare_whatsapp_variables(base_url, now_utc, work_done, reason))
+            for record in self
+        }
+    
+    def _prepare_whatsapp_variables(self, base_url, now_utc, work_done=None, reason=None):
+        """Variables de plantilla de una solicitud, con fechas en hora peruana"""
+        self.ensure_one()
+        
+        # URLs públicas
+        tracking_url = f"{base_url}/service/track/{self.tracking_token}" if self.tracking_token else 'N/A'
+        evaluation_url = f"{base_url}/service/evaluate/{self.evaluation_token}" if self.evaluation_token else 'N/A'
+        
+        # Prioridad legible
+        prioridad_map = {'0': 'Baja', '1': 'Normal', '2': 'Alta', '3': 'Crítica'}
+        
+        # Datos del técnico
+        tecnico = self.tecnico_id
+        technician_name = tecnico.name if tecnico else 'Por asignar'
+        technician_phone = tecnico.phone or 'No disponible' if tecnico else 'No disponible'
+        technician_dni = tecnico.vat or 'No registrado' if tecnico else 'No registrado'
+        
+        # Datos del vehículo
+        vehicle_info = self.vehicle_info or 'No asignado'
+        
+        variables = {
+            # Solicitud
+            'number': self.name or 'N/A',
+            'priority': prioridad_map.get(self.prioridad, 'Normal'),
             
-            # Prioridad legible
-            prioridad_map = {'0': 'Baja', '1': 'Normal', '2': 'Alta', '3': 'Crítica'}
+            # Cliente
+            'client': self.cliente_id.name if self.cliente_id else 'N/A',
+            'contact': self.contacto or 'N/A',
+            'phone': self.telefono_contacto or 'N/A',
             
-            # Datos del técnico
-            tecnico = self.tecnico_id
-            technician_name = tecnico.name if tecnico else 'Por asignar'
-            technician_phone = tecnico.phone or 'No disponible' if tecnico else 'No disponible'
-            technician_dni = tecnico.vat or 'No registrado' if tecnico else 'No registrado'
+            # Equipo
+            'equipment': self.modelo_maquina.name if self.modelo_maquina else 'N/A',
+            'serie': self.serie_maquina or 'N/A',
+            'location': self.ubicacion or 'N/A',
+            'sede': self.sede or 'N/A',
+            'problem': self.tipo_problema_id.name if self.tipo_problema_id else 'N/A',
             
-            # Datos del vehículo
-            vehicle_info = self.vehicle_info or 'No asignado'
+            # Técnico
+            'technician': technician_name,
+            'technician_phone': technician_phone,
+            'technician_dni': technician_dni,
             
-            # Hora actual en Perú
-            now_utc = fields.Datetime.now()
+            # Vehículo
+            'vehicle': vehicle_info,
             
-            variables = {
-                # Solicitud
-                'number': self.name or 'N/A',
-                'priority': prioridad_map.get(self.prioridad, 'Normal'),
-                
-                # Cliente
-                'client': self.cliente_id.name if self.cliente_id else 'N/A',
-                'contact': self.contacto or 'N/A',
-                'phone': self.telefono_contacto or 'N/A',
-                
-                # Equipo
-                'equipment': self.modelo_maquina.name if self.modelo_maquina else 'N/A',
-                'serie': self.serie_maquina or 'N/A',
-                'location': self.ubicacion or 'N/A',
-                'sede': self.sede or 'N/A',
-                'problem': self.tipo_problema_id.name if self.tipo_problema_id else 'N/A',
-                
-                # Técnico
-                'technician': technician_name,
-                'technician_phone': technician_phone,
-                'technician_dni': technician_dni,
-                
-                # Vehículo
-                'vehicle': vehicle_info,
-                
-                # Fechas (HORA PERUANA)
-                'date': to_peru_time(self.fecha_programada),
-                'time': to_peru_time(now_utc),
-                
-                # Trabajo / Motivos
-                'work_done': work_done or self.trabajo_realizado or 'N/A',
-                'reason': reason or 'No especificado',
-                
-                # SLA
-                'time_remaining': 'N/A',
-                
-                # URLs
-                'tracking_url': tracking_url,
-                'evaluation_url': evaluation_url,
-            }
-            
-            # Calcular tiempo restante para SLA
-            if self.create_date and self.sla_limite_1:
-                tiempo_transcurrido = (now_utc - self.create_date).total_seconds() / 3600.0
-                tiempo_restante = self.sla_limite_1 - tiempo_transcurrido
-                if tiempo_restante > 0:
-                    variables['time_remaining'] = f"{tiempo_restante:.1f} horas"
-                else:
-                    variables['time_remaining'] = '⚠️ VENCIDO'
+            # Fechas (HORA PERUANA)
+            'date': to_peru_time(self.fecha_programada),
+            'time': to_peru_time(now_utc),
             
-            # Renderizar plantilla
-            try:
-                message = template_text.format(**variables)
-            except KeyError as e:
-                _logger.error("Variable no encontrada en plantilla %s: %s", notification_type, str(e))
-                # Intentar enviar con la variable faltante como N/A
-                try:
-                    variables[str(e).strip("'")] = 'N/A'
-                    message = template_text.format(**variables)
-                except Exception:
-                    return False
-            
-            # Crear registro de notificación
-            notification = self.env['whatsapp.service.notification'].create({
-                'service_request_id': self.id,
-                'notification_type': notification_type,
-                'recipient_type': recipient_type,
-                'phone_number': clean_phone,
-                'message_text': message,
-                'state': 'pending',
-            })
+            # Trabajo / Motivos
+            'work_done': work_done or self.trabajo_realizado or 'N/A',
+            'reason': reason or 'No especificado',
             
-            # Enviar
-            return notification.send_notification()
+            # SLA
+            'time_remaining': 'N/A',
             
-        except Exception as e:
-            _logger.exception("Error en _send_whatsapp_notification: %s", str(e))
-            return False
+            # URLs
+            'tracking_url': tracking_url,
+            'evaluation_url': evaluation_url,
+        }
+        
+        # Calcular tiempo restante para SLA
+        if self.create_date and self.sla_limite_1:
+            tiempo_transcurrido = (now_utc - self.create_date).total_seconds() / 3600.0
+            tiempo_restante = self.sla_limite_1 - tiempo_transcurrido
+            if tiempo_restante > 0:
+                variables['time_remaining'] = f"{tiempo_restante:.1f} horas"
+            else:
+                variables['time_remaining'] = '⚠️ VENCIDO'
+        return variables
     
     # ============================================
     # MÉTODOS DE NOTIFICACIÓN POR TIPO
@@ -837,14 +1020,17 @@ class CopierServiceRequest(models.Model):
     def _notify_evaluation_reminder(self):
         """Enviar recordatorio de evaluación"""
         self.ensure_one()
+        return bool(self._notify_evaluation_reminders())
+    
+    def _notify_evaluation_reminders(self):
+        """Enviar recordatorios de evaluación a varias solicitudes en un solo lote"""
+        solicitudes = self.filtered('telefono_contacto')
+        if not solicitudes:
+            return 0
         
-        if not self.telefono_contacto:
-            return False
-        
-        return self._send_whatsapp_notification(
+        return solicitudes._send_whatsapp_notifications(
             notification_type='evaluation_reminder',
-            recipient_type='client',
-            phone=self.telefono_contacto
+            recipient_type='client'
         )
     
     # ============================================
@@ -1008,7 +1194,8 @@ class WhatsAppTemplateTestWizard(models.TransientModel):
             
             if config.auto_verify_numbers:
                 exists = config.verify_number(clean_phone)
-                if not exists:
+                # None: no se pudo verificar; se intenta el envío igualmente
+                if exists is False:
                     raise ValidationError(_(
                         'El número %s no existe en WhatsApp.\n'
                         'Verifica que el número sea correcto y tenga WhatsApp activo.'
@@ -1146,4 +1146,66 @@ document.addEventListener('DOMContentLoaded', function () {
             }
         });
     }
-});
\ No newline at end of file
+});
+/**
+ * Scroll infinito del listado de lecturas.
+ * Pide la siguiente página (JSON con las filas ya renderizadas) cuando el
+ * marcador #counterRowsMore entra en pantalla o al pulsar su botón.
+ */
+document.addEventListener('DOMContentLoaded', function() {
+    const more = document.getElementById('counterRowsMore');
+    const tbody = document.getElementById('counterRows');
+
+    if (!more || !tbody) {
+        return;
+    }
+
+    let loading = false;
+    let observer = null;
+
+    function loadNextPage() {
+        const offset = more.dataset.nextOffset;
+
+        if (loading || !offset) {
+            return;
+        }
+
+        loading = true;
+
+        const url = new URL(more.dataset.url, window.location.origin);
+        url.searchParams.set('offset', offset);
+
+        fetch(url.toString(), {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' }
+        })
+            .then(response => response.json())
+            .then(data => {
+                tbody.insertAdjacentHTML('beforeend', data.html || '');
+
+                if (data.next_offset) {
+                    more.dataset.nextOffset = data.next_offset;
+                } else {
+                    if (observer) {
+                        observer.disconnect();
+                    }
+                    more.remove();
+                }
+            })
+            .catch(error => console.error('Error cargando más lecturas:', error))
+            .finally(() => {
+                loading = false;
+            });
+    }
+
+    more.querySelector('button').addEventListener('click', loadNextPage);
+
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage();
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(more);
+    }
+});
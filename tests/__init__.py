@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_copier_billing_calc
+from . import test_whatsapp_gateway
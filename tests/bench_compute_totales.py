@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Comparación del costo de recálculo de totales de lecturas (copier.counter).
+
+- antes: un cálculo por lectura con ~20 líneas _logger.info por registro
+  (comportamiento anterior de _compute_totales, log en nivel INFO)
+- después: calcular_lote con la traza desactivada (por defecto)
+- después con traza: calcular_lote con copier_billing_trace activo
+
+No necesita Odoo: mide la parte de Python del compute (cálculo y logging),
+sin ORM ni base de datos.
+
+    python tests/bench_compute_totales.py [lecturas]
+"""
+
+import importlib.util
+import io
+import logging
+import os
+import sys
+import time
+
+_TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+_PATH = os.path.join(os.path.dirname(_TESTS_DIR), 'models', 'copier_billing_calc.py')
+_SPEC = importlib.util.spec_from_file_location('copier_billing_calc', _PATH)
+calc = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(calc)
+
+sys.path.insert(0, _TESTS_DIR)
+from test_copier_billing_calc import _fila  # noqa: E402
+
+_logger = logging.getLogger('bench_compute_totales')
+
+
+def _rentas(fila):
+    (tipo, volumen_bn, volumen_color, precio_bn, precio_color,
+     monto_bn, monto_color, monto_total, _descuento, igv) = fila
+    return calc.calcular_rentas(
+        tipo or 'auto', volumen_bn, volumen_color,
+        volumen_bn * precio_bn, volumen_color * precio_color,
+        monto_bn, monto_color, monto_total, igv,
+    )
+
+
+def antes(filas):
+    """Fila por fila, con la traza INFO por registro que emitía el compute"""
+    log = _logger.info
+    log("=== INICIANDO _compute_totales SINCRONIZADO COMPLETO ===")
+    for indice, fila in enumerate(filas):
+        tipo, volumen_bn, volumen_color, precio_bn, precio_color = fila[:5]
+        descuento, igv = fila[8], fila[9]
+        log("Procesando counter ID: %s, Serie: %s", indice, 'SERIE-%s' % indice)
+        log("🎯 TIPO DE CÁLCULO DETECTADO: %s", tipo)
+        renta_bn, renta_color = _rentas(fila)
+        log("- Renta B/N: %s × %s = %s", volumen_bn, precio_bn, renta_bn)
+        log("- Renta Color: %s × %s = %s", volumen_color, precio_color, renta_color)
+        log("=== CALCULANDO TOTALES FINALES ===")
+        totales = calc.calcular_totales(renta_bn, renta_color, descuento, igv)
+        log("- Subtotal antes descuento: %s", totales['subtotal_antes_descuento'])
+        log("- Descuento (%s%%): %s", descuento, totales['monto_descuento'])
+        log("- Subtotal con descuento: %s", totales['subtotal'])
+        log("- Subtotal B/N: %s", totales['subtotal_bn'])
+        log("- Subtotal Color: %s", totales['subtotal_color'])
+        log("- IGV B/N: %s", totales['igv_bn'])
+        log("- IGV Color: %s", totales['igv_color'])
+        log("- IGV: %s", totales['igv'])
+        log("- Total B/N: %s", totales['total_bn'])
+        log("- Total Color: %s", totales['total_color'])
+        log("- Total: %s", totales['total'])
+        log("✅ TOTALES PERFECTAMENTE SINCRONIZADOS!")
+    log("=== FINALIZANDO _compute_totales SINCRONIZADO COMPLETO ===")
+
+
+def despues(filas, trace_enabled=False):
+    """Un solo calcular_lote; la traza por registro solo si está activa"""
+    trace = _logger.info if trace_enabled else (lambda *args, **kwargs: None)
+    trace("=== INICIANDO _compute_totales SINCRONIZADO COMPLETO ===")
+    resultados = calc.calcular_lote(filas)
+    for indice, (fila, importes) in enumerate(zip(filas, resultados)):
+        if trace_enabled:
+            trace(
+                "Counter %s (%s) tipo=%s: renta B/N=%s, renta Color=%s, descuento=%s, subtotal=%s, IGV=%s, total=%s",
+                indice, 'SERIE-%s' % indice, fila[0],
+                importes['renta_bn'], importes['renta_color'], importes['monto_descuento'],
+                importes['subtotal'], importes['igv'], importes['total'],
+            )
+    trace("=== FINALIZANDO _compute_totales SINCRONIZADO COMPLETO ===")
+
+
+def medir(funcion, *args, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args)
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+def main(lecturas=2000):
+    # Log en INFO hacia un buffer en memoria: mide el formateo, no el disco
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+    filas = [_fila(i) for i in range(lecturas)]
+    t_antes = medir(antes, filas)
+    t_despues = medir(despues, filas)
+    t_traza = medir(despues, filas, True)
+
+    print("Recálculo de %s lecturas (mejor de 3):" % lecturas)
+    print("  antes (traza INFO por registro): %8.1f ms" % (t_antes * 1000))
+    print("  después, traza desactivada:      %8.1f ms  (x%.0f)" % (t_despues * 1000, t_antes / t_despues))
+    print("  después, copier_billing_trace:   %8.1f ms" % (t_traza * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
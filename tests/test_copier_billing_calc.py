@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del núcleo de facturación (models/copier_billing_calc.py).
+
+El módulo no usa el ORM: se carga directamente desde su archivo, así las
+pruebas corren con Python puro (python -m pytest tests) además de Odoo.
+"""
+
+import importlib.util
+import os
+import time
+import unittest
+
+_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     'models', 'copier_billing_calc.py')
+_SPEC = importlib.util.spec_from_file_location('copier_billing_calc', _PATH)
+calc = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(calc)
+
+
+class TestPrecioYCopias(unittest.TestCase):
+
+    def test_precio_sin_igv(self):
+        self.assertAlmostEqual(calc.precio_sin_igv(118.0, True, 18), 100.0)
+        self.assertEqual(calc.precio_sin_igv(118.0, False, 18), 118.0)
+        self.assertEqual(calc.precio_sin_igv(None, True, 18), 0.0)
+
+    def test_copias_exceso(self):
+        self.assertEqual(calc.copias_exceso(900, 1000), 0)
+        self.assertEqual(calc.copias_exceso(1000, 1000), 0)
+        self.assertEqual(calc.copias_exceso(1250, 1000), 250)
+        self.assertEqual(calc.copias_exceso(300, None), 300)
+
+    def test_copias_facturables(self):
+        self.assertEqual(calc.copias_facturables(900, 1000), 1000)
+        self.assertEqual(calc.copias_facturables(1000, 1000), 1000)
+        self.assertEqual(calc.copias_facturables(1250, 1000), 1250)
+        self.assertEqual(calc.copias_facturables(300, None), 300)
+
+
+class TestCalcularRentas(unittest.TestCase):
+
+    def rentas(self, tipo, volumen_bn=1000, volumen_color=200, base_bn=50.0, base_color=40.0,
+               monto_bn=80.0, monto_color=70.0, monto_total=236.0, igv=18):
+        return calc.calcular_rentas(tipo, volumen_bn, volumen_color, base_bn, base_color,
+                                    monto_bn, monto_color, monto_total, igv)
+
+    def test_auto(self):
+        self.assertEqual(self.rentas('auto'), (50.0, 40.0))
+        self.assertEqual(self.rentas('desconocido'), (50.0, 40.0))
+
+    def test_manual_bn(self):
+        self.assertEqual(self.rentas('manual_sin_igv_bn'), (80.0, 40.0))
+        renta_bn, renta_color = self.rentas('manual_con_igv_bn', monto_bn=118.0)
+        self.assertAlmostEqual(renta_bn, 100.0)
+        self.assertEqual(renta_color, 40.0)
+
+    def test_manual_color(self):
+        self.assertEqual(self.rentas('manual_sin_igv_color'), (50.0, 70.0))
+        renta_bn, renta_color = self.rentas('manual_con_igv_color', monto_color=59.0)
+        self.assertEqual(renta_bn, 50.0)
+        self.assertAlmostEqual(renta_color, 50.0)
+
+    def test_manual_total_proporcional(self):
+        # 180 repartido según la base 50 / 40
+        renta_bn, renta_color = self.rentas('manual_sin_igv_total', monto_total=180.0)
+        self.assertAlmostEqual(renta_bn, 100.0)
+        self.assertAlmostEqual(renta_color, 80.0)
+
+        # Con IGV: 212.4 / 1.18 = 180, mismo reparto
+        renta_bn, renta_color = self.rentas('manual_con_igv_total', monto_total=212.4)
+        self.assertAlmostEqual(renta_bn, 100.0)
+        self.assertAlmostEqual(renta_color, 80.0)
+
+    def test_manual_total_sin_base(self):
+        # Sin volumen o sin costos base, todo el monto va a B/N
+        self.assertEqual(self.rentas('manual_sin_igv_total', volumen_bn=0, volumen_color=0, monto_total=180.0),
+                         (180.0, 0))
+        self.assertEqual(self.rentas('manual_sin_igv_total', base_bn=0.0, base_color=0.0, monto_total=180.0),
+                         (180.0, 0))
+
+
+class TestCalcularTotales(unittest.TestCase):
+
+    def test_descuento_antes_de_igv(self):
+        totales = calc.calcular_totales(100.0, 50.0, 10, 18)
+        self.assertAlmostEqual(totales['subtotal_antes_descuento'], 150.0)
+        self.assertAlmostEqual(totales['monto_descuento'], 15.0)
+        self.assertAlmostEqual(totales['subtotal'], 135.0)
+        # El descuento se reparte en proporción a cada renta
+        self.assertAlmostEqual(totales['subtotal_bn'], 90.0)
+        self.assertAlmostEqual(totales['subtotal_color'], 45.0)
+        # El IGV se calcula sobre el subtotal ya descontado
+        self.assertAlmostEqual(totales['igv'], 135.0 * 0.18)
+        self.assertAlmostEqual(totales['igv_bn'], 90.0 * 0.18)
+        self.assertAlmostEqual(totales['total'], 135.0 * 1.18)
+        self.assertAlmostEqual(totales['total_bn'] + totales['total_color'], totales['total'])
+
+    def test_sin_descuento(self):
+        totales = calc.calcular_totales(100.0, 0.0, None, 18)
+        self.assertEqual(totales['monto_descuento'], 0.0)
+        self.assertAlmostEqual(totales['total'], 118.0)
+        self.assertEqual(totales['total_color'], 0.0)
+
+    def test_rentas_en_cero(self):
+        totales = calc.calcular_totales(0.0, 0.0, 10, 18)
+        self.assertEqual(totales['subtotal_bn'], 0.0)
+        self.assertEqual(totales['subtotal_color'], 0.0)
+        self.assertEqual(totales['total'], 0.0)
+
+
+class TestBolsaCompartida(unittest.TestCase):
+
+    def test_color_por_volumen(self):
+        self.assertEqual(calc.calcular_bolsa_compartida(5200, 300, 5000, 500, False), (200, 500))
+        self.assertEqual(calc.calcular_bolsa_compartida(4800, 700, 5000, 500, False), (0, 700))
+
+    def test_color_real(self):
+        self.assertEqual(calc.calcular_bolsa_compartida(5200, 300, 5000, 500, True), (200, 300))
+
+
+def _fila(indice):
+    tipos = [
+        'auto', 'manual_sin_igv_bn', 'manual_con_igv_bn', 'manual_sin_igv_color',
+        'manual_con_igv_color', 'manual_sin_igv_total', 'manual_con_igv_total', False,
+    ]
+    return (
+        tipos[indice % len(tipos)],
+        1000 + indice % 700,
+        (indice * 7) % 300,
+        0.02,
+        0.15,
+        120.0 + indice % 13,
+        60.0 + indice % 11,
+        300.0 + indice % 17,
+        (indice % 4) * 5.0,
+        18,
+    )
+
+
+class TestCalcularLote(unittest.TestCase):
+
+    def test_lote_igual_a_fila_por_fila(self):
+        filas = [_fila(i) for i in range(64)]
+        resultados = calc.calcular_lote(filas)
+        self.assertEqual(len(resultados), len(filas))
+        for fila, resultado in zip(filas, resultados):
+            (tipo, volumen_bn, volumen_color, precio_bn, precio_color,
+             monto_bn, monto_color, monto_total, descuento, igv) = fila
+            renta_bn, renta_color = calc.calcular_rentas(
+                tipo or 'auto', volumen_bn, volumen_color,
+                volumen_bn * precio_bn, volumen_color * precio_color,
+                monto_bn, monto_color, monto_total, igv,
+            )
+            self.assertEqual(resultado, calc.calcular_totales(renta_bn, renta_color, descuento, igv))
+
+    def test_lote_vacio(self):
+        self.assertEqual(calc.calcular_lote([]), [])
+
+    def test_tiempo_lote(self):
+        # 12 lecturas por equipo durante un año para 5.000 equipos
+        filas = [_fila(i) for i in range(12 * 5000)]
+        inicio = time.perf_counter()
+        resultados = calc.calcular_lote(filas)
+        duracion = time.perf_counter() - inicio
+        self.assertEqual(len(resultados), len(filas))
+        # Cota holgada: el recálculo masivo debe seguir en el orden de un segundo
+        self.assertLess(duracion, 5.0, "calcular_lote tardó %.2f s para %s filas" % (duracion, len(filas)))
+
+
+if __name__ == '__main__':
+    unittest.main()
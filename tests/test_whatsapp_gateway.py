@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del cliente HTTP de WhatsApp (models/whatsapp_gateway.py) contra
+el gateway falso de whatsapp_stub_server.py.
+
+whatsapp_gateway no usa el ORM: se carga directamente desde su archivo.
+"""
+
+import importlib.util
+import json
+import os
+import socket
+import sys
+import unittest
+from urllib.parse import parse_qs
+
+_TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+_PATH = os.path.join(os.path.dirname(_TESTS_DIR), 'models', 'whatsapp_gateway.py')
+
+try:
+    import requests
+    _SPEC = importlib.util.spec_from_file_location('whatsapp_gateway', _PATH)
+    gateway = importlib.util.module_from_spec(_SPEC)
+    _SPEC.loader.exec_module(gateway)
+except ImportError:
+    requests = gateway = None
+
+sys.path.insert(0, _TESTS_DIR)
+from whatsapp_stub_server import StubGateway  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@unittest.skipIf(gateway is None, "requests no está instalado")
+class TestWhatsAppGateway(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = StubGateway().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+
+    def setUp(self):
+        self.stub.received.clear()
+        self.stub.responses.clear()
+        self.stub.responses.update({
+            '/api/message': (200, {'success': True}),
+            '/api/send/text': (200, {'success': True, 'data': {'messageId': 'stub-1'}}),
+            '/api/check-number': (200, {'success': True, 'data': {'exists': True}}),
+        })
+
+    # ------------------------------------------------------------------
+    # API corporativa
+    # ------------------------------------------------------------------
+
+    def test_corporate_json_por_defecto(self):
+        result = gateway.send_corporate_message('51987654321', 'Hola', base_url=self.stub.url)
+        self.assertTrue(result['success'])
+        [peticion] = self.stub.requests_for('/api/message')
+        self.assertIn('application/json', peticion['content_type'])
+        self.assertEqual(json.loads(peticion['body']), {'phone': '51987654321', 'message': 'Hola'})
+
+    def test_corporate_form(self):
+        gateway.send_corporate_message('51987654321', 'Hola', base_url=self.stub.url, form=True)
+        [peticion] = self.stub.requests_for('/api/message')
+        self.assertIn('application/x-www-form-urlencoded', peticion['content_type'])
+        self.assertEqual(parse_qs(peticion['body'].decode()), {
+            'phone': ['51987654321'], 'type': ['text'], 'message': ['Hola'],
+        })
+
+    def test_corporate_no_2xx(self):
+        self.stub.respond('/api/message', 500, {'success': True, 'message': 'caído'})
+        result = gateway.send_corporate_message('51987654321', 'Hola', base_url=self.stub.url)
+        self.assertFalse(result['success'])
+        self.assertTrue(result['error'].startswith('HTTP 500'))
+
+        self.stub.respond('/api/message', 429, b'Too Many Requests')
+        result = gateway.send_corporate_message('51987654321', 'Hola', base_url=self.stub.url)
+        self.assertFalse(result['success'])
+        self.assertTrue(result['error'].startswith('HTTP 429'))
+
+    def test_corporate_cuerpo_no_dict(self):
+        self.stub.respond('/api/message', 200, ['ok'])
+        result = gateway.send_corporate_message('51987654321', 'Hola', base_url=self.stub.url)
+        self.assertFalse(result['success'])
+        self.assertTrue(result['error'])
+
+        self.stub.respond('/api/message', 200, b'<html>ok</html>')
+        result = gateway.send_corporate_message('51987654321', 'Hola', base_url=self.stub.url)
+        self.assertFalse(result['success'])
+
+    # ------------------------------------------------------------------
+    # Baileys
+    # ------------------------------------------------------------------
+
+    def test_send_text(self):
+        result = gateway.send_text(self.stub.url, 'clave', '51987654321', 'Hola')
+        self.assertEqual(result, {'success': True, 'message_id': 'stub-1', 'error': None})
+        [peticion] = self.stub.requests_for('/api/send/text')
+        self.assertEqual(json.loads(peticion['body']), {'number': '51987654321', 'text': 'Hola'})
+
+        self.stub.respond('/api/send/text', 503, {'success': False})
+        result = gateway.send_text(self.stub.url, 'clave', '51987654321', 'Hola')
+        self.assertFalse(result['success'])
+        self.assertTrue(result['error'].startswith('HTTP 503'))
+
+    def test_check_number(self):
+        self.assertTrue(gateway.check_number(self.stub.url, 'clave', '51987654321'))
+        self.stub.respond('/api/check-number', 200, {'success': True, 'data': {'exists': False}})
+        self.assertFalse(gateway.check_number(self.stub.url, 'clave', '51987654321'))
+
+    def test_check_number_error_no_es_no_existe(self):
+        # Un 401/429/5xx no dice nada del número: debe lanzar excepción
+        for status in (401, 429, 500):
+            self.stub.respond('/api/check-number', status, {'success': False})
+            with self.assertRaises(requests.HTTPError):
+                gateway.check_number(self.stub.url, 'clave', '51987654321')
+
+    # ------------------------------------------------------------------
+    # Reintentos y métricas
+    # ------------------------------------------------------------------
+
+    def test_reintenta_solo_errores_de_conexion(self):
+        client = gateway.GatewayClient('http://127.0.0.1:%s' % _free_port(), max_retries=2)
+        retry = client.session.get_adapter('http://').max_retries
+        self.assertEqual(retry.connect, 2)
+        self.assertEqual(retry.read, 0)
+        self.assertEqual(retry.status, 0)
+
+        # Nadie escucha en el puerto: se agotan los reintentos de conexión
+        with self.assertRaises(requests.ConnectionError):
+            client.request('POST', '/api/message', json={}, timeout=2)
+
+    def test_post_recibido_no_se_repite(self):
+        # El gateway lee la petición y corta la conexión: no se reenvía
+        self.stub.drop('/api/message')
+        result = gateway.send_corporate_message('51987654321', 'Hola', base_url=self.stub.url, timeout=5)
+        self.assertFalse(result['success'])
+        self.assertEqual(len(self.stub.requests_for('/api/message')), 1)
+
+    def test_metricas_por_endpoint(self):
+        antes = gateway.get_metrics().get('POST /api/check-number', {'calls': 0, 'errors': 0})
+        gateway.check_number(self.stub.url, 'clave', '51987654321')
+        self.stub.respond('/api/check-number', 500, {'success': False})
+        with self.assertRaises(requests.HTTPError):
+            gateway.check_number(self.stub.url, 'clave', '51987654321')
+
+        despues = gateway.get_metrics()['POST /api/check-number']
+        self.assertEqual(despues['calls'], antes['calls'] + 2)
+        self.assertEqual(despues['errors'], antes['errors'] + 1)
+        self.assertGreater(despues['max_ms'], 0.0)
+        self.assertAlmostEqual(despues['avg_ms'], despues['total_ms'] / despues['calls'])
+
+
+if __name__ == '__main__':
+    unittest.main()
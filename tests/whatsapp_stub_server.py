@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Gateway de WhatsApp falso para pruebas (solo biblioteca estándar).
+
+Sirve los endpoints que usa models/whatsapp_gateway.py:
+- POST /api/message       (API corporativa)
+- POST /api/send/text     (Baileys)
+- POST /api/check-number  (Baileys)
+
+Cada petición queda registrada en `received` (ruta, Content-Type, cuerpo) y
+la respuesta de cada ruta se configura con `respond(path, status, body)`;
+`drop(path)` cierra la conexión sin responder. También sirve para apuntar
+una instancia de desarrollo (copier_company.whatsapp_corporate_url):
+
+    python tests/whatsapp_stub_server.py 8099
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSES = {
+    '/api/message': (200, {'success': True, 'message': 'Mensaje enviado'}),
+    '/api/send/text': (200, {'success': True, 'data': {'messageId': 'stub-1'}}),
+    '/api/check-number': (200, {'success': True, 'data': {'exists': True}}),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        with stub.lock:
+            stub.received.append({
+                'path': self.path,
+                'content_type': self.headers.get('Content-Type', ''),
+                'body': body,
+            })
+            respuesta = stub.responses.get(self.path)
+
+        if respuesta == 'drop':
+            # Petición recibida pero sin respuesta: el cliente no debe reintentar
+            self.close_connection = True
+            self.connection.close()
+            return
+        if respuesta is None:
+            respuesta = (404, {'success': False, 'message': 'Not found'})
+
+        status, payload = respuesta
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGateway:
+    """Servidor HTTP en un hilo, en 127.0.0.1 y un puerto libre (o el indicado)"""
+
+    def __init__(self, port=0):
+        self.lock = threading.Lock()
+        self.received = []
+        self.responses = dict(DEFAULT_RESPONSES)
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self.server.server_address[1]
+
+    def respond(self, path, status, body):
+        """Configura la respuesta de una ruta; body puede ser dict/list (JSON) o bytes"""
+        with self.lock:
+            self.responses[path] = (status, body)
+
+    def drop(self, path):
+        """La ruta cierra la conexión después de leer la petición"""
+        with self.lock:
+            self.responses[path] = 'drop'
+
+    def requests_for(self, path):
+        with self.lock:
+            return [item for item in self.received if item['path'] == path]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+if __name__ == '__main__':
+    stub = StubGateway(int(sys.argv[1]) if len(sys.argv) > 1 else 8099)
+    print('Gateway WhatsApp de prueba en %s' % stub.url)
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()